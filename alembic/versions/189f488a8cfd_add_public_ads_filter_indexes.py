@@ -0,0 +1,52 @@
+"""add public ads filter indexes
+
+Revision ID: 189f488a8cfd
+Revises: 1ed88557dc21
+Create Date: 2026-10-15 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '189f488a8cfd'
+down_revision: Union[str, Sequence[str], None] = '1ed88557dc21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Фильтр по марке + диапазон/сортировка по цене в публичном каталоге
+    op.create_index(
+        "ads_public_brand_price",
+        "ads",
+        ["car_brand_id", "price"],
+        postgresql_where=sa.text("is_active"),
+    )
+    # filter_ads сравнивает lower(region) = lower(:region)
+    op.create_index(
+        "ads_public_region_price",
+        "ads",
+        [sa.text("lower(region)"), sa.text("price DESC")],
+        postgresql_where=sa.text("is_active"),
+    )
+    # search_by_title: title ILIKE '%query%'
+    op.create_index(
+        "ads_title_trgm",
+        "ads",
+        ["title"],
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ads_title_trgm", table_name="ads")
+    op.drop_index("ads_public_region_price", table_name="ads")
+    op.drop_index("ads_public_brand_price", table_name="ads")
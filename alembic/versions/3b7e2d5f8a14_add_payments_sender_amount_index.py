@@ -0,0 +1,34 @@
+"""add payments sender covering index
+
+Revision ID: 3b7e2d5f8a14
+Revises: 8d4f1a6c2e90
+Create Date: 2026-10-15 15:22:48.635104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e2d5f8a14'
+down_revision: Union[str, Sequence[str], None] = '8d4f1a6c2e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SUM(amount) GROUP BY sender и платежи пользователя — index-only scan
+    op.create_index(
+        "payments_sender_amount",
+        "payments",
+        ["sender"],
+        postgresql_include=["amount"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("payments_sender_amount", table_name="payments")
@@ -0,0 +1,33 @@
+"""add car_brands lower(name) index
+
+Revision ID: 5c2e7b9d41a3
+Revises: 189f488a8cfd
+Create Date: 2026-10-15 12:40:07.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e7b9d41a3'
+down_revision: Union[str, Sequence[str], None] = '189f488a8cfd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # get_by_name сравнивает lower(name) = lower(:name)
+    op.create_index(
+        "car_brands_name_lower_idx",
+        "car_brands",
+        [sa.text("lower(name)")],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("car_brands_name_lower_idx", table_name="car_brands")
@@ -0,0 +1,58 @@
+"""add hot predicate indexes and favorites unique key
+
+Revision ID: 6a1c9e3f7b52
+Revises: 3b7e2d5f8a14
+Create Date: 2026-10-15 16:10:57.281930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1c9e3f7b52'
+down_revision: Union[str, Sequence[str], None] = '3b7e2d5f8a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Очередь модерации: JOIN moderations по ad_id с фильтром status = 'pending'
+    op.create_index(
+        "moderations_pending_ad_id",
+        "moderations",
+        ["ad_id"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    # История и счётчик проверок модератора
+    op.create_index("moderations_moderator_id", "moderations", ["moderator_id"])
+    # Список активных модераторов
+    op.create_index(
+        "moderators_active",
+        "moderators",
+        ["id"],
+        postgresql_where=sa.text("is_active"),
+    )
+    # Счётчики и топ просмотров по объявлению, просмотры пользователя
+    op.create_index("view_logs_ad_id", "view_logs", ["ad_id"])
+    op.create_index("view_logs_sender", "view_logs", ["sender"])
+    # ON CONFLICT (sender, ad_id) в избранном требует уникального ключа —
+    # сначала убираем дубликаты, оставляя самую раннюю запись
+    op.execute(
+        "DELETE FROM favorites f USING favorites d "
+        "WHERE f.sender = d.sender AND f.ad_id = d.ad_id AND f.id > d.id"
+    )
+    op.create_unique_constraint("favorites_sender_ad_id_key", "favorites", ["sender", "ad_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("favorites_sender_ad_id_key", "favorites", type_="unique")
+    op.drop_index("view_logs_sender", table_name="view_logs")
+    op.drop_index("view_logs_ad_id", table_name="view_logs")
+    op.drop_index("moderators_active", table_name="moderators")
+    op.drop_index("moderations_moderator_id", table_name="moderations")
+    op.drop_index("moderations_pending_ad_id", table_name="moderations")
@@ -0,0 +1,35 @@
+"""add ad_images covering index
+
+Revision ID: 8d4f1a6c2e90
+Revises: 5c2e7b9d41a3
+Create Date: 2026-10-15 14:05:31.402917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f1a6c2e90'
+down_revision: Union[str, Sequence[str], None] = '5c2e7b9d41a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Галерея и обложка: WHERE ad_id = ... ORDER BY id, читается только image_url —
+    # index-only scan без похода в heap
+    op.create_index(
+        "ad_images_ad_id_id_cover",
+        "ad_images",
+        ["ad_id", "id"],
+        postgresql_include=["image_url"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ad_images_ad_id_id_cover", table_name="ad_images")
@@ -0,0 +1,34 @@
+"""add view_logs viewed_at brin index
+
+Revision ID: 9e5b3c7d1f26
+Revises: 6a1c9e3f7b52
+Create Date: 2026-10-15 16:48:12.904377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e5b3c7d1f26'
+down_revision: Union[str, Sequence[str], None] = '6a1c9e3f7b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # filter_by_date / iter_by_date: просмотры пишутся по времени, BRIN крошечный
+    op.create_index(
+        "view_logs_viewed_at_brin",
+        "view_logs",
+        ["viewed_at"],
+        postgresql_using="brin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("view_logs_viewed_at_brin", table_name="view_logs")
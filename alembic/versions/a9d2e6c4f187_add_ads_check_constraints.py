@@ -0,0 +1,40 @@
+"""add ads check constraints
+
+Revision ID: a9d2e6c4f187
+Revises: f3c9a1d6b7e4
+Create Date: 2026-10-15 19:40:51.093376
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d2e6c4f187'
+down_revision: Union[str, Sequence[str], None] = 'f3c9a1d6b7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHECKS = (
+    ("ads_price_nonneg", "price >= 0"),
+    ("ads_year_car_range", "year_car BETWEEN 1900 AND 2100"),
+    ("ads_mileage_nonneg", "mileage_km_car >= 0"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOT VALID берёт блокировку лишь на мгновение и проверяет только новые строки;
+    # VALIDATE проходит по старым под SHARE UPDATE EXCLUSIVE — запись в ads не блокируется
+    for name, condition in CHECKS:
+        op.execute(f"ALTER TABLE ads ADD CONSTRAINT {name} CHECK ({condition}) NOT VALID")
+    for name, _condition in CHECKS:
+        op.execute(f"ALTER TABLE ads VALIDATE CONSTRAINT {name}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _condition in CHECKS:
+        op.drop_constraint(name, "ads", type_="check")
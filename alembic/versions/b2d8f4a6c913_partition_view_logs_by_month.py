@@ -0,0 +1,110 @@
+"""partition view_logs by month
+
+Revision ID: b2d8f4a6c913
+Revises: 9e5b3c7d1f26
+Create Date: 2026-10-15 17:35:04.118260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d8f4a6c913'
+down_revision: Union[str, Sequence[str], None] = '9e5b3c7d1f26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сколько месяцев вперёд создать партиции сразу
+MONTHS_AHEAD = 12
+
+
+def _create_indexes() -> None:
+    # Индексы на родительской таблице создаются и на всех партициях
+    op.create_index("view_logs_ad_id", "view_logs", ["ad_id"])
+    op.create_index("view_logs_sender", "view_logs", ["sender"])
+    op.create_index("view_logs_viewed_at_brin", "view_logs", ["viewed_at"], postgresql_using="brin")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE view_logs RENAME TO view_logs_old")
+    op.execute("ALTER INDEX view_logs_ad_id RENAME TO view_logs_old_ad_id")
+    op.execute("ALTER INDEX view_logs_sender RENAME TO view_logs_old_sender")
+    op.execute("ALTER INDEX view_logs_viewed_at_brin RENAME TO view_logs_old_viewed_at_brin")
+
+    # Ключ партиционирования обязан входить в первичный ключ и не может быть NULL
+    op.execute(
+        """
+        CREATE TABLE view_logs (
+            id integer NOT NULL DEFAULT nextval('view_logs_id_seq'::regclass),
+            ad_id integer REFERENCES ads (id),
+            sender varchar(50) NOT NULL REFERENCES users (sender),
+            viewed_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, viewed_at)
+        ) PARTITION BY RANGE (viewed_at)
+        """
+    )
+    # Всё, на что не нашлось месячной партиции, — сюда, чтобы вставки не падали
+    op.execute("CREATE TABLE view_logs_default PARTITION OF view_logs DEFAULT")
+
+    # Партиция на месяц; функцию можно звать из pg_cron раз в месяц
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION view_logs_create_partition(month date) RETURNS void AS $$
+        DECLARE
+            start_at date := date_trunc('month', month)::date;
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF view_logs FOR VALUES FROM (%L) TO (%L)',
+                'view_logs_' || to_char(start_at, 'YYYY_MM'),
+                start_at,
+                (start_at + interval '1 month')::date
+            );
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        f"""
+        SELECT view_logs_create_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', LEAST(COALESCE((SELECT min(viewed_at) FROM view_logs_old), now()), now())),
+            date_trunc('month', now()) + interval '{MONTHS_AHEAD} months',
+            interval '1 month'
+        ) AS month
+        """
+    )
+
+    op.execute(
+        "INSERT INTO view_logs (id, ad_id, sender, viewed_at) "
+        "SELECT id, ad_id, sender, COALESCE(viewed_at, now()) FROM view_logs_old"
+    )
+    op.execute("ALTER SEQUENCE view_logs_id_seq OWNED BY view_logs.id")
+    op.execute("DROP TABLE view_logs_old")
+    _create_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE view_logs RENAME TO view_logs_partitioned")
+    op.execute(
+        """
+        CREATE TABLE view_logs (
+            id integer PRIMARY KEY DEFAULT nextval('view_logs_id_seq'::regclass),
+            ad_id integer REFERENCES ads (id),
+            sender varchar(50) NOT NULL REFERENCES users (sender),
+            viewed_at timestamptz
+        )
+        """
+    )
+    op.execute(
+        "INSERT INTO view_logs (id, ad_id, sender, viewed_at) "
+        "SELECT id, ad_id, sender, viewed_at FROM view_logs_partitioned"
+    )
+    op.execute("ALTER SEQUENCE view_logs_id_seq OWNED BY view_logs.id")
+    op.execute("DROP TABLE view_logs_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS view_logs_create_partition(date)")
+    _create_indexes()
@@ -0,0 +1,42 @@
+"""use C collation for sender
+
+Revision ID: b5e7f2c8a391
+Revises: a9d2e6c4f187
+Create Date: 2026-10-15 20:03:26.772514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e7f2c8a391'
+down_revision: Union[str, Sequence[str], None] = 'a9d2e6c4f187'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# users.sender и все внешние ключи на него (view_logs — партиционированная, ALTER идёт на все партиции)
+SENDER_TABLES = ("users", "ads", "favorites", "payments", "view_logs")
+
+
+def _set_collation(collation: str | None) -> None:
+    # Смена колляции varchar не переписывает таблицу, перестраиваются только индексы
+    for table in SENDER_TABLES:
+        op.alter_column(
+            table,
+            "sender",
+            type_=sa.String(50, collation=collation),
+            existing_type=sa.String(50),
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _set_collation("C")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _set_collation("default")
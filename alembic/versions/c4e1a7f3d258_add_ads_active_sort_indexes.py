@@ -0,0 +1,48 @@
+"""add ads active sort indexes
+
+Revision ID: c4e1a7f3d258
+Revises: b2d8f4a6c913
+Create Date: 2026-10-15 18:02:44.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e1a7f3d258'
+down_revision: Union[str, Sequence[str], None] = 'b2d8f4a6c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Каталог: WHERE is_active ORDER BY price|created_at, id (в обе стороны) + LIMIT/OFFSET.
+    # CONCURRENTLY — без блокировки записи в ads, поэтому вне транзакции миграции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ads_active_price_id",
+            "ads",
+            ["price", "id"],
+            postgresql_where=sa.text("is_active"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ads_active_created_id",
+            "ads",
+            ["created_at", "id"],
+            postgresql_where=sa.text("is_active"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ads_active_created_id", table_name="ads", postgresql_concurrently=True)
+        op.drop_index("ads_active_price_id", table_name="ads", postgresql_concurrently=True)
@@ -0,0 +1,54 @@
+"""make car_brands lower(name) index unique
+
+Revision ID: c7d2e9a5f318
+Revises: b5e7f2c8a391
+Create Date: 2026-10-15 21:12:44.503816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e9a5f318'
+down_revision: Union[str, Sequence[str], None] = 'b5e7f2c8a391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # upsert разрешает конфликт по lower(name): сначала сливаем марки, отличающиеся
+    # только регистром, в самую раннюю запись и переносим на неё объявления
+    op.execute(
+        """
+        UPDATE ads SET car_brand_id = k.keep_id
+        FROM (
+            SELECT id, min(id) OVER (PARTITION BY lower(name)) AS keep_id FROM car_brands
+        ) k
+        WHERE ads.car_brand_id = k.id AND k.id <> k.keep_id
+        """
+    )
+    op.execute(
+        "DELETE FROM car_brands b USING car_brands k "
+        "WHERE lower(b.name) = lower(k.name) AND b.id > k.id"
+    )
+    op.drop_index("car_brands_name_lower_idx", table_name="car_brands")
+    op.create_index(
+        "car_brands_name_lower_idx",
+        "car_brands",
+        [sa.text("lower(name)")],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("car_brands_name_lower_idx", table_name="car_brands")
+    op.create_index(
+        "car_brands_name_lower_idx",
+        "car_brands",
+        [sa.text("lower(name)")],
+    )
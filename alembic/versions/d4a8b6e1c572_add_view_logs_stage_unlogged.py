@@ -0,0 +1,37 @@
+"""add unlogged view_logs_stage
+
+Revision ID: d4a8b6e1c572
+Revises: c7d2e9a5f318
+Create Date: 2026-10-15 22:05:19.837204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8b6e1c572'
+down_revision: Union[str, Sequence[str], None] = 'c7d2e9a5f318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Буфер просмотров: COPY сюда, INSERT ... SELECT в view_logs и TRUNCATE в одной транзакции.
+    # Постоянная UNLOGGED-таблица вместо TEMP на каждый сброс:
+    # не плодит строки pg_class/pg_attribute
+    op.create_table(
+        "view_logs_stage",
+        sa.Column("ad_id", sa.Integer(), nullable=False),
+        sa.Column("sender", sa.String(50, collation="C"), nullable=False),
+        sa.Column("viewed_at", sa.DateTime(timezone=True), nullable=False),
+        prefixes=["UNLOGGED"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("view_logs_stage")
@@ -0,0 +1,85 @@
+"""denormalize ads cover and image count
+
+Revision ID: d7a3f5b1e942
+Revises: c4e1a7f3d258
+Create Date: 2026-10-15 18:31:12.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3f5b1e942'
+down_revision: Union[str, Sequence[str], None] = 'c4e1a7f3d258'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("ads", sa.Column("main_image_url", sa.String(), nullable=True))
+    op.add_column("ads", sa.Column("image_count", sa.Integer(), server_default="0", nullable=False))
+
+    op.execute(
+        """
+        UPDATE ads SET image_count = s.cnt, main_image_url = s.first_url
+        FROM (
+            SELECT ad_id, count(*) AS cnt, (array_agg(image_url ORDER BY id))[1] AS first_url
+            FROM ad_images
+            GROUP BY ad_id
+        ) s
+        WHERE ads.id = s.ad_id
+        """
+    )
+
+    # Триггеры уровня оператора: пачка фото из add_many — один UPDATE ads,
+    # а вставки в обход ORM (Core INSERT, COPY) учитываются так же
+    op.execute(
+        """
+        CREATE FUNCTION ads_image_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE ads a
+                SET image_count = a.image_count + n.cnt,
+                    main_image_url = COALESCE(a.main_image_url, n.first_url)
+                FROM (
+                    SELECT ad_id, count(*) AS cnt, (array_agg(image_url ORDER BY id))[1] AS first_url
+                    FROM new_images
+                    GROUP BY ad_id
+                ) n
+                WHERE a.id = n.ad_id;
+            ELSE
+                -- Обложку пересчитываем по оставшимся фото (индекс ad_images_ad_id_id_cover)
+                UPDATE ads a
+                SET image_count = GREATEST(a.image_count - d.cnt, 0),
+                    main_image_url = (
+                        SELECT i.image_url FROM ad_images i WHERE i.ad_id = a.id ORDER BY i.id LIMIT 1
+                    )
+                FROM (SELECT ad_id, count(*) AS cnt FROM old_images GROUP BY ad_id) d
+                WHERE a.id = d.ad_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER ad_images_stats_insert AFTER INSERT ON ad_images "
+        "REFERENCING NEW TABLE AS new_images FOR EACH STATEMENT EXECUTE FUNCTION ads_image_stats()"
+    )
+    op.execute(
+        "CREATE TRIGGER ad_images_stats_delete AFTER DELETE ON ad_images "
+        "REFERENCING OLD TABLE AS old_images FOR EACH STATEMENT EXECUTE FUNCTION ads_image_stats()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS ad_images_stats_delete ON ad_images")
+    op.execute("DROP TRIGGER IF EXISTS ad_images_stats_insert ON ad_images")
+    op.execute("DROP FUNCTION IF EXISTS ads_image_stats()")
+    op.drop_column("ads", "image_count")
+    op.drop_column("ads", "main_image_url")
@@ -0,0 +1,41 @@
+"""server default now() for timestamps
+
+Revision ID: e8b4c2a7d615
+Revises: d7a3f5b1e942
+Create Date: 2026-10-15 18:54:37.281905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b4c2a7d615'
+down_revision: Union[str, Sequence[str], None] = 'd7a3f5b1e942'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Колонки, у которых время раньше подставлялось на стороне Python.
+# view_logs.viewed_at не трогаем: DEFAULT now() задан при партиционировании (b2d8f4a6c913)
+TIMESTAMP_COLUMNS = (
+    ("users", "registered_at"),
+    ("ads", "created_at"),
+    ("ad_images", "uploaded_at"),
+    ("favorites", "added_at"),
+    ("payments", "payment_date"),
+    ("moderators", "registered_at"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=None)
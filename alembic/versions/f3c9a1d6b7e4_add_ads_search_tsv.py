@@ -0,0 +1,42 @@
+"""add ads search tsv
+
+Revision ID: f3c9a1d6b7e4
+Revises: e8b4c2a7d615
+Create Date: 2026-10-15 19:12:08.447120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c9a1d6b7e4'
+down_revision: Union[str, Sequence[str], None] = 'e8b4c2a7d615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Генерируемая STORED-колонка (PG 12+): вектор пересчитывает сама БД, без триггера
+    op.add_column(
+        "ads",
+        sa.Column(
+            "search_tsv",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('russian', coalesce(title, '') || ' ' || coalesce(description, ''))",
+                persisted=True,
+            ),
+        ),
+    )
+    op.create_index("ads_search_tsv", "ads", ["search_tsv"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ads_search_tsv", table_name="ads")
+    op.drop_column("ads", "search_tsv")
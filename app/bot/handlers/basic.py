@@ -8,8 +8,8 @@ from collections import deque
 from whatsapp_chatbot_python import Notification
 
 from ...config import Settings
-from ..services.guard import guard_sender, chat_sender, sender_name
-from ..services.state import ensure_user, get_balance
+from ..services.guard import Allowlist, guard_sender, chat_sender, sender_name
+from ..services.state import ensure_user, ensure_user_balance
 from ..services.forms import sell_form_manager
 from ..ui.texts import START_TEXT
 from .sell import handle_sell_text
@@ -23,24 +23,21 @@ logger = logging.getLogger("app.bot.handlers.basic")
 _PROCESSED_IDS: deque[str] = deque(maxlen=500)
 
 
-def _message_text(notification: Notification) -> str:
+def _message_text(message_data: dict) -> str:
     """
     Возвращает текст сообщения вне зависимости от типа payload'а Green API.
 
     Приходит либо ``textMessageData``, либо ``extendedTextMessageData`` —
-    последовательно проверяем оба варианта и подстраховываемся пустой строкой.
+    берём первый непустой вариант цепочкой ``.get`` и подстраховываемся пустой строкой.
     """
-    message_data = notification.event.get("messageData", {})
-    text_data = message_data.get("textMessageData")
-    if text_data and text_data.get("textMessage"):
-        return text_data["textMessage"]
-    extended = message_data.get("extendedTextMessageData")
-    if extended and extended.get("text"):
-        return extended["text"]
-    return ""
+    return (
+        (message_data.get("textMessageData") or {}).get("textMessage")
+        or (message_data.get("extendedTextMessageData") or {}).get("text")
+        or ""
+    )
 
 
-def handle_start(notification: Notification, settings: Settings, allowed: set[str] | None) -> None:
+def handle_start(notification: Notification, settings: Settings, allowed: Allowlist | None) -> None:
     """Ответить на /start и зарегистрировать пользователя."""
     if not guard_sender(notification, allowed):
         return
@@ -49,7 +46,7 @@ def handle_start(notification: Notification, settings: Settings, allowed: set[st
     notification.answer(START_TEXT)
 
 
-def handle_balance(notification: Notification, settings: Settings, allowed: set[str] | None) -> None:
+def handle_balance(notification: Notification, settings: Settings, allowed: Allowlist | None) -> None:
     """
     Возвращает баланс отправителя, предварительно удостоверившись, что он зарегистрирован.
 
@@ -58,12 +55,11 @@ def handle_balance(notification: Notification, settings: Settings, allowed: set[
     if not guard_sender(notification, allowed):
         return
     sender = chat_sender(notification)
-    ensure_user(sender, sender_name(notification))
-    balance = get_balance(sender)
+    balance = ensure_user_balance(sender, sender_name(notification))
     notification.answer(f"Ваш баланс: {balance} ₽")
 
 
-def handle_fallback(notification: Notification, settings: Settings, allowed: set[str] | None) -> None:
+def handle_fallback(notification: Notification, settings: Settings, allowed: Allowlist | None) -> None:
     """
     Универсальный обработчик, который поддерживает мастер продажи и пытается распознать произвольный текст.
 
@@ -81,8 +77,8 @@ def handle_fallback(notification: Notification, settings: Settings, allowed: set
         _PROCESSED_IDS.append(msg_id)
     sender = chat_sender(notification)
     ensure_user(sender, sender_name(notification))
-    message_data = notification.event.get("messageData", {})
-    incoming = _message_text(notification)
+    message_data = notification.event.get("messageData") or {}
+    incoming = _message_text(message_data)
     normalized_input = incoming.strip().lower() if incoming else ""
     if sell_form_manager.has_state(sender):
         # Сначала проверяем, не прислал ли пользователь медиа
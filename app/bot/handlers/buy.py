@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import atexit
 import json
 import logging
 import re
+import threading
+from itertools import islice
 from pathlib import Path
 
 from whatsapp_chatbot_python import Notification
@@ -13,7 +16,6 @@ from ..services.state import (
     ensure_user,
     get_recent_public_ads,
     count_public_ads,
-    get_public_ad,
     get_public_ad_with_images,
     search_public_ads,
     filter_public_ads,
@@ -23,16 +25,24 @@ from ..services.state import (
     get_favorites,
     remove_favorite,
     is_favorite,
+    record_view,
 )
-from ..ui.buttons import BUY_MENU_BUTTONS, BUY_TEXT_TO_BUTTON, BUY_NAV_BUTTONS, BACK_MENU_BUTTON
+from ..ui.buttons import BUY_MENU_BUTTONS, BUY_TEXT_TO_BUTTON, BUY_NAV_BUTTONS, BACK_MENU_BUTTON, resolve_button
 from ..ui.texts import BUY_MENU_TEXT, BUY_PLACEHOLDER_RESPONSES
+from ..services.filter_store import FilterStore
 from ..services.keyboard import keyboard_sender
 from ..services.media import prepare_media_paths
 
 logger = logging.getLogger("app.bot.handlers.buy")
 
-# Файл для сохранения фильтров между рестартами
-_STATE_FILE = Path("state_filters.json")
+# База для сохранения фильтров между рестартами (SQLite, строка на пользователя)
+_STATE_FILE = Path("state_filters.sqlite3")
+# Старый JSON-файл со всеми фильтрами: импортируется в базу один раз
+_LEGACY_STATE_FILE = Path("state_filters.json")
+_STORES: dict[Path, FilterStore] = {}
+# Вебхуки идут из разных потоков: без блокировки два потока создали бы по хранилищу,
+# и отложенные записи «лишнего» не сбросил бы _flush_now при выходе
+_STORES_LOCK = threading.Lock()
 
 # Флаг ожидания текста поиска по пользователю
 _SEARCH_WAIT: dict[str, bool] = {}
@@ -64,13 +74,20 @@ def _new_filter_state() -> dict:
         "condition": None,
         "sort_by": "created",
         "sort_order": "desc",
+        # Курсоры keyset-пагинации: cursors[i] — последняя строка страницы i
+        "cursors": [],
     }
 
 
 def _ensure_state(sender: str) -> dict:
-    """Вернуть стейт пользователя, дополнив недостающие ключи."""
+    """Вернуть стейт пользователя, дополнив недостающие ключи.
+
+    Если в памяти стейта нет — подтягиваем сохранённый из базы.
+    """
     template = _new_filter_state()
-    state = _FILTER_STATE.setdefault(sender, template.copy())
+    state = _FILTER_STATE.get(sender)
+    if state is None:
+        state = _FILTER_STATE.setdefault(sender, _restore_filter_state(sender) or template.copy())
     for key, default in template.items():
         state.setdefault(key, default)
     return state
@@ -89,6 +106,11 @@ _CONDITION_SYNONYMS = {
     "ремонтировался": "после дтп",
 }
 
+# Числа в команде (цена/год/пробег/ID) — паттерн компилируется один раз
+_NUMBER_RE = re.compile(r"\d+")
+# «Без ограничения» для региона/состояния
+_ANY_TOKENS = frozenset({"любой", "-", "any"})
+
 _SORT_PRICE_TOKENS = {"цена", "цене", "стоимость", "price"}
 _SORT_DATE_TOKENS = {"дата", "датe", "новые", "new", "created"}
 _ASC_TOKENS = {"возрастание", "возрастанию", "дешевле", "asc", "min", "минимум"}
@@ -102,27 +124,66 @@ def _format_phone(sender: str | None) -> str:
     return sender.split("@", 1)[0]
 
 
+def _filter_store() -> FilterStore:
+    """Открыть (один раз на путь) хранилище фильтров."""
+    with _STORES_LOCK:
+        store = _STORES.get(_STATE_FILE)
+        if store is None:
+            store = _STORES[_STATE_FILE] = FilterStore(_STATE_FILE)
+        return store
+
+
+def _restore_filter_state(sender: str) -> dict | None:
+    """Прочитать сохранённые фильтры пользователя из базы."""
+    try:
+        return _filter_store().get(sender)
+    except Exception as exc:  # pragma: no cover
+        logger.warning("Не удалось загрузить состояние фильтров: %s", exc)
+        return None
+
+
 def _load_filter_state() -> None:
-    """Загрузить сохранённые фильтры с диска."""
-    if _STATE_FILE.exists():
-        try:
-            data = json.loads(_STATE_FILE.read_text(encoding="utf-8"))
-            if isinstance(data, dict):
-                _FILTER_STATE.update({k: v for k, v in data.items() if isinstance(v, dict)})
-                for sender in list(_FILTER_STATE.keys()):
-                    _ensure_state(sender)
-        except Exception as exc:  # pragma: no cover
-            logger.warning("Не удалось загрузить состояние фильтров: %s", exc)
+    """Перенести фильтры из старого JSON-файла в базу (однократно).
 
+    После импорта файл переименовывается в *.bak, чтобы следующий рестарт
+    не затёр более свежие данные из базы.
+    """
+    if not _LEGACY_STATE_FILE.exists():
+        return
+    try:
+        data = json.loads(_LEGACY_STATE_FILE.read_text(encoding="utf-8"))
+        if isinstance(data, dict):
+            states = {k: v for k, v in data.items() if isinstance(v, dict)}
+            _filter_store().put_many(states)
+            _FILTER_STATE.update(states)
+            for sender in states:
+                _ensure_state(sender)
+        _LEGACY_STATE_FILE.replace(_LEGACY_STATE_FILE.with_name(_LEGACY_STATE_FILE.name + ".bak"))
+    except Exception as exc:  # pragma: no cover
+        logger.warning("Не удалось импортировать состояние фильтров: %s", exc)
 
-def _persist_filter_state() -> None:
-    """Сохранить фильтры на диск (простая JSON-персистенция)."""
+
+def _persist_filter_state(sender: str) -> None:
+    """Поставить фильтры пользователя на отложенную запись (правки за 0.5 с сливаются)."""
+    state = _FILTER_STATE.get(sender)
+    if state is None:
+        return
     try:
-        _STATE_FILE.write_text(json.dumps(_FILTER_STATE), encoding="utf-8")
+        _filter_store().schedule(sender, state)
     except Exception as exc:  # pragma: no cover
         logger.warning("Не удалось сохранить состояние фильтров: %s", exc)
 
 
+@atexit.register
+def _flush_now() -> None:
+    """Записать отложенные фильтры немедленно (остановка процесса, тесты)."""
+    for store in list(_STORES.values()):
+        try:
+            store.flush()
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Не удалось сохранить состояние фильтров: %s", exc)
+
+
 _load_filter_state()
 
 
@@ -285,7 +346,7 @@ def handle_buy_text(notification: Notification, settings: Settings, sender: str,
         _send_catalog(notification, sender)
         return True
 
-    key = BUY_TEXT_TO_BUTTON.get(cleaned)
+    key = resolve_button(text, BUY_TEXT_TO_BUTTON)
     if not key:
         if cleaned in {"покупка", "buy"}:
             handle_buy_button(notification, settings, sender, "buy")
@@ -313,9 +374,10 @@ def _build_ad_detail(viewer: str, ad_id: int) -> tuple[str, list[Path]]:
                 ad = cached[ad_id]
                 break
 
-    # 2) пробуем взять из БД
+    # 2) пробуем взять из БД (карточка и фото одним вызовом)
+    images = None
     if not ad:
-        ad = get_public_ad(ad_id)
+        ad, images = get_public_ad_with_images(ad_id)
 
     if not ad:
         logger.info(
@@ -331,6 +393,7 @@ def _build_ad_detail(viewer: str, ad_id: int) -> tuple[str, list[Path]]:
         if not ad:
             return "Не нашёл активное объявление с таким ID.", []
     _LAST_VIEWED[viewer] = ad["id"]
+    record_view(viewer, ad["id"])
     contact_phone = _format_phone(ad.get("sender"))
     lines = [
         f"Объявление №{ad['id']}",
@@ -346,7 +409,8 @@ def _build_ad_detail(viewer: str, ad_id: int) -> tuple[str, list[Path]]:
     detail_text = "\n".join([ln for ln in lines if ln])
 
     # Попытка получить фото из БД (первые несколько изображений)
-    _ad_obj, images = get_public_ad_with_images(ad["id"])
+    if images is None:
+        _card, images = get_public_ad_with_images(ad["id"])
     media_paths = prepare_media_paths(images, limit=3)
     if not media_paths and images:
         logger.info("Нет доступных файлов для фото объявления id=%s", ad_id)
@@ -418,10 +482,8 @@ def _build_search_text(sender: str, query: str, limit: int = 5) -> str:
 def _extract_public_id(sender: str, text: str) -> int | None:
     cleaned = text.strip().lower()
     if cleaned.startswith("id"):
-        digits = re.findall(r"\d+", cleaned)
-        if digits:
-            return int(digits[0])
-        return None
+        match = _NUMBER_RE.search(cleaned)
+        return int(match.group()) if match else None
     if cleaned.isdigit():
         num = int(cleaned)
         if num <= 0:
@@ -479,8 +541,12 @@ def _render_filtered(sender: str) -> str:
     state = _ensure_state(sender)
     page = state.get("page", 0)
     size = state.get("page_size", PAGE_SIZE)
-    total = count_filtered_public_ads(state)
-    ads = filter_public_ads(state, page=page, page_size=size)
+    # Стек курсоров: всё, что глубже текущей страницы, уже неактуально
+    cursors = state["cursors"] = state["cursors"][:page]
+    after = cursors[page - 1] if page and len(cursors) == page else None
+    ads, total = filter_public_ads(state, page=page, page_size=size, after=after)
+    if ads and ads[-1].get("cursor") and len(cursors) == page:
+        cursors.append(ads[-1]["cursor"])
     _LAST_CATALOG[sender] = [ad["id"] for ad in ads]
     _LAST_DETAILS[sender] = {ad["id"]: ad for ad in ads}
     logger.info("Рендер каталога: sender=%s page=%s total=%s ids=%s", sender, page, total, _LAST_CATALOG.get(sender))
@@ -569,11 +635,12 @@ def _shift_page(sender: str, delta: int) -> None:
     state = _ensure_state(sender)
     page = state.get("page", 0) + delta
     state["page"] = max(0, page)
-    _persist_filter_state()
+    _persist_filter_state(sender)
 
 
 def _parse_range(text: str) -> tuple[int | None, int | None]:
-    numbers = [int(x) for x in re.findall(r"\d+", text)]
+    # Нужны только первые два числа — дальше строку не сканируем
+    numbers = [int(m.group()) for m in islice(_NUMBER_RE.finditer(text), 2)]
     if not numbers:
         return None, None
     if len(numbers) == 1:
@@ -586,7 +653,7 @@ def _update_price_filter(sender: str, text: str) -> str:
     state = _ensure_state(sender)
     state["min_price"], state["max_price"] = low, high
     state["page"] = 0
-    _persist_filter_state()
+    _persist_filter_state(sender)
     return _render_filtered(sender)
 
 
@@ -597,7 +664,7 @@ def _reset_filters(sender: str) -> None:
     _LAST_DETAILS.pop(sender, None)
     _LAST_VIEWED.pop(sender, None)
     _SEARCH_WAIT.pop(sender, None)
-    _persist_filter_state()
+    _persist_filter_state(sender)
 
 
 def _update_year_filter(sender: str, text: str) -> str:
@@ -612,7 +679,7 @@ def _update_year_filter(sender: str, text: str) -> str:
         state.pop("min_year", None)
         state.pop("max_year", None)
     state["page"] = 0
-    _persist_filter_state()
+    _persist_filter_state(sender)
     return _render_filtered(sender)
 
 
@@ -621,7 +688,7 @@ def _update_mileage_filter(sender: str, text: str) -> str:
     state = _ensure_state(sender)
     state["min_mileage"], state["max_mileage"] = low, high
     state["page"] = 0
-    _persist_filter_state()
+    _persist_filter_state(sender)
     return _render_filtered(sender)
 
 
@@ -637,7 +704,7 @@ def _update_brand_filter(sender: str, text: str) -> str:
     state["car_brand_id"] = brand.id
     state["brand_name"] = brand.name
     state["page"] = 0
-    _persist_filter_state()
+    _persist_filter_state(sender)
     return _render_filtered(sender)
 
 
@@ -647,20 +714,20 @@ def _update_region_filter(sender: str, text: str) -> str:
         return "Укажите регион после команды `регион`, например: `регион Грозный`."
     region = parts[1].strip()
     state = _ensure_state(sender)
-    if not region or region in {"любой", "-", "any"}:
+    if not region or region in _ANY_TOKENS:
         state["region"] = None
     else:
         if len(region) < 2:
             return "Название региона должно быть длиннее 1 символа."
         state["region"] = region.title()
     state["page"] = 0
-    _persist_filter_state()
+    _persist_filter_state(sender)
     return _render_filtered(sender)
 
 
 def _normalize_condition(value: str) -> tuple[str | None, bool]:
     cleaned = value.strip().lower()
-    if not cleaned or cleaned in {"любой", "-", "any"}:
+    if not cleaned or cleaned in _ANY_TOKENS:
         return None, True
     canonical = _CONDITION_SYNONYMS.get(cleaned)
     return canonical, canonical is not None
@@ -676,7 +743,7 @@ def _update_condition_filter(sender: str, text: str) -> str:
     state = _ensure_state(sender)
     state["condition"] = canonical
     state["page"] = 0
-    _persist_filter_state()
+    _persist_filter_state(sender)
     return _render_filtered(sender)
 
 
@@ -719,7 +786,7 @@ def _update_sorting(sender: str, text: str) -> str:
     state["sort_by"] = sort_by
     state["sort_order"] = sort_order
     state["page"] = 0
-    _persist_filter_state()
+    _persist_filter_state(sender)
     return _render_filtered(sender)
 
 
@@ -727,18 +794,10 @@ def _build_favorites_text(sender: str) -> str:
     ads = get_favorites(sender)
     if not ads:
         return "В избранном пусто. Откройте объявление и напишите `в избранное`, чтобы сохранить."
-    _LAST_CATALOG[sender] = [ad.id for ad in ads]
-    _LAST_DETAILS[sender] = {ad.id: {
-        "id": ad.id,
-        "title": ad.title,
-        "price": ad.price,
-        "year": ad.year_car,
-        "mileage": ad.mileage_km_car,
-        "sender": ad.sender,
-        "status": "активно" if ad.is_active else "в обработке",
-    } for ad in ads}
+    _LAST_CATALOG[sender] = [ad["id"] for ad in ads]
+    _LAST_DETAILS[sender] = {ad["id"]: ad for ad in ads}
     lines = ["Избранное:"]
     for idx, ad in enumerate(ads, start=1):
-        lines.append(f"{idx}. {ad.title} — {ad.price} ₽, {ad.year_car} г., {ad.mileage_km_car} км (ID {ad.id})")
+        lines.append(f"{idx}. {ad['title']} — {ad['price']} ₽, {ad['year']} г., {ad['mileage']} км (ID {ad['id']})")
     lines.append("Пришлите номер или `ID 123`, чтобы открыть карточку.")
     return "\n".join(lines)
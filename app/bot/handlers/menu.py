@@ -5,10 +5,10 @@ import logging
 from whatsapp_chatbot_python import Notification
 
 from ...config import Settings
-from ..services.guard import guard_sender, chat_sender, sender_name
+from ..services.guard import Allowlist, guard_sender, chat_sender, sender_name
 from ..services.state import ensure_user
 from ..services.forms import sell_form_manager
-from ..ui.buttons import MAIN_MENU_BUTTONS, TEXT_TO_BUTTON
+from ..ui.buttons import MAIN_MENU_BUTTONS, resolve_button
 from ..ui.texts import MAIN_MENU_TEXT
 from .profile import build_profile_text
 from .sell import send_sell_menu, handle_sell_button, handle_sell_text
@@ -18,7 +18,7 @@ from ..services.keyboard import keyboard_sender
 logger = logging.getLogger("app.bot.handlers.menu")
 
 
-def handle_main_menu(notification: Notification, settings: Settings, allowed: set[str] | None) -> None:
+def handle_main_menu(notification: Notification, settings: Settings, allowed: Allowlist | None) -> None:
     """Показать базовое меню (профиль/продажа/покупка)."""
     if not guard_sender(notification, allowed):
         return
@@ -44,7 +44,7 @@ def handle_main_menu(notification: Notification, settings: Settings, allowed: se
         logger.debug("Главное меню отправлено для %s", sender)
 
 
-def handle_menu_selection(notification: Notification, settings: Settings, allowed: set[str] | None) -> None:
+def handle_menu_selection(notification: Notification, settings: Settings, allowed: Allowlist | None) -> None:
     """Обработчик reply-кнопок основного меню."""
     if not guard_sender(notification, allowed):
         return
@@ -62,7 +62,7 @@ def handle_menu_selection(notification: Notification, settings: Settings, allowe
     _dispatch_button(notification, settings, allowed, button_id)
 
 
-def handle_menu_text(notification: Notification, settings: Settings, allowed: set[str] | None) -> None:
+def handle_menu_text(notification: Notification, settings: Settings, allowed: Allowlist | None) -> None:
     """Обработать текстовые команды, соответствующие кнопкам."""
     if not guard_sender(notification, allowed):
         return
@@ -72,8 +72,7 @@ def handle_menu_text(notification: Notification, settings: Settings, allowed: se
     sender = chat_sender(notification)
     ensure_user(sender, sender_name(notification))
 
-    normalized = text.strip().lower()
-    key = TEXT_TO_BUTTON.get(normalized)
+    key = resolve_button(text)
     if key:
         _dispatch_button(notification, settings, allowed, key)
         return
@@ -83,7 +82,7 @@ def handle_menu_text(notification: Notification, settings: Settings, allowed: se
         return
 
 
-def _dispatch_button(notification: Notification, settings: Settings, allowed: set[str] | None, button_id: str) -> None:
+def _dispatch_button(notification: Notification, settings: Settings, allowed: Allowlist | None, button_id: str) -> None:
     sender = chat_sender(notification)
     ensure_user(sender, sender_name(notification))
     if button_id == "profile":
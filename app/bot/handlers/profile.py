@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from ..services.state import get_user, get_balance, get_favorites
+from ..services.state import get_profile
 
 
 def build_profile_text(sender: str) -> str:
     """Сформировать строку профиля пользователя."""
-    user = get_user(sender)
+    user, balance, favorites = get_profile(sender)
     if not user:
         return "Профиль не найден."
     username = user.username or "Не указано"
@@ -18,15 +18,14 @@ def build_profile_text(sender: str) -> str:
         "Профиль",
         f"ID: {sender}",
         f"Имя: {username}",
-        f"Баланс: {get_balance(sender)} ₽",
+        f"Баланс: {balance} ₽",
         f"Регистрация: {registered}",
     ]
-    favorites = get_favorites(sender)
     if favorites:
         lines.append("")
         lines.append(f"Избранное: {len(favorites)} объявлений.")
         for ad in favorites[:3]:
-            lines.append(f"• ID {ad.id}: {ad.title} — {ad.price} ₽")
+            lines.append(f"• ID {ad['id']}: {ad['title']} — {ad['price']} ₽")
         lines.append("Напиши `ID 123`, чтобы открыть карточку, или открой `Покупка → Избранное`.")
     else:
         lines.append("")
@@ -11,7 +11,7 @@ from ...config import Settings
 from ..services.guard import sender_name
 from ..services.state import ensure_user, get_ads_preview, get_ad_with_images
 from ..services.forms import sell_form_manager
-from ..ui.buttons import SELL_MENU_BUTTONS, SELL_TEXT_TO_BUTTON, BACK_MENU_BUTTON
+from ..ui.buttons import SELL_MENU_BUTTONS, SELL_TEXT_TO_BUTTON, BACK_MENU_BUTTON, resolve_button
 from ..ui.texts import SELL_MENU_TEXT
 from ..services.keyboard import keyboard_sender
 from ..services.media import prepare_media_paths
@@ -59,7 +59,7 @@ def handle_sell_text(notification: Notification, settings: Settings, sender: str
     if detail_id is not None:
         _send_ad_detail(notification, sender, detail_id)
         return True
-    key = SELL_TEXT_TO_BUTTON.get(text.strip().lower())
+    key = resolve_button(text, SELL_TEXT_TO_BUTTON)
     if not key:
         return False
     handle_sell_button(notification, settings, sender, key)
@@ -74,8 +74,9 @@ def _sell_list_text(sender: str) -> str:
     _LAST_SUMMARIES[sender] = [item["id"] for item in summary]
     lines = [f"Твои объявления: {total} шт. (активных {active})."]
     for idx, item in enumerate(summary, start=1):
+        title = item["title"] or f"Объявление №{item['id']}"
         lines.append(
-            f"{idx}. {item['title']} — {item['price']} ₽ ({item['status']}) ID {item['id']}"
+            f"{idx}. {title} — {item['price'] or 0} ₽ ({item['status']}) ID {item['id']}"
         )
     if total > len(summary):
         lines.append("Показаны последние объявления. Напиши номер из списка (например, `1`) или `ID 123`, чтобы открыть карточку.")
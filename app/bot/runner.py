@@ -15,6 +15,8 @@ from .handlers import (
     handle_menu_selection,
     handle_menu_text,
 )
+from .services.guard import Allowlist
+from .services.janitor import start_media_janitor
 from .services.state import init_background_loop
 
 
@@ -29,6 +31,7 @@ def create_bot(settings: Settings | None = None) -> GreenAPIBot:
     """
     settings = settings or get_settings()
     init_background_loop()
+    start_media_janitor()
 
     bot = GreenAPIBot(
         settings.id_instance,
@@ -37,7 +40,7 @@ def create_bot(settings: Settings | None = None) -> GreenAPIBot:
         bot_debug_mode=True,
     )
 
-    allowed = settings.allowed_senders
+    allowed = Allowlist.from_senders(settings.allowed_senders)
 
     def wrap(handler):
         """Пробрасывает в каждый хендлер общие настройки и whitelist отправителей."""
@@ -1,4 +1,4 @@
-from .guard import guard_sender, chat_sender, sender_name, is_sender_allowed
+from .guard import Allowlist, guard_sender, chat_sender, sender_name, is_sender_allowed
 from .state import (
     ensure_user,
     get_balance,
@@ -11,6 +11,7 @@ from .state import (
 from .forms import sell_form_manager
 
 __all__ = [
+    "Allowlist",
     "guard_sender",
     "chat_sender",
     "sender_name",
@@ -0,0 +1,104 @@
+"""Хранилище фильтров покупки: SQLite в режиме WAL, одна строка на пользователя."""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+logger = logging.getLogger("app.bot.services.filter_store")
+
+
+class FilterStore:
+    """Фильтры пользователей между рестартами.
+
+    Изменение фильтра одного пользователя — один UPSERT его строки,
+    а не перезапись файла со всеми пользователями. Соединение открывается
+    один раз и делится между потоками вебхуков под блокировкой.
+
+    ``schedule`` откладывает запись на ``delay`` секунд: серия правок за это
+    время (листание, несколько фильтров подряд) уходит одной транзакцией.
+    """
+
+    def __init__(self, path: Path, delay: float = 0.5) -> None:
+        self.path = path
+        self.delay = delay
+        self._dirty: dict[str, str] = {}
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS filter_state "
+                "(sender TEXT PRIMARY KEY, state_json TEXT NOT NULL)"
+            )
+
+    def get(self, sender: str) -> dict | None:
+        """Вернуть сохранённые фильтры пользователя или None."""
+        with self._lock:
+            raw = self._dirty.get(sender)
+            if raw is None:
+                row = self._conn.execute(
+                    "SELECT state_json FROM filter_state WHERE sender = ?", (sender,)
+                ).fetchone()
+                raw = row[0] if row else None
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return data if isinstance(data, dict) else None
+
+    def put(self, sender: str, state: dict) -> None:
+        """Сохранить фильтры пользователя."""
+        self.put_many({sender: state})
+
+    def put_many(self, states: dict[str, dict]) -> None:
+        """Сохранить фильтры нескольких пользователей одной транзакцией."""
+        rows = [(sender, json.dumps(state)) for sender, state in states.items()]
+        with self._lock:
+            for sender, _raw in rows:
+                self._dirty.pop(sender, None)
+            self._write(rows)
+
+    def schedule(self, sender: str, state: dict) -> None:
+        """Отложить сохранение фильтров пользователя (снимок берётся сейчас)."""
+        raw = json.dumps(state)
+        with self._lock:
+            self._dirty[sender] = raw
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self._flush_logged)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Записать все отложенные изменения сразу."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            rows, self._dirty = list(self._dirty.items()), {}
+            if rows:
+                self._write(rows)
+
+    def _flush_logged(self) -> None:
+        try:
+            self.flush()
+        except Exception:  # pragma: no cover
+            logger.exception("Не удалось сохранить состояние фильтров")
+
+    def _write(self, rows: list[tuple[str, str]]) -> None:
+        # Вызывается под self._lock
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO filter_state (sender, state_json) VALUES (?, ?) "
+                "ON CONFLICT(sender) DO UPDATE SET state_json = excluded.state_json",
+                rows,
+            )
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
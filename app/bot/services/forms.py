@@ -1,20 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from typing import Dict
 from datetime import datetime
 from pathlib import Path
+import json
 import logging
+import threading
+import time
 import uuid
 
-import requests
-
+from .http import http_session
+from .media import dated_subdir
 from .state import create_ad_from_form
 
 CANCEL_WORDS = {"отмена", "cancel", "стоп", "stop", "меню", "menu"}
 MEDIA_MESSAGE_TYPES = {"imageMessage", "documentMessage"}
 MAX_PHOTOS = 3
 POSTGRES_INT_MAX = 2_147_483_647
+# Незаконченный мастер живёт 30 минут с последнего ответа
+SELL_FORM_TTL = 30 * 60
 
 logger = logging.getLogger("app.bot.forms")
 
@@ -22,6 +27,9 @@ logger = logging.getLogger("app.bot.forms")
 UPLOAD_DIR = Path("media/uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Файл для сохранения незавершённых мастеров между рестартами
+_STATE_FILE = Path("state_sell_forms.json")
+
 
 @dataclass
 class SellFormState:
@@ -30,19 +38,101 @@ class SellFormState:
     step_index: int = 0
     data: dict = field(default_factory=dict)
     photos: list[str] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+    def reset(self) -> None:
+        """Очистить стейт для повторного использования."""
+        self.step_index = 0
+        self.data.clear()
+        self.photos.clear()
+        self.updated_at = time.time()
 
 
 class SellFormManager:
-    """Простейшее состояние мастера продажи."""
+    """
+    Состояние мастера продажи.
+
+    Держит стейты в памяти и сохраняет их в JSON-файл после каждого шага,
+    чтобы рестарт бота не обрывал заполнение объявления. Отработавшие
+    ``SellFormState`` складываются в небольшой пул и переиспользуются.
+    """
+
+    _POOL_MAXSIZE = 64
 
-    def __init__(self) -> None:
+    def __init__(self, state_file: Path | None = None) -> None:
+        self._state_file = state_file or _STATE_FILE
         self._states: Dict[str, SellFormState] = {}
         self._recently_finished: set[str] = set()
+        self._pool: list[SellFormState] = []
+        self._pool_lock = threading.Lock()
+        # Вебхуки приходят из разных потоков: изменения self._states, снимок
+        # и запись файла идут под одной блокировкой (как в FilterStore)
+        self._states_lock = threading.Lock()
+        self._load()
+
+    def _acquire(self) -> SellFormState:
+        """Взять чистый стейт из пула или создать новый."""
+        with self._pool_lock:
+            if self._pool:
+                state = self._pool.pop()
+                state.reset()
+                return state
+        return SellFormState()
+
+    def _release(self, state: SellFormState) -> None:
+        """Вернуть стейт в пул (если там есть место)."""
+        with self._pool_lock:
+            if len(self._pool) < self._POOL_MAXSIZE:
+                self._pool.append(state)
+
+    def _load(self) -> None:
+        """Поднять незавершённые мастера с диска, отбросив просроченные."""
+        if not self._state_file.exists():
+            return
+        try:
+            data = json.loads(self._state_file.read_text(encoding="utf-8"))
+            deadline = time.time() - SELL_FORM_TTL
+            for sender, raw in data.items():
+                state = SellFormState(**raw)
+                if state.updated_at >= deadline:
+                    self._states[sender] = state
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Не удалось загрузить состояние мастера продажи: %s", exc)
+
+    def _persist(self) -> None:
+        """Сохранить стейты на диск (атомарная замена файла)."""
+        try:
+            with self._states_lock:
+                payload = {sender: asdict(state) for sender, state in self._states.items()}
+                tmp = self._state_file.with_suffix(".tmp")
+                tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+                tmp.replace(self._state_file)
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Не удалось сохранить состояние мастера продажи: %s", exc)
+
+    def _get(self, sender: str) -> SellFormState | None:
+        """Вернуть живой стейт пользователя; просроченный — сбросить."""
+        state = self._states.get(sender)
+        if state is None:
+            return None
+        if time.time() - state.updated_at > SELL_FORM_TTL:
+            self.cancel(sender)
+            return None
+        return state
+
+    def _touch(self, state: SellFormState) -> None:
+        state.updated_at = time.time()
+        self._persist()
 
     def start(self, sender: str) -> str:
         """Создать состояние и вернуть первый вопрос."""
-        state = SellFormState()
-        self._states[sender] = state
+        state = self._acquire()
+        with self._states_lock:
+            previous = self._states.get(sender)
+            self._states[sender] = state
+        if previous is not None:
+            self._release(previous)
+        self._persist()
         return (
             "Запускаем оформление продажи. Можно написать `отмена`, чтобы выйти.\n"
             f"{SELL_FORM_STEPS[0]['prompt']}"
@@ -50,15 +140,20 @@ class SellFormManager:
 
     def cancel(self, sender: str) -> None:
         """Сбросить мастер."""
-        self._states.pop(sender, None)
+        with self._states_lock:
+            state = self._states.pop(sender, None)
+        if state is not None:
+            self._persist()
+            self._release(state)
 
     def has_state(self, sender: str) -> bool:
         """Есть ли активный мастер у пользователя."""
-        return sender in self._states
+        return self._get(sender) is not None
 
     def handle(self, sender: str, message: str | None) -> str:
         """Обработать текстовые ответы."""
-        if sender not in self._states:
+        state = self._get(sender)
+        if state is None:
             return ""
         if not message:
             return "Нужно ответить текстом. Повтори, пожалуйста."
@@ -68,7 +163,6 @@ class SellFormManager:
             self.cancel(sender)
             return "Окей, отменили создание объявления. Напиши `меню`, чтобы вернуться в главное меню."
 
-        state = self._states[sender]
         step = SELL_FORM_STEPS[state.step_index]
         if step.get("type") == "photos":
             if text.lower() in {"готово", "done"}:
@@ -105,6 +199,7 @@ class SellFormManager:
                     "Чтобы вернуться в меню, нажми кнопку «⬅️ В меню» или напиши `меню`."
                 )
 
+        self._touch(state)
         next_prompt = SELL_FORM_STEPS[state.step_index]["prompt"]
         return next_prompt
 
@@ -117,7 +212,7 @@ class SellFormManager:
 
     def handle_media(self, sender: str, message_data: dict) -> str:
         """Сохранить фото, если мастер ждёт вложение."""
-        state = self._states.get(sender)
+        state = self._get(sender)
         if not state:
             return ""
         step = SELL_FORM_STEPS[state.step_index]
@@ -137,7 +232,9 @@ class SellFormManager:
         if len(state.photos) >= MAX_PHOTOS:
             state.data["photos"] = list(state.photos)
             state.step_index += 1
+            self._touch(state)
             return "Достаточно фото, напиши `готово` для завершения."
+        self._touch(state)
         return f"Фото сохранено ({len(state.photos)}). Отправь ещё или напиши `готово`."
 
 sell_form_manager = SellFormManager()
@@ -151,10 +248,17 @@ def _validate_text(value: str, field_name: str, min_length: int = 3) -> str:
     return cleaned
 
 
+# Пробелы-разделители разрядов, включая неразрывные (часто вставляют с сайтов)
+_DIGIT_STRIP = str.maketrans("", "", " \u00a0\u202f")
+
+
 def _validate_price(value: str) -> int:
     """Преобразовать цену в int и проверить допустимый диапазон."""
+    digits = value.translate(_DIGIT_STRIP)
+    if not digits:
+        raise ValueError("Цена должна быть числом")
     try:
-        price = int(value.replace(" ", ""))
+        price = int(digits)
     except ValueError:
         raise ValueError("Цена должна быть числом")
     if price <= 0:
@@ -164,22 +268,36 @@ def _validate_price(value: str) -> int:
     return price
 
 
+# Верхняя граница года выпуска и момент её расчёта (обновляем раз в час)
+_YEAR_CACHE: list = [0, 0.0]
+
+
+def _max_year() -> int:
+    """Текущий год + 1, пересчитывается не чаще раза в час."""
+    now = time.time()
+    if now - _YEAR_CACHE[1] > 3600:
+        _YEAR_CACHE[:] = [datetime.utcnow().year + 1, now]
+    return _YEAR_CACHE[0]
+
+
 def _validate_year(value: str) -> int:
     """Проверить, что год в разумных пределах."""
     try:
         year = int(value)
     except ValueError:
         raise ValueError("Год должен быть числом")
-    current_year = datetime.utcnow().year + 1
-    if not (1950 <= year <= current_year):
+    if not (1950 <= year <= _max_year()):
         raise ValueError("Год вне допустимого диапазона")
     return year
 
 
 def _validate_mileage(value: str) -> int:
     """Парсинг пробега."""
+    digits = value.translate(_DIGIT_STRIP)
+    if not digits:
+        raise ValueError("Пробег должен быть числом")
     try:
-        mileage = int(value.replace(" ", ""))
+        mileage = int(digits)
     except ValueError:
         raise ValueError("Пробег должен быть числом")
     if mileage < 0:
@@ -237,11 +355,12 @@ def _extract_media(message_data: dict) -> tuple[str | None, str | None]:
 
 def _save_media(url: str, filename: str | None, sender: str) -> Path:
     """Скачать файл и сохранить в локальную папку uploads."""
-    response = requests.get(url, timeout=30)
+    response = http_session.get(url, timeout=30)
     response.raise_for_status()
     ext = Path(filename).suffix if filename else ".jpg"
     clean_ext = ext if ext else ".jpg"
-    new_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex}{clean_ext}"
-    path = UPLOAD_DIR / new_name
+    now = datetime.utcnow()
+    new_name = f"{now.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex}{clean_ext}"
+    path = dated_subdir(UPLOAD_DIR, now) / new_name
     path.write_bytes(response.content)
     return path
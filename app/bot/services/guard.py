@@ -1,12 +1,35 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
 
 from whatsapp_chatbot_python import Notification
 
 logger = logging.getLogger("app.bot.guard")
 
 
+@dataclass(frozen=True, slots=True)
+class Allowlist:
+    """
+    Белый список отправителей, разложенный на два индекса.
+
+    ``full`` — записи целиком (``79...@c.us`` или просто номер), ``local`` — записи без
+    домена, с которыми сравнивается номер отправителя до ``@``.
+    """
+
+    full: frozenset[str]
+    local: frozenset[str]
+
+    @classmethod
+    def from_senders(cls, senders: Iterable[str] | None) -> Allowlist | None:
+        """Собрать белый список из ALLOWED_SENDERS; None — ограничений нет."""
+        if not senders:
+            return None
+        full = frozenset(senders)
+        return cls(full=full, local=frozenset(item for item in full if "@" not in item))
+
+
 def chat_sender(notification: Notification) -> str:
     """Извлечь chatId/sender из уведомления."""
     sender_data = notification.event.get("senderData", {}) or {}
@@ -23,22 +46,19 @@ def sender_name(notification: Notification) -> str | None:
     )
 
 
-def is_sender_allowed(sender: str, allowed: set[str] | None) -> bool:
+def is_sender_allowed(sender: str, allowed: Allowlist | None) -> bool:
     """
     Проверить, входит ли отправитель в белый список ALLOWED_SENDERS.
 
     :param sender: значение вида 79...@c.us
-    :param allowed: множество разрешённых отправителей или None
+    :param allowed: предрассчитанный белый список или None
     """
-    if not allowed:
+    if allowed is None:
         return True
-    if sender in allowed:
-        return True
-    local_part = sender.split("@", 1)[0]
-    return local_part in allowed
+    return sender in allowed.full or sender.partition("@")[0] in allowed.local
 
 
-def guard_sender(notification: Notification, allowed: set[str] | None) -> bool:
+def guard_sender(notification: Notification, allowed: Allowlist | None) -> bool:
     """
     Быстро выйти из обработчика, если сообщение пришло от неразрешённого чата.
     """
@@ -48,5 +68,7 @@ def guard_sender(notification: Notification, allowed: set[str] | None) -> bool:
         return False
     if is_sender_allowed(sender, allowed):
         return True
-    logger.info("Игнорируем сообщение от %s — вне списка ALLOWED_SENDERS=%s.", sender, allowed)
+    logger.info(
+        "Игнорируем сообщение от %s — вне списка ALLOWED_SENDERS=%s.", sender, sorted(allowed.full)
+    )
     return False
@@ -0,0 +1,93 @@
+"""Периодическая очистка media/cache и «осиротевших» файлов в media/uploads,
+заодно — партиция view_logs на следующий месяц."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+from ...database.crude import crud_manager
+from .forms import UPLOAD_DIR
+from .media import _CACHE_DIR
+from .state import db_runner
+
+logger = logging.getLogger("app.bot.services.janitor")
+
+JANITOR_INTERVAL = 60 * 60  # раз в час
+CACHE_TTL = 24 * 60 * 60  # скачанные фото живут сутки
+UPLOAD_ORPHAN_TTL = 7 * 24 * 60 * 60  # незавершённые загрузки мастера продажи — неделя
+
+_started = False
+
+
+def _files_older_than(directory: Path, deadline: float) -> list[Path]:
+    """Файлы каталога (включая подкаталоги по датам), не менявшиеся с момента ``deadline``."""
+    stale: list[Path] = []
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = os.scandir(current)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(Path(entry.path))
+                elif entry.is_file() and entry.stat().st_mtime < deadline:
+                    stale.append(Path(entry.path))
+    return stale
+
+
+def _unlink_all(paths: list[Path]) -> int:
+    for path in paths:
+        path.unlink(missing_ok=True)
+    return len(paths)
+
+
+async def cleanup_media(now: float | None = None) -> tuple[int, int]:
+    """
+    Удалить устаревший кеш и загрузки, на которые не ссылается ни одно объявление.
+
+    :return: (удалено из кеша, удалено из uploads)
+    """
+    now = now or time.time()
+    stale_cache = await db_runner.offload(_files_older_than, _CACHE_DIR, now - CACHE_TTL)
+    removed_cache = await db_runner.offload(_unlink_all, stale_cache)
+
+    stale_uploads = await db_runner.offload(_files_older_than, UPLOAD_DIR, now - UPLOAD_ORPHAN_TTL)
+    removed_uploads = 0
+    if stale_uploads:
+        referenced = await crud_manager.car_image.get_existing_urls([str(p) for p in stale_uploads])
+        orphans = [p for p in stale_uploads if str(p) not in referenced]
+        removed_uploads = await db_runner.offload(_unlink_all, orphans)
+    return removed_cache, removed_uploads
+
+
+async def _janitor_loop() -> None:
+    while True:
+        await asyncio.sleep(JANITOR_INTERVAL)
+        try:
+            # Иначе с наступлением месяца просмотры копились бы в view_logs_default
+            await crud_manager.view.create_next_partition()
+        except Exception:  # noqa: BLE001
+            logger.exception("Не удалось создать партицию view_logs")
+        try:
+            removed_cache, removed_uploads = await cleanup_media()
+        except Exception:  # noqa: BLE001
+            logger.exception("Очистка media не удалась")
+            continue
+        if removed_cache or removed_uploads:
+            logger.info("Очистка media: cache=%s uploads=%s", removed_cache, removed_uploads)
+
+
+def start_media_janitor() -> None:
+    """Запустить фоновую очистку на loop DBRunner (повторный вызов ничего не делает)."""
+    global _started
+    if _started:
+        return
+    _started = True
+    asyncio.run_coroutine_threadsafe(_janitor_loop(), db_runner.loop)
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 from typing import Iterable, Sequence
 
+import json
 import logging
-import requests
 
 from ...config import get_settings
+from .http import http_session
 
 
 class WhatsKeyboardClient:
@@ -15,6 +16,12 @@ class WhatsKeyboardClient:
         self.base_url = base_url.rstrip("/")
         self.api_token = api_token
         self.id_instance = id_instance
+        self._url = (
+            f"{self.base_url}"
+            f"/waInstance{self.id_instance}"
+            f"/sendInteractiveButtonsReply/{self.api_token}"
+        )
+        self._headers = {"Content-Type": "application/json; charset=utf-8"}
 
     def __call__(
         self,
@@ -34,21 +41,21 @@ class WhatsKeyboardClient:
         if footer:
             payload["footer"] = footer
 
-        url = (
-            f"{self.base_url}"
-            f"/waInstance{self.id_instance}"
-            f"/sendInteractiveButtonsReply/{self.api_token}"
-        )
-        resp = requests.post(
-            url=url,
-            headers={"Content-Type": "application/json"},
-            json=payload,
+        resp = http_session.post(
+            url=self._url,
+            headers=self._headers,
+            data=self._encode(payload),
             timeout=10,
         )
         logging.debug("WA keyboard response: %s %s", resp.status_code, resp.text)
         resp.raise_for_status()
         return resp.json()
 
+    @staticmethod
+    def _encode(payload: dict) -> bytes:
+        """Компактный JSON в UTF-8: кириллица без \\uXXXX-экранирования и без пробелов."""
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
     @staticmethod
     def _build_buttons(buttons: Iterable[str | dict]) -> list[dict]:
         built: list[dict] = []
@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import logging
 import uuid
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, Any
 from urllib.parse import urlparse
 
-import requests
+from .http import http_session
 
 logger = logging.getLogger("app.bot.services.media")
 
@@ -14,6 +16,22 @@ _CACHE_DIR = Path("media/cache")
 _CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 
+@lru_cache(maxsize=64)
+def _ensure_subdir(root: Path, date_key: str) -> Path:
+    subdir = root / date_key
+    subdir.mkdir(parents=True, exist_ok=True)
+    return subdir
+
+
+def dated_subdir(root: Path, now: datetime | None = None) -> Path:
+    """
+    Вернуть подкаталог ``root/YYYY/MM/DD`` для новых файлов, создав его при необходимости.
+    Так в одном каталоге не копятся сотни тысяч файлов.
+    """
+    now = now or datetime.utcnow()
+    return _ensure_subdir(root, f"{now:%Y/%m/%d}")
+
+
 def prepare_media_paths(items: Iterable[Any], limit: int | None = None) -> list[Path]:
     """
     Преобразовать список ORM-объектов/путей/URL в существующие файлы.
@@ -59,7 +77,7 @@ def _resolve_path(raw: str) -> Path | None:
 def _download_remote(url: str) -> Path | None:
     """Скачать внешний файл и сохранить в кеше."""
     try:
-        response = requests.get(url, timeout=20)
+        response = http_session.get(url, timeout=20)
         response.raise_for_status()
     except Exception as exc:  # noqa: BLE001
         logger.warning("Не удалось скачать фото %s: %s", url, exc)
@@ -67,6 +85,6 @@ def _download_remote(url: str) -> Path | None:
     parsed = urlparse(url)
     suffix = Path(parsed.path).suffix or ".jpg"
     filename = f"{uuid.uuid4().hex}{suffix}"
-    target = _CACHE_DIR / filename
+    target = dated_subdir(_CACHE_DIR) / filename
     target.write_bytes(response.content)
     return target
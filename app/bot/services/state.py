@@ -1,190 +1,433 @@
 from __future__ import annotations
 
 import asyncio
+import atexit
+import logging
 import threading
-from typing import Awaitable
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Coroutine, Hashable, TypeVar
 
 from ...database.crude import crud_manager
 from ...database.db import init_db
 
+try:  # uvloop нет под Windows — там остаётся стандартный asyncio
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
+
+T = TypeVar("T")
+
+logger = logging.getLogger("app.bot.services.state")
+
 
 class DBRunner:
     """Выполняет async-корутины в отдельном event loop.
 
     SQLAlchemy async engine не любит постоянное создание/закрытие event loop,
     поэтому этот helper живёт в отдельном потоке и принимает задачи через
-    `run`, возвращая результат синхронно.
+    `run`, возвращая результат синхронно. Блокирующий файловый ввод-вывод
+    внутри корутин уходит в отдельный пул через `offload`, чтобы не тормозить
+    запросы к БД на том же loop.
+
+    Одинаковые запросы, пришедшие одновременно из разных потоков
+    (всплеск вебхуков от одного пользователя), схлопываются по ``key``:
+    второй вызов ждёт уже запущенную задачу вместо повторного похода в БД.
     """
 
     def __init__(self) -> None:
-        self.loop = asyncio.new_event_loop()
+        self.loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+        self.io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="db-runner-io")
+        self._inflight: dict[Hashable, Future] = {}
+        self._inflight_lock = threading.RLock()
         threading.Thread(target=self._run_loop, daemon=True).start()
 
     def _run_loop(self) -> None:
         asyncio.set_event_loop(self.loop)
         self.loop.run_forever()
 
-    def run(self, coro: Awaitable):
-        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+    def run(self, coro: Coroutine, key: Hashable | None = None):
+        """
+        Выполнить корутину в loop'е раннера и дождаться результата.
+
+        :param coro: корутина для выполнения.
+        :param key: ключ single-flight; если задача с таким ключом уже
+            выполняется, её результат переиспользуется, а ``coro`` закрывается.
+        :return: результат корутины.
+        """
+        if key is None:
+            return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+                self._inflight[key] = future
+                future.add_done_callback(lambda _f: self._forget(key, _f))
+            else:
+                coro.close()
+        return future.result()
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def offload(self, func: Callable[..., T], *args) -> T:
+        """Выполнить блокирующую функцию (запись/удаление файлов) вне event loop."""
+        return await self.loop.run_in_executor(self.io_pool, func, *args)
 
 
 db_runner = DBRunner()
 
 
+class _ViewBuffer:
+    """Копит просмотры объявлений и пишет их в БД пачками.
+
+    ``record`` можно звать из любого потока: он только ставит строку в очередь
+    loop'а раннера и сразу возвращается. Пачка уходит одним COPY, когда набралось
+    ``max_batch`` строк или прошло ``interval`` секунд с первой строки.
+    Всё состояние трогается только из loop'а, поэтому блокировки не нужны.
+    При остановке процесса ``flush`` дописывает хвост очереди.
+    """
+
+    def __init__(self, runner: DBRunner, max_batch: int = 500, interval: float = 0.25) -> None:
+        self.runner = runner
+        self.max_batch = max_batch
+        self.interval = interval
+        self._pending: list[tuple[int, str, datetime]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def record(self, ad_id: int, sender: str) -> None:
+        """Поставить просмотр в очередь (fire-and-forget)."""
+        row = (ad_id, sender, datetime.now(timezone.utc))
+        self.runner.loop.call_soon_threadsafe(self._put, row)
+
+    def _put(self, row: tuple[int, str, datetime]) -> None:
+        self._pending.append(row)
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = self.runner.loop.call_later(self.interval, self._schedule_flush)
+
+    def _schedule_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self.runner.loop.create_task(self._flush(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self) -> None:
+        self._schedule_flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def flush(self, timeout: float = 5) -> None:
+        """Записать всё накопленное и дождаться пачек в полёте (из любого потока)."""
+        asyncio.run_coroutine_threadsafe(self._drain(), self.runner.loop).result(timeout)
+
+    async def _flush(self, batch: list[tuple[int, str, datetime]]) -> None:
+        try:
+            await crud_manager.view.add_many(batch)
+        except Exception:
+            # Просмотры — аналитика: потеря пачки не должна ронять бота
+            logger.exception("Не удалось записать %s просмотров", len(batch))
+
+
+_view_buffer = _ViewBuffer(db_runner)
+
+
+@atexit.register
+def _flush_views_on_exit() -> None:
+    try:
+        _view_buffer.flush()
+    except Exception:  # pragma: no cover
+        logger.exception("Не удалось дописать просмотры при остановке")
+
+
+_MISSING = object()
+
+
+class _TTLCache:
+    """Небольшой кеш read-only запросов с TTL.
+
+    Используется только внутри корутин, то есть всегда из потока DBRunner,
+    поэтому обходится без блокировок. ``ttl=None`` — хранить до явной инвалидации.
+    """
+
+    def __init__(self, ttl: float | None, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: dict[Any, tuple[float, Any]] = {}
+
+    def get(self, key: Any) -> Any:
+        """Вернуть значение или ``_MISSING``, если его нет/истёк срок."""
+        item = self._data.get(key)
+        if item is None:
+            return _MISSING
+        stored_at, value = item
+        if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+            del self._data[key]
+            return _MISSING
+        return value
+
+    def set(self, key: Any, value: Any) -> None:
+        if key not in self._data and len(self._data) >= self.maxsize:
+            self._data.pop(next(iter(self._data)))
+        self._data[key] = (time.monotonic(), value)
+
+    def pop(self, key: Any) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+# Пользователь дёргается несколькими хендлерами на каждое сообщение
+_user_cache = _TTLCache(ttl=5)
+# Марки меняются только при создании объявления — инвалидируем вручную
+_brand_cache = _TTLCache(ttl=None)
+# Счётчик витрины: сбрасываем при создании объявления
+_count_cache = _TTLCache(ttl=5)
+# COUNT(*) под конкретный набор фильтров — одинаков для всех страниц каталога
+_filtered_count_cache = _TTLCache(ttl=30)
+
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
 def init_background_loop() -> None:
-    """Создать таблицы и подготовить event loop при старте приложения."""
-    db_runner.run(init_db())
+    """Создать таблицы и подготовить event loop при старте приложения.
+
+    Повторные вызовы (перезапуск бота в том же процессе, повторный импорт)
+    ничего не делают — ``init_db`` выполняется ровно один раз.
+    """
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        db_runner.run(init_db())
+        db_runner.run(_warm_brand_cache())
+        _initialized = True
 
 
-async def _ensure_user(sender: str, username: str | None) -> None:
+async def _warm_brand_cache() -> None:
+    """Загрузить справочник марок в кеш: он маленький, а нужен при каждом объявлении."""
+    for brand in await crud_manager.car_brand.get_all():
+        _brand_cache.set(brand.name.lower(), brand)
+
+
+async def _ensure_user(sender: str, username: str | None, crud=None) -> None:
     """Асинхронно создать пользователя, если он ещё не существует."""
-    await crud_manager.user.add(sender=sender, username=username)
+    cached = _user_cache.get(sender)
+    if cached is not _MISSING and cached is not None:
+        return
+    user = await (crud or crud_manager).user.add(sender=sender, username=username)
+    _user_cache.set(sender, user)
 
 
-async def _get_balance(sender: str) -> int:
-    """Асинхронно получить баланс пользователя."""
-    user = await crud_manager.user.get_by_sender(sender)
-    return user.balance if user else 0
+async def _get_balance(sender: str, crud=None) -> int:
+    """Асинхронно получить баланс пользователя (всегда свежий, мимо кеша)."""
+    return (await (crud or crud_manager).user.get_balance_scalar(sender)) or 0
 
 
-async def _get_user(sender: str):
+async def _get_user(sender: str, crud=None):
     """Асинхронно вернуть объект пользователя или None."""
-    return await crud_manager.user.get_by_sender(sender)
+    user = _user_cache.get(sender)
+    if user is _MISSING:
+        user = await (crud or crud_manager).user.get_by_sender(sender)
+        _user_cache.set(sender, user)
+    return user
+
+
+async def _ensure_user_balance(sender: str, username: str | None) -> int:
+    """Регистрация (если нужно) и чтение баланса на одной сессии."""
+    async with crud_manager.transaction() as crud:
+        await _ensure_user(sender, username, crud)
+        return await _get_balance(sender, crud)
+
+
+async def _get_profile(sender: str):
+    """Пользователь, баланс и избранное для экрана профиля.
+
+    Чтения независимы, поэтому идут параллельно — каждое на своей сессии из пула
+    (одна AsyncSession не выполняет запросы одновременно).
+    """
+    user, balance, rows = await asyncio.gather(
+        _get_user(sender),
+        _get_balance(sender),
+        crud_manager.favorite.get_active_summaries(sender),
+    )
+    if not user:
+        return None, 0, []
+    return user, balance, [_summarize_ad(row) for row in rows]
+
+
+def _summarize_ad(row) -> dict:
+    """
+    Карточка объявления для списков.
+
+    Принимает строку ``SUMMARY_COLUMNS`` или объект Ad — имена атрибутов
+    у них совпадают.
+    """
+    return {
+        "id": row.id,
+        "title": row.title,
+        "price": row.price,
+        "year": row.year_car,
+        "mileage": row.mileage_km_car,
+        "brand_id": row.car_brand_id,
+        "model": row.model_name,
+        "region": row.region,
+        "condition": row.condition,
+        "status": "активно" if row.is_active else "в обработке",
+        "photo": row.main_image_url,
+        "images": row.image_count,
+        "sender": row.sender,
+    }
 
 
 async def _get_ads_preview(sender: str, limit: int = 5):
     """Получить статистику по объявлениям конкретного пользователя."""
-    ads = await crud_manager.ad.get_by_sender(sender)
-    total = len(ads)
-    active = sum(1 for ad in ads if getattr(ad, "is_active", False))
-    ads_sorted = sorted(ads, key=lambda ad: getattr(ad, "created_at", None) or 0, reverse=True)
-    subset = ads_sorted[:limit]
-    images_map = await crud_manager.car_image.get_map_by_ad_ids([ad.id for ad in subset])
-    summary = []
-    for ad in subset:
-        imgs = images_map.get(ad.id) or []
-        summary.append({
-            "id": ad.id,
-            "title": getattr(ad, "title", None) or f"Объявление №{ad.id}",
-            "price": getattr(ad, "price", 0),
-            "status": "активно" if getattr(ad, "is_active", False) else "в обработке",
-            "photo": imgs[0].image_url if imgs else None,
-            "ad": ad,
-        })
-    return total, active, summary
+    (total, active), subset = await asyncio.gather(
+        crud_manager.ad.count_and_active_by_sender(sender),
+        crud_manager.ad.get_recent_by_sender(sender, limit),
+    )
+    return total, active, [_summarize_ad(ad) for ad in subset]
 
 
 async def _get_recent_public_ads(limit: int = 5):
     """Получить несколько последних активных объявлений для витрины."""
-    ads = await crud_manager.ad.get_recent_active(limit)
-    ad_ids = [ad.id for ad in ads]
-    images_map = await crud_manager.car_image.get_map_by_ad_ids(ad_ids)
-    summary: list[dict] = []
-    for ad in ads:
-        imgs = images_map.get(ad.id) or []
-        summary.append(
-            {
-                "id": ad.id,
-                "title": ad.title,
-                "price": ad.price,
-                "year": ad.year_car,
-                "mileage": ad.mileage_km_car,
-                "brand_id": ad.car_brand_id,
-                "model": getattr(ad, "model_name", None),
-                "region": getattr(ad, "region", None),
-                "condition": getattr(ad, "condition", None),
-                "status": "активно" if ad.is_active else "в обработке",
-                "photo": imgs[0].image_url if imgs else None,
-                "sender": ad.sender,
-            }
-        )
-    return summary
-
-
-async def _filter_public_ads(filters: dict, page: int = 0, page_size: int = 5):
-    """Получить срез отфильтрованных активных объявлений с пагинацией."""
-    offset = page * page_size
-    ads = await crud_manager.ad.filter_ads(
-        car_brand_id=filters.get("car_brand_id"),
-        min_price=filters.get("min_price"),
-        max_price=filters.get("max_price"),
-        year_car=filters.get("year"),
-        min_year_car=filters.get("min_year"),
-        max_year_car=filters.get("max_year"),
-        min_mileage=filters.get("min_mileage"),
-        max_mileage=filters.get("max_mileage"),
-        region=filters.get("region"),
-        condition=filters.get("condition"),
+    rows = await crud_manager.ad.list_summary_recent(limit)
+    return [_summarize_ad(row) for row in rows]
+
+
+async def _filter_public_ads(
+    filters: dict, page: int = 0, page_size: int = 5, after: list | None = None
+):
+    """
+    Получить срез отфильтрованных активных объявлений и общее число под фильтр.
+
+    С ``after`` (курсор последней строки предыдущей страницы) страница берётся
+    keyset-запросом, без OFFSET. У каждой карточки есть ``cursor`` —
+    JSON-совместимый курсор для следующей страницы.
+
+    Если счётчик под этот фильтр не закеширован, он приходит тем же запросом
+    (COUNT(*) OVER()); иначе окно не считаем — оно мешает индексу остановиться
+    на LIMIT строк.
+
+    :return: (карточки, всего объявлений под фильтр)
+    """
+    by_price = filters.get("sort_by") == "price"
+    kwargs = _filter_kwargs(filters)
+    key = tuple(kwargs.values())
+    total = _filtered_count_cache.get(key)
+    with_total = total is _MISSING
+    rows = await crud_manager.ad.list_summary_filter(
+        **kwargs,
+        with_total=with_total,
         sort_by=filters.get("sort_by"),
         sort_order=filters.get("sort_order") or "desc",
         is_active=True,
         limit=page_size,
-        offset=offset,
+        offset=None if after else page * page_size,
+        after=_decode_cursor(after, by_price) if after else None,
     )
-    ad_ids = [ad.id for ad in ads]
-    images_map = await crud_manager.car_image.get_map_by_ad_ids(ad_ids)
-    summary: list[dict] = []
-    for ad in ads:
-        imgs = images_map.get(ad.id) or []
-        summary.append(
-            {
-                "id": ad.id,
-                "title": ad.title,
-                "price": ad.price,
-                "year": ad.year_car,
-                "mileage": ad.mileage_km_car,
-                "brand_id": ad.car_brand_id,
-                "model": getattr(ad, "model_name", None),
-                "region": getattr(ad, "region", None),
-                "condition": getattr(ad, "condition", None),
-                "status": "активно" if ad.is_active else "в обработке",
-                "photo": imgs[0].image_url if imgs else None,
-                "sender": ad.sender,
-            }
-        )
-    return summary
+    ads = []
+    for row in rows:
+        ad = _summarize_ad(row)
+        ad["cursor"] = [row.price if by_price else _encode_ts(row.created_at), row.id]
+        ads.append(ad)
+    if with_total:
+        if rows:
+            # С курсором окно видит только строки после него — добавляем пройденные страницы
+            total = rows[0].total_rows + (page * page_size if after else 0)
+        elif page:
+            total = await crud_manager.ad.count_filtered_ads(**kwargs, is_active=True)
+        else:
+            total = 0
+        _filtered_count_cache.set(key, total)
+    return ads, total
+
+
+def _encode_ts(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _decode_cursor(cursor: list, by_price: bool) -> tuple:
+    """Курсор из стейта (JSON) в значения bind-параметров."""
+    value, ad_id = cursor
+    if not by_price and value is not None:
+        value = datetime.fromisoformat(value)
+    return value, ad_id
+
+
+def _filter_kwargs(filters: dict) -> dict:
+    """Аргументы фильтра каталога из стейта пользователя (без пагинации и сортировки)."""
+    return {
+        "car_brand_id": filters.get("car_brand_id"),
+        "min_price": filters.get("min_price"),
+        "max_price": filters.get("max_price"),
+        "year_car": filters.get("year"),
+        "min_year_car": filters.get("min_year"),
+        "max_year_car": filters.get("max_year"),
+        "min_mileage": filters.get("min_mileage"),
+        "max_mileage": filters.get("max_mileage"),
+        "region": filters.get("region"),
+        "condition": filters.get("condition"),
+    }
 
 
 async def _count_filtered_public_ads(filters: dict) -> int:
-    """Подсчитать количество объявлений под фильтры."""
-    return await crud_manager.ad.count_filtered_ads(
-        car_brand_id=filters.get("car_brand_id"),
-        min_price=filters.get("min_price"),
-        max_price=filters.get("max_price"),
-        year_car=filters.get("year"),
-        min_year_car=filters.get("min_year"),
-        max_year_car=filters.get("max_year"),
-        min_mileage=filters.get("min_mileage"),
-        max_mileage=filters.get("max_mileage"),
-        region=filters.get("region"),
-        condition=filters.get("condition"),
-        is_active=True,
-    )
+    """Подсчитать количество объявлений под фильтры (кешируется на время листания)."""
+    kwargs = _filter_kwargs(filters)
+    key = tuple(kwargs.values())
+    total = _filtered_count_cache.get(key)
+    if total is _MISSING:
+        total = await crud_manager.ad.count_filtered_ads(**kwargs, is_active=True)
+        _filtered_count_cache.set(key, total)
+    return total
 
 
 async def _get_brand_by_name(name: str):
-    """Найти марку авто по названию."""
-    return await crud_manager.car_brand.get_by_name(name)
+    """Найти марку авто по названию (найденные марки кешируются)."""
+    key = name.lower()
+    brand = _brand_cache.get(key)
+    if brand is not _MISSING:
+        return brand
+    brand = await crud_manager.car_brand.get_by_name(name)
+    if brand:
+        _brand_cache.set(key, brand)
+    return brand
 
 
-async def _ensure_brand(name: str):
-    """Создать марку авто, если она ещё не сохранена."""
-    brand = await _get_brand_by_name(name)
-    if brand:
+async def _ensure_brand(name: str, crud=None):
+    """Создать марку авто, если она ещё не сохранена (кеш пополняет вызывающий после коммита)."""
+    brand = _brand_cache.get(name.lower())
+    if brand is not _MISSING:
         return brand
-    try:
-        return await crud_manager.car_brand.add(name=name)
-    except ValueError:
-        brand = await _get_brand_by_name(name)
-        if brand:
-            return brand
-        raise
+    return await (crud or crud_manager).car_brand.upsert(name)
 
 
 async def _create_ad_from_form(sender: str, data: dict):
-    """Создать объявление и сохранить фотографии из формы."""
-    brand = await _ensure_brand(data["brand"])
-    ad = await crud_manager.ad.add(
+    """Создать объявление и сохранить фотографии из формы одной транзакцией."""
+    async with crud_manager.transaction() as crud:
+        ad, brand = await _insert_ad_from_form(sender, data, crud)
+    _brand_cache.set(data["brand"].lower(), brand)
+    _count_cache.clear()
+    _filtered_count_cache.clear()
+    return ad
+
+
+async def _insert_ad_from_form(sender: str, data: dict, crud):
+    """Марка, объявление и фото через CRUD-ы, привязанные к одной сессии (без коммита)."""
+    brand = await _ensure_brand(data["brand"], crud)
+    ad = await crud.ad.add(
         sender=sender,
         title=data["title"],
         description=data["description"],
@@ -200,14 +443,13 @@ async def _create_ad_from_form(sender: str, data: dict):
         is_active=True,
     )
     photos: list[str] = data.get("photos", [])
-    for url in photos:
-        await crud_manager.car_image.add(ad.id, url)
-    return ad
+    await crud.car_image.add_many_no_return(ad.id, photos)
+    return ad, brand
 
 
 def ensure_user(sender: str, username: str | None) -> None:
     """Синхронный фасад для добавления пользователя."""
-    db_runner.run(_ensure_user(sender, username))
+    db_runner.run(_ensure_user(sender, username), key=("ensure_user", sender))
 
 
 def get_balance(sender: str) -> int:
@@ -217,7 +459,17 @@ def get_balance(sender: str) -> int:
 
 def get_user(sender: str):
     """Вернуть ORM-модель пользователя (или None)."""
-    return db_runner.run(_get_user(sender))
+    return db_runner.run(_get_user(sender), key=("user", sender))
+
+
+def ensure_user_balance(sender: str, username: str | None) -> int:
+    """Зарегистрировать пользователя при необходимости и вернуть его баланс (один поход в БД)."""
+    return db_runner.run(_ensure_user_balance(sender, username))
+
+
+def get_profile(sender: str):
+    """Вернуть (user, balance, favorites) для профиля; user=None, если пользователя нет."""
+    return db_runner.run(_get_profile(sender), key=("profile", sender))
 
 
 def get_ads_preview(sender: str, limit: int = 5):
@@ -230,62 +482,30 @@ def get_recent_public_ads(limit: int = 5):
     return db_runner.run(_get_recent_public_ads(limit))
 
 
-def filter_public_ads(filters: dict, page: int = 0, page_size: int = 5):
-    """Отфильтрованные объявления (публично) с пагинацией."""
-    return db_runner.run(_filter_public_ads(filters, page, page_size))
+def filter_public_ads(filters: dict, page: int = 0, page_size: int = 5, after: list | None = None):
+    """Отфильтрованные объявления (публично) и их общее число: (карточки, всего)."""
+    return db_runner.run(_filter_public_ads(filters, page, page_size, after))
 
 
 def count_filtered_public_ads(filters: dict) -> int:
-    """Сколько объявлений подходит под фильтр."""
+    """Сколько объявлений подходит под фильтр (обычно уже в кеше после filter_public_ads)."""
     return db_runner.run(_count_filtered_public_ads(filters))
 
 
 async def _count_public_ads() -> int:
     """Вернуть число активных объявлений (публичная витрина)."""
-    return await crud_manager.ad.count_active()
-
-
-async def _get_public_ad(ad_id: int):
-    """Получить одно активное объявление по ID (без фильтра по sender)."""
-    ad = await crud_manager.ad.get_active_by_id(ad_id)
-    if not ad:
-        return None
-    return {
-        "id": ad.id,
-        "title": ad.title,
-        "price": ad.price,
-        "year": ad.year_car,
-        "mileage": ad.mileage_km_car,
-        "brand_id": ad.car_brand_id,
-        "model": getattr(ad, "model_name", None),
-        "region": getattr(ad, "region", None),
-        "condition": getattr(ad, "condition", None),
-        "status": "активно" if ad.is_active else "в обработке",
-        "sender": ad.sender,
-    }
+    total = _count_cache.get(None)
+    if total is _MISSING:
+        total = await crud_manager.ad.count_active()
+        _count_cache.set(None, total)
+    return total
 
 
 async def _search_public_ads(query: str, limit: int = 5):
-    """Поиск активных объявлений по заголовку (ILIKE %query%)."""
-    ads = await crud_manager.ad.search_by_title(query, limit)
-    summary: list[dict] = []
-    for ad in ads:
-        summary.append(
-            {
-                "id": ad.id,
-                "title": ad.title,
-                "price": ad.price,
-                "year": ad.year_car,
-                "mileage": ad.mileage_km_car,
-                "brand_id": ad.car_brand_id,
-                "model": getattr(ad, "model_name", None),
-                "region": getattr(ad, "region", None),
-                "condition": getattr(ad, "condition", None),
-                "status": "активно" if ad.is_active else "в обработке",
-                "sender": ad.sender,
-            }
-        )
-    return summary
+    """Поиск активных объявлений: полнотекстово по названию и описанию (search_tsv)
+    или по подстроке в названии (ILIKE %query%)."""
+    rows = await crud_manager.ad.list_summary_search(query, limit)
+    return [_summarize_ad(row) for row in rows]
 
 
 def count_public_ads() -> int:
@@ -293,36 +513,45 @@ def count_public_ads() -> int:
     return db_runner.run(_count_public_ads())
 
 
-def get_public_ad(ad_id: int):
-    """Одно объявление по ID (если активно)."""
-    return db_runner.run(_get_public_ad(ad_id))
-
-
 async def _get_public_ad_with_images(ad_id: int):
-    """Активное объявление и список его изображений (публичный доступ)."""
-    ad = await crud_manager.ad.get_active_by_id(ad_id)
-    if not ad:
+    """Карточка активного объявления и список его изображений (публичный доступ)."""
+    row, images = await asyncio.gather(
+        crud_manager.ad.get_summary_active_by_id(ad_id),
+        crud_manager.car_image.get_all_by_ad_id(ad_id),
+    )
+    if not row:
         return None, []
-    images = await crud_manager.car_image.get_all_by_ad_id(ad_id)
-    return ad, images
+    return _summarize_ad(row), images
 
 
 def get_public_ad_with_images(ad_id: int):
-    """Синхронный фасад: активное объявление и картинки."""
-    return db_runner.run(_get_public_ad_with_images(ad_id))
+    """
+    Синхронный фасад: карточка активного объявления и картинки.
+
+    Единственная точка чтения объявления для детального просмотра;
+    одновременные запросы одной карточки схлопываются в один поход в БД.
+    """
+    return db_runner.run(_get_public_ad_with_images(ad_id), key=("public_ad", ad_id))
+
+
+def record_view(sender: str, ad_id: int) -> None:
+    """Учесть просмотр карточки объявления (запись в БД пачкой, без ожидания)."""
+    _view_buffer.record(ad_id, sender)
 
 
 def search_public_ads(query: str, limit: int = 5):
-    """Поиск активных объявлений по названию (ILIKE)."""
+    """Поиск активных объявлений по названию и описанию (полнотекстовый, плюс ILIKE по названию)."""
     return db_runner.run(_search_public_ads(query, limit))
 
 
 async def _get_ad_with_images(sender: str, ad_id: int):
     """Получить объявление и его фотографии, если sender совпадает."""
-    ad = await crud_manager.ad.get_by_id(ad_id)
+    ad, images = await asyncio.gather(
+        crud_manager.ad.get_by_id(ad_id),
+        crud_manager.car_image.get_all_by_ad_id(ad_id),
+    )
     if not ad or ad.sender != sender:
         return None, []
-    images = await crud_manager.car_image.get_all_by_ad_id(ad_id)
     return ad, images
 
 
@@ -336,11 +565,6 @@ def create_ad_from_form(sender: str, data: dict):
     return db_runner.run(_create_ad_from_form(sender, data))
 
 
-async def _get_ads_by_ids(ids: list[int], active_only: bool = True):
-    """Асинхронно получить объявления по списку ID."""
-    return await crud_manager.ad.get_by_ids(ids, is_active=active_only)
-
-
 async def _add_favorite(sender: str, ad_id: int):
     """Добавить объявление в избранное."""
     return await crud_manager.favorite.add(sender=sender, ad_id=ad_id)
@@ -353,15 +577,13 @@ async def _remove_favorite(sender: str, ad_id: int):
 
 async def _get_favorites(sender: str):
     """Получить избранные объявления пользователя (активные)."""
-    favs = await crud_manager.favorite.get_by_sender(sender)
-    ids = [fav.ad_id for fav in favs]
-    return await _get_ads_by_ids(ids, active_only=True)
+    rows = await crud_manager.favorite.get_active_summaries(sender)
+    return [_summarize_ad(row) for row in rows]
 
 
 async def _is_favorite(sender: str, ad_id: int) -> bool:
     """Проверить, добавлено ли объявление в избранное конкретного пользователя."""
-    favs = await crud_manager.favorite.get_by_sender(sender)
-    return any(fav.ad_id == ad_id for fav in favs)
+    return await crud_manager.favorite.exists(sender, ad_id)
 
 
 def get_brand_by_name(name: str):
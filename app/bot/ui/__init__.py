@@ -1,8 +1,15 @@
-from .buttons import MAIN_MENU_BUTTONS, TEXT_TO_BUTTON, SELL_MENU_BUTTONS, SELL_TEXT_TO_BUTTON
+from .buttons import (
+    MAIN_MENU_BUTTONS,
+    TEXT_TO_BUTTON,
+    SELL_MENU_BUTTONS,
+    SELL_TEXT_TO_BUTTON,
+    resolve_button,
+)
 
 __all__ = [
     "MAIN_MENU_BUTTONS",
     "TEXT_TO_BUTTON",
     "SELL_MENU_BUTTONS",
     "SELL_TEXT_TO_BUTTON",
+    "resolve_button",
 ]
@@ -26,23 +26,29 @@ SELL_MENU_BUTTONS = [
 
 BACK_MENU_BUTTON = {"buttonId": "back_menu", "buttonText": "⬅️ В меню"}
 
-TEXT_TO_BUTTON = {
+
+def _casefolded(mapping: dict[str, str]) -> dict[str, str]:
+    """Привести ключи к casefold один раз при импорте, чтобы не делать этого на каждое сообщение."""
+    return {key.casefold(): value for key, value in mapping.items()}
+
+
+TEXT_TO_BUTTON = _casefolded({
     "профиль": "profile",
     "profile": "profile",
     "продажа": "sell",
     "sell": "sell",
     "покупка": "buy",
     "buy": "buy",
-}
+})
 
-SELL_TEXT_TO_BUTTON = {
+SELL_TEXT_TO_BUTTON = _casefolded({
     "разместить объявление": "sell_create",
     "мои объявления": "sell_list",
     "sell_create": "sell_create",
     "sell_list": "sell_list",
-}
+})
 
-BUY_TEXT_TO_BUTTON = {
+BUY_TEXT_TO_BUTTON = _casefolded({
     "все объявления": "buy_all",
     "фильтры": "buy_filter",
     "поиск авто": "buy_search",
@@ -51,4 +57,9 @@ BUY_TEXT_TO_BUTTON = {
     "buy_filter": "buy_filter",
     "buy_search": "buy_search",
     "buy_favorites": "buy_favorites",
-}
+})
+
+
+def resolve_button(text: str, mapping: dict[str, str] = TEXT_TO_BUTTON) -> str | None:
+    """Найти ID кнопки по тексту сообщения (без учёта регистра и пробелов по краям)."""
+    return mapping.get(text.strip().casefold())
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+import re
 from functools import lru_cache
+from typing import NamedTuple
 
 import dotenv
 
@@ -11,18 +12,19 @@ dotenv.load_dotenv()
 
 DEFAULT_BASE_URL = "https://api.green-api.com"
 DEFAULT_AUTO_REPLY_TEXT = "Спасибо за сообщение! Мы свяжемся с вами в ближайшее время."
+# Разделители списка ALLOWED_SENDERS: запятая, точка с запятой и любые пробельные символы
+_SENDERS_SEPARATOR = re.compile(r"[;,\s]+")
 
 
-@dataclass(slots=True)
-class Settings:
-    """Runtime configuration loaded from environment variables."""
+class Settings(NamedTuple):
+    """Runtime configuration loaded from environment variables (immutable)."""
 
     id_instance: str
     api_token: str
     base_url: str = DEFAULT_BASE_URL
     webhook_secret: str | None = None
     auto_reply_text: str = DEFAULT_AUTO_REPLY_TEXT
-    allowed_senders: set[str] | None = None
+    allowed_senders: frozenset[str] | None = None
 
 
 @lru_cache(1)
@@ -41,8 +43,9 @@ def get_settings() -> Settings:
     allowed_raw = os.getenv("ALLOWED_SENDERS")
     allowed_senders = None
     if allowed_raw:
-        normalized = allowed_raw.replace(";", ",").replace("\n", ",").replace(" ", ",")
-        allowed_senders = {chunk.strip() for chunk in normalized.split(",") if chunk.strip()}
+        allowed_senders = frozenset(
+            chunk for chunk in _SENDERS_SEPARATOR.split(allowed_raw) if chunk
+        )
 
     base_url = os.getenv("GREEN_API_BASE_URL") or os.getenv("DOMAIN") or DEFAULT_BASE_URL
 
@@ -1,4 +1,4 @@
-from .crude import *
+from . import crude
 from .db import *
 from .models import *
 
@@ -1,15 +1,54 @@
-from .add import CrudeAdd
-from .car_brand import CrudeCarBrand
-from .favorite import CrudeFavorite
-from .moder import CrudeModerator, CrudeModeration
-from .payment import CrudePayment
-from .user import CrudeUser
-from .car_image import CrudeAdImage
-from .view import CrudeViewLog
-from .manager import CrudManager
+"""CRUD-слой. Модули и синглтон ``crud_manager`` импортируются лениво (PEP 562)."""
+from __future__ import annotations
 
-# Удобный синглтон менеджера (можно использовать напрямую)
-crud_manager = CrudManager()
+import importlib
+from functools import cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .add import CrudeAdd
+    from .car_brand import CrudeCarBrand
+    from .favorite import CrudeFavorite
+    from .moder import CrudeModerator, CrudeModeration
+    from .payment import CrudePayment
+    from .user import CrudeUser
+    from .car_image import CrudeAdImage
+    from .view import CrudeViewLog
+    from .manager import CrudManager
+
+_SUBMODULES = {
+    "CrudeAdd": ".add",
+    "CrudeCarBrand": ".car_brand",
+    "CrudeFavorite": ".favorite",
+    "CrudeModerator": ".moder",
+    "CrudeModeration": ".moder",
+    "CrudePayment": ".payment",
+    "CrudeUser": ".user",
+    "CrudeAdImage": ".car_image",
+    "CrudeViewLog": ".view",
+    "CrudManager": ".manager",
+}
+
+
+@cache
+def get_crud_manager() -> "CrudManager":
+    """Удобный синглтон менеджера (создаётся при первом обращении)."""
+    from .manager import CrudManager
+
+    return CrudManager()
+
+
+def __getattr__(name: str):
+    if name == "crud_manager":
+        return get_crud_manager()
+    module_name = _SUBMODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name, __name__), name)
+
+
+def __dir__() -> list[str]:
+    return sorted(__all__)
 
 
 __all__ = [
@@ -24,4 +63,5 @@ __all__ = [
     "CrudeViewLog",
     "CrudManager",
     "crud_manager",
-]
\ No newline at end of file
+    "get_crud_manager",
+]
@@ -1,15 +1,250 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker
-from sqlalchemy.future import select
-from sqlalchemy import update, delete, func
+from functools import lru_cache
+from typing import AsyncIterator
 
-from ..models import Ad, Moderation
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+from sqlalchemy import (
+    Integer,
+    Row,
+    any_,
+    bindparam,
+    delete,
+    func,
+    literal_column,
+    or_,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import undefer_group
+
+from ..models import DETAIL, Ad, Moderation
 
 from ..db import AsyncSessionLocal
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from .base import CrudeBase
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+
+
+# Готовые выражения по первичному ключу: один объект на все вызовы.
+# Одно объявление отдаётся целиком, вместе с отложенным описанием
+AD_BY_ID = select(Ad).where(Ad.id == bindparam("ad_id")).options(undefer_group(DETAIL))
+
+# Нарушенные CHECK-ограничения ads (models.Ad.__table_args__) → текст для пользователя
+_CHECK_MESSAGES = {
+    "ads_price_nonneg": "Цена не может быть отрицательной.",
+    "ads_year_car_range": "Год выпуска должен быть между 1900 и 2100.",
+    "ads_mileage_nonneg": "Пробег не может быть отрицательным.",
+}
+
+
+def _check_violation(exc: IntegrityError) -> str | None:
+    """Сообщение для нарушенного CHECK-ограничения или None, если ошибка другая."""
+    detail = str(exc.orig)
+    return next((message for name, message in _CHECK_MESSAGES.items() if name in detail), None)
+
+
+# Конфигурация полнотекстового поиска — та же, что в генерируемой колонке ads.search_tsv
+_TS_CONFIG = literal_column("'russian'::regconfig")
+
+# Строк в одном многострочном INSERT при массовом импорте (лимит Postgres — 32767 параметров)
+INSERT_CHUNK = 1000
+
+# Колонки карточки объявления в списках каталога — только то, что показывает бот
+SUMMARY_COLUMNS = (
+    Ad.id,
+    Ad.title,
+    Ad.price,
+    Ad.year_car,
+    Ad.mileage_km_car,
+    Ad.car_brand_id,
+    Ad.model_name,
+    Ad.region,
+    Ad.condition,
+    Ad.is_active,
+    Ad.sender,
+    Ad.created_at,
+    # Обложка и число фото лежат в самой строке ads — без подзапроса к ad_images
+    Ad.main_image_url,
+    Ad.image_count,
+)
+
+
+# Условия каталога с bind-параметрами: текст SQL зависит только от набора
+# заданных фильтров, а не от их значений
+_CATALOG_FILTERS = {
+    "car_brand_id": Ad.car_brand_id == bindparam("car_brand_id"),
+    "min_price": Ad.price >= bindparam("min_price"),
+    "max_price": Ad.price <= bindparam("max_price"),
+    "year_car": Ad.year_car == bindparam("year_car"),
+    "min_year_car": Ad.year_car >= bindparam("min_year_car"),
+    "max_year_car": Ad.year_car <= bindparam("max_year_car"),
+    "min_mileage": Ad.mileage_km_car >= bindparam("min_mileage"),
+    "max_mileage": Ad.mileage_km_car <= bindparam("max_mileage"),
+    "region": func.lower(Ad.region) == func.lower(bindparam("region")),
+    "condition": func.lower(Ad.condition) == func.lower(bindparam("condition")),
+}
+# Строковые фильтры применяются только непустыми
+_TEXT_FILTERS = frozenset({"region", "condition"})
+
+
+def _catalog_params(filters: dict) -> tuple[frozenset[str], dict]:
+    """Отобрать заданные фильтры: (имена для ключа кеша, значения bind-параметров)."""
+    params = {
+        name: value
+        for name, value in filters.items()
+        if name in _CATALOG_FILTERS and (value if name in _TEXT_FILTERS else value is not None)
+    }
+    return frozenset(params), params
+
+
+@lru_cache(maxsize=512)
+def _catalog_statement(
+    kind: str,
+    active: frozenset[str],
+    is_active: bool,
+    sort_by: str,
+    sort_order: str,
+    paged: tuple[bool, bool],
+    seek: bool = False,
+):
+    """
+    Собрать SELECT каталога один раз на каждую форму запроса.
+    :param kind: ``ad`` / ``summary`` / ``summary_total`` / ``count``
+    :param active: Имена заданных фильтров
+    :param is_active: Только активные объявления
+    :param sort_by: ``price`` или ``created``
+    :param sort_order: ``asc`` или ``desc``
+    :param paged: Заданы ли (limit, offset)
+    :param seek: Keyset-пагинация: строки строго после (after_value, after_id)
+    :return: Select с bind-параметрами вместо значений
+    """
+    if kind == "count":
+        query = select(func.count()).select_from(Ad)
+    elif kind == "summary":
+        query = select(*SUMMARY_COLUMNS)
+    elif kind == "summary_total":
+        # Окно считается по отфильтрованному набору до LIMIT/OFFSET:
+        # страница и счётчик одним запросом
+        query = select(*SUMMARY_COLUMNS, func.count().over().label("total_rows"))
+    else:
+        query = select(Ad)
+    if is_active:
+        query = query.where(Ad.is_active.is_(True))
+    for name in sorted(active):
+        query = query.where(_CATALOG_FILTERS[name])
+    if kind == "count":
+        return query
+
+    order_column = Ad.price if sort_by == "price" else Ad.created_at
+    if seek:
+        # Сравнение кортежей идёт по индексу (сортировка, id): глубина страницы не важна
+        key = tuple_(order_column, Ad.id)
+        after = tuple_(
+            bindparam("after_value", type_=order_column.type), bindparam("after_id", type_=Integer)
+        )
+        query = query.where(key > after if sort_order == "asc" else key < after)
+    if sort_order == "asc":
+        query = query.order_by(order_column.asc(), Ad.id.asc())
+    else:
+        query = query.order_by(order_column.desc(), Ad.id.desc())
+    has_limit, has_offset = paged
+    if has_limit:
+        query = query.limit(bindparam("limit", type_=Integer))
+    if has_offset:
+        query = query.offset(bindparam("offset", type_=Integer))
+    return query
+
+
+def _catalog_query(
+    kind: str,
+    *,
+    sort_by: str | None = None,
+    sort_order: str | None = "desc",
+    is_active: bool = True,
+    limit: int | None = None,
+    offset: int | None = None,
+    after: tuple | None = None,
+    **filters,
+):
+    """
+    Вернуть (готовый Select из кеша, параметры)
+    для filter_ads / list_summary_filter / count_filtered_ads.
+    ``after`` — (значение сортировки, id) последней строки предыдущей страницы.
+    """
+    active, params = _catalog_params(filters)
+    stmt = _catalog_statement(
+        kind,
+        active,
+        bool(is_active),
+        "price" if (sort_by or "").lower() == "price" else "created",
+        "asc" if (sort_order or "").lower() == "asc" else "desc",
+        (limit is not None, offset is not None),
+        after is not None,
+    )
+    if after is not None:
+        params["after_value"], params["after_id"] = after
+    if limit is not None:
+        params["limit"] = limit
+    if offset is not None:
+        params["offset"] = offset
+    return stmt, params
 
 
 # CRUD Операции Таблицы Объявлений
-class CrudeAdd:
+class CrudeAdd(CrudeBase):
+
+    # Статические запросы собираются один раз при импорте, значения идут bind-параметрами
+    _ACTIVE = Ad.is_active.is_(True)
+    _RECENT_ACTIVE = (
+        select(Ad)
+        .where(_ACTIVE)
+        .order_by(Ad.created_at.desc())
+        .limit(bindparam("limit", type_=Integer))
+    )
+    _COUNT_ACTIVE = select(func.count()).select_from(Ad).where(_ACTIVE)
+    _ACTIVE_BY_ID = select(Ad).where(Ad.id == bindparam("ad_id"), _ACTIVE)
+    _SEARCH_ACTIVE = (
+        select(Ad)
+        .where(_ACTIVE, Ad.title.ilike(bindparam("pattern")))
+        .order_by(Ad.created_at.desc())
+        .limit(bindparam("limit", type_=Integer))
+    )
+    # COUNT(*) никогда не возвращает NULL — защиты «or 0» не нужны
+    _COUNT_BY_SENDER = (
+        select(func.count(), func.count().filter(_ACTIVE))
+        .select_from(Ad)
+        .where(Ad.sender == bindparam("sender"))
+    )
+    _RECENT_BY_SENDER = (
+        select(Ad)
+        .where(Ad.sender == bindparam("sender"))
+        .order_by(Ad.created_at.desc(), Ad.id.desc())
+        .limit(bindparam("limit", type_=Integer))
+    )
+    _SUMMARY_RECENT = (
+        select(*SUMMARY_COLUMNS)
+        .where(_ACTIVE)
+        .order_by(Ad.created_at.desc())
+        .limit(bindparam("limit", type_=Integer))
+    )
+    _SUMMARY_ACTIVE_BY_ID = select(*SUMMARY_COLUMNS).where(Ad.id == bindparam("ad_id"), _ACTIVE)
+    # Слова из названия/описания — по GIN ads_search_tsv (с русской морфологией),
+    # подстрока названия («toyo» → Toyota) — по trigram ads_title_trgm; OR даёт BitmapOr
+    _SUMMARY_SEARCH = (
+        select(*SUMMARY_COLUMNS)
+        .where(
+            _ACTIVE,
+            or_(
+                Ad.search_tsv.bool_op("@@")(func.plainto_tsquery(_TS_CONFIG, bindparam("query"))),
+                Ad.title.ilike(bindparam("pattern")),
+            ),
+        )
+        .order_by(Ad.created_at.desc())
+        .limit(bindparam("limit", type_=Integer))
+    )
+    _MODERATION_BY_AD = select(Moderation).where(Moderation.ad_id == bindparam("ad_id"))
+    _BY_VIN = select(Ad).where(Ad.vin_number == bindparam("vin"))
+    _BY_IDS = select(Ad).where(Ad.id == any_(bindparam("ids", type_=ARRAY(Integer))))
 
     # Инициализация класса сессии для работы с БД
     def __init__(self):
@@ -30,7 +265,8 @@ class CrudeAdd:
                   region: str | None = None,  # Регион продажи
                   condition: str | None = None,  # Состояние авто
                   day_count: int = 7,  # Количество дней публикации по умолчанию 7
-                  is_active: bool = True  # Активно ли объявление
+                  is_active: bool = True,  # Активно ли объявление
+                  session: AsyncSession | None = None,
                   ) -> Ad:
         """
         Добавить объявление.
@@ -48,8 +284,11 @@ class CrudeAdd:
         :param day_count: Количество дней публикации (по умолчанию 7)
         :param is_active: Активно ли объявление (по умолчанию False)
         :return: Объект объявления Ad
+
+        RETURNING нужен, чтобы отдать созданную строку одним запросом; для массового
+        импорта, где строка не нужна, есть add_many_no_return.
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
                 # Вставка с ON CONFLICT по vin_number — безопасный upsert для race conditions.
                 stmt = pg_insert(Ad).values(
@@ -67,8 +306,12 @@ class CrudeAdd:
                     day_count=day_count,
                     is_active=is_active,
                 )
-                # Если уже существует — не делать обновление (можно менять на DO UPDATE при необходимости)
-                stmt = stmt.on_conflict_do_nothing(index_elements=[Ad.vin_number]).returning(Ad)
+                # Если уже существует — не делать обновление (можно менять на DO UPDATE)
+                stmt = (
+                    stmt.on_conflict_do_nothing(index_elements=[Ad.vin_number])
+                    .returning(Ad)
+                    .options(undefer_group(DETAIL))
+                )
                 res = await session.execute(stmt)
                 await session.commit()
                 ad = res.scalar_one_or_none()
@@ -81,6 +324,43 @@ class CrudeAdd:
                 await session.rollback()
                 raise
 
+            except IntegrityError as exc:
+                await session.rollback()
+                message = _check_violation(exc)
+                if message:
+                    raise ValueError(message) from exc
+                raise
+
+            except Exception:
+                await session.rollback()
+                raise
+
+    # Массовый импорт объявлений (сиды, выгрузки)
+    async def add_many_no_return(
+        self, rows: list[dict], *, session: AsyncSession | None = None
+    ) -> int:
+        """
+        Добавить много объявлений многострочным INSERT ... ON CONFLICT DO NOTHING без RETURNING.
+        Объявления с уже существующим VIN пропускаются.
+        :param rows: Словари с полями Ad (sender, title, price, vin_number, ...)
+        :return: Сколько объявлений действительно добавлено
+        """
+        if not rows:
+            return 0
+        async with self._scope(session) as session:
+            try:
+                inserted = 0
+                for start in range(0, len(rows), INSERT_CHUNK):
+                    stmt = (
+                        pg_insert(Ad)
+                        .values(rows[start:start + INSERT_CHUNK])
+                        .on_conflict_do_nothing(index_elements=[Ad.vin_number])
+                    )
+                    res = await session.execute(stmt)
+                    inserted += res.rowcount
+                await session.commit()
+                return inserted
+
             except Exception:
                 await session.rollback()
                 raise
@@ -99,7 +379,9 @@ class CrudeAdd:
                      region: str | None = None,  # Регион продажи
                      condition: str | None = None,  # Состояние авто
                      day_count: int | None = None,  # Количество дней публикации по умолчанию 7
-                     is_active: bool | None = None  # Активно ли объявление
+                     is_active: bool | None = None,  # Активно ли объявление
+                     *,
+                     session: AsyncSession | None = None,
                      ) -> Ad:
         """
         Обновить объявление по ID.
@@ -118,19 +400,8 @@ class CrudeAdd:
         :param is_active: Статус активности объявления
         :return:
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли объявление с таким ID
-                stmt = await session.execute(select(Ad).where(Ad.id == ad_id))
-                existing_ad = stmt.scalar_one_or_none()
-                if not existing_ad:
-                    raise ValueError("Объявление не найдено.")
-                # Проверяем есть ли VIN номер и если есть, то проверяем его уникальность
-                if vin_number:
-                    check_vin = await session.execute(select(Ad).where(Ad.vin_number == vin_number))
-                    if check_vin.scalar_one_or_none():
-                        raise ValueError("Объявление с таким VIN-номером уже существует.")
-
                 # Обновляем поля объявления
                 update_data = {
                     "title": title,
@@ -148,10 +419,34 @@ class CrudeAdd:
                 }
                 # Удаляем None значения из словаря
                 update_data = {k: v for k, v in update_data.items() if v is not None}
-
-                await session.execute(update(Ad).where(Ad.id == ad_id).values(**update_data))
+                if not update_data:
+                    existing_ad = await session.get(Ad, ad_id, options=[undefer_group(DETAIL)])
+                    if not existing_ad:
+                        raise ValueError("Объявление не найдено.")
+                    return existing_ad
+
+                # UPDATE ... RETURNING: проверка существования и обновление за один запрос.
+                # Уникальность VIN проверяет сам уникальный индекс ads.vin_number.
+                try:
+                    res = await session.execute(
+                        update(Ad)
+                        .where(Ad.id == ad_id)
+                        .values(**update_data)
+                        .returning(Ad)
+                        .options(undefer_group(DETAIL))
+                    )
+                except IntegrityError as exc:
+                    if vin_number and "vin_number" in str(exc.orig):
+                        raise ValueError("Объявление с таким VIN-номером уже существует.") from exc
+                    message = _check_violation(exc)
+                    if message:
+                        raise ValueError(message) from exc
+                    raise
+                updated_ad = res.scalar_one_or_none()
+                if not updated_ad:
+                    raise ValueError("Объявление не найдено.")
                 await session.commit()
-                return existing_ad
+                return updated_ad
 
             except ValueError as ve:
                 await session.rollback()
@@ -162,22 +457,18 @@ class CrudeAdd:
                 raise e
 
     # Удаление объявления
-    async def delete(self, ad_id: int) -> bool | None:
+    async def delete(self, ad_id: int, *, session: AsyncSession | None = None) -> bool | None:
         """
         Удалить объявление по ID.
         :param ad_id: ID объявления
         :return: True Если удаление успешно, иначе False, None если объявление не найдено
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли объявление с таким ID
-                stmt = await session.execute(select(Ad).where(Ad.id == ad_id))
-                existing_ad = stmt.scalar_one_or_none()
-                if not existing_ad:
+                # DELETE ... RETURNING: проверка существования и удаление за один запрос
+                res = await session.execute(delete(Ad).where(Ad.id == ad_id).returning(Ad.id))
+                if res.scalar_one_or_none() is None:
                     return None  # Объявление не найдено
-
-                # Удаляем объявление
-                await session.execute(delete(Ad).where(Ad.id == ad_id))
                 await session.commit()
                 return True  # Успешное удаление
 
@@ -185,74 +476,112 @@ class CrudeAdd:
                 await session.rollback()
                 raise e
 
+    # Потоковый обход всех активных объявлений
+    def iter_active(self, *, session: AsyncSession | None = None) -> AsyncIterator[Ad]:
+        """
+        Итерировать активные объявления без загрузки всей таблицы в память.
+        :return: Асинхронный итератор объектов Ad
+        """
+        stmt = select(Ad).where(Ad.is_active.is_(True)).order_by(Ad.id)
+        return self._stream(stmt, session=session)
+
     # Получение всех активных объявлений
-    async def get_all_active(self) -> list[Ad]:
+    async def get_all_active(self, *, session: AsyncSession | None = None) -> list[Ad]:
         """
-        Получить все активные объявления.
+        Получить все активные объявления (списком; для больших выборок — iter_active).
         :return: Список объектов Ad
         """
-        async with self.session() as session:
-            result = await session.execute(select(Ad).where(Ad.is_active.is_(True)))
-            return result.scalars().all()
+        return [ad async for ad in self.iter_active(session=session)]
 
-    async def get_recent_active(self, limit: int = 5) -> list[Ad]:
+    async def get_recent_active(
+        self, limit: int = 5, *, session: AsyncSession | None = None
+    ) -> list[Ad]:
         """
         Получить несколько последних активных объявлений.
 
         :param limit: Сколько записей возвращать.
         """
-        async with self.session() as session:
-            stmt = (
-                select(Ad)
-                .where(Ad.is_active.is_(True))
-                .order_by(Ad.created_at.desc())
-                .limit(limit)
-            )
-            result = await session.execute(stmt)
+        async with self._scope(session) as session:
+            result = await session.execute(self._RECENT_ACTIVE, {"limit": limit})
             return result.scalars().all()
 
-    async def count_active(self) -> int:
+    async def count_active(self, *, session: AsyncSession | None = None) -> int:
         """Вернуть общее количество активных объявлений."""
-        async with self.session() as session:
-            result = await session.execute(select(func.count()).where(Ad.is_active.is_(True)))
-            return result.scalar_one() or 0
+        async with self._scope(session) as session:
+            return await session.scalar(self._COUNT_ACTIVE)
 
-    async def get_active_by_id(self, ad_id: int) -> Ad | None:
+    async def get_active_by_id(
+        self, ad_id: int, *, session: AsyncSession | None = None
+    ) -> Ad | None:
         """Получить активное объявление по ID (для публичного просмотра)."""
-        async with self.session() as session:
-            result = await session.execute(
-                select(Ad).where(Ad.id == ad_id, Ad.is_active.is_(True))
-            )
+        async with self._scope(session) as session:
+            result = await session.execute(self._ACTIVE_BY_ID, {"ad_id": ad_id})
             return result.scalar_one_or_none()
 
-    async def search_by_title(self, query: str, limit: int = 5) -> list[Ad]:
+    async def search_by_title(
+        self, query: str, limit: int = 5, *, session: AsyncSession | None = None
+    ) -> list[Ad]:
         """Поиск активных объявлений по подстроке в названии."""
-        async with self.session() as session:
-            stmt = (
-                select(Ad)
-                .where(Ad.is_active.is_(True))
-                .where(Ad.title.ilike(f"%{query}%"))
-                .order_by(Ad.created_at.desc())
-                .limit(limit)
+        async with self._scope(session) as session:
+            result = await session.execute(
+                self._SEARCH_ACTIVE, {"pattern": f"%{query}%", "limit": limit}
             )
-            result = await session.execute(stmt)
             return result.scalars().all()
 
     # Получение объявления конкретного пользователя по sender
-    async def get_by_sender(self, sender: str) -> list[Ad]:
+    async def get_by_sender(self, sender: str, *, session: AsyncSession | None = None) -> list[Ad]:
         """
         Получить все объявления пользователя по sender.
         :param sender: Whatsapp sender ID
         :return: Список объектов Ad
         """
-        async with self.session() as session:
-            result = await session.execute(select(Ad).where(Ad.sender == sender))
+        return [ad async for ad in self.iter_by_sender(sender, session=session)]
+
+    # Потоковый обход объявлений пользователя
+    def iter_by_sender(
+        self, sender: str, *, session: AsyncSession | None = None
+    ) -> AsyncIterator[Ad]:
+        """
+        Итерировать объявления пользователя пачками, не материализуя весь список.
+        :param sender: Whatsapp sender ID
+        :return: Асинхронный итератор объектов Ad
+        """
+        return self._stream(select(Ad).where(Ad.sender == sender).order_by(Ad.id), session=session)
+
+    # Счётчики объявлений пользователя: всего и активных
+    async def count_and_active_by_sender(
+        self, sender: str, *, session: AsyncSession | None = None
+    ) -> tuple[int, int]:
+        """
+        Посчитать объявления пользователя одним агрегирующим запросом.
+        :param sender: Whatsapp sender ID
+        :return: Кортеж (всего объявлений, активных)
+        """
+        async with self._scope(session) as session:
+            result = await session.execute(self._COUNT_BY_SENDER, {"sender": sender})
+            total, active = result.one()
+            return total, active
+
+    # Последние объявления пользователя
+    async def get_recent_by_sender(
+        self, sender: str, limit: int = 5, *, session: AsyncSession | None = None
+    ) -> list[Ad]:
+        """
+        Получить последние объявления пользователя (сортировка и лимит на стороне БД).
+        :param sender: Whatsapp sender ID
+        :param limit: Сколько объявлений вернуть
+        :return: Список объектов Ad
+        """
+        async with self._scope(session) as session:
+            result = await session.execute(
+                self._RECENT_BY_SENDER, {"sender": sender, "limit": limit}
+            )
             return result.scalars().all()
 
-    async def get_by_id(self, ad_id: int) -> Ad | None:
+    async def get_by_id(self, ad_id: int, *, session: AsyncSession | None = None) -> Ad | None:
         """Получить объявление по ID."""
-        async with self.session() as session:
-            result = await session.execute(select(Ad).where(Ad.id == ad_id))
+        async with self._scope(session) as session:
+            result = await session.execute(AD_BY_ID, {"ad_id": ad_id})
             return result.scalar_one_or_none()
 
     # Фильтрация по: Марке, Цене, Году, Пробегу
@@ -274,9 +603,14 @@ class CrudeAdd:
         is_active: bool = True,
         limit: int | None = None,
         offset: int | None = None,
+        after: tuple | None = None,
+        session: AsyncSession | None = None,
     ) -> list[Ad]:
         """
         Фильтрация объявлений по различным параметрам.
+        Публичный каталог (is_active) опирается на частичные индексы
+        ads_public_brand_price / ads_public_region_price (миграция 189f488a8cfd),
+        поиск по названию — на trigram-индекс ads_title_trgm.
         :param car_brand_id: ID марки автомобиля (необязательно)
         :param min_price: Минимальная цена (необязательно)
         :param max_price: Максимальная цена (необязательно)
@@ -287,50 +621,88 @@ class CrudeAdd:
         :param condition: Состояние автомобиля (целый / после дтп)
         :param sort_by: Поле сортировки (price / created)
         :param sort_order: Направление сортировки (asc / desc)
+        :param after: Курсор (значение сортировки, id) — вместо offset для глубоких страниц
         :return: Список отфильтрованных объектов Ad
         """
-        async with self.session() as session:
-            query = select(Ad)
-            if is_active:
-                query = query.where(Ad.is_active.is_(True))
-
-            # Добавляем условия фильтрации
-            if car_brand_id is not None:
-                query = query.where(Ad.car_brand_id == car_brand_id)
-            if min_price is not None:
-                query = query.where(Ad.price >= min_price)
-            if max_price is not None:
-                query = query.where(Ad.price <= max_price)
-            if year_car is not None:
-                query = query.where(Ad.year_car == year_car)
-            if min_year_car is not None:
-                query = query.where(Ad.year_car >= min_year_car)
-            if max_year_car is not None:
-                query = query.where(Ad.year_car <= max_year_car)
-            if min_mileage is not None:
-                query = query.where(Ad.mileage_km_car >= min_mileage)
-            if max_mileage is not None:
-                query = query.where(Ad.mileage_km_car <= max_mileage)
-            if region:
-                query = query.where(func.lower(Ad.region) == func.lower(region))
-            if condition:
-                query = query.where(func.lower(Ad.condition) == func.lower(condition))
-
-            order_column = Ad.created_at
-            if (sort_by or "").lower() == "price":
-                order_column = Ad.price
-            if (sort_order or "").lower() == "asc":
-                query = query.order_by(order_column.asc(), Ad.id.asc())
-            else:
-                query = query.order_by(order_column.desc(), Ad.id.desc())
-            if limit is not None:
-                query = query.limit(limit)
-            if offset is not None:
-                query = query.offset(offset)
-
-            result = await session.execute(query)
+        query, params = _catalog_query(
+            "ad",
+            car_brand_id=car_brand_id,
+            min_price=min_price,
+            max_price=max_price,
+            year_car=year_car,
+            min_year_car=min_year_car,
+            max_year_car=max_year_car,
+            min_mileage=min_mileage,
+            max_mileage=max_mileage,
+            region=region,
+            condition=condition,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            is_active=is_active,
+            limit=limit,
+            offset=offset,
+            after=after,
+        )
+        async with self._scope(session) as session:
+            result = await session.execute(query, params)
             return result.scalars().all()
 
+    # Проекции для списков каталога (без загрузки ORM-объектов)
+    async def list_summary_recent(
+        self, limit: int = 5, *, session: AsyncSession | None = None
+    ) -> list[Row]:
+        """
+        Последние активные объявления в виде строк SUMMARY_COLUMNS.
+        :param limit: Сколько записей возвращать
+        :return: Список Row с полями карточки и ``main_image_url``
+        """
+        async with self._scope(session) as session:
+            result = await session.execute(self._SUMMARY_RECENT, {"limit": limit})
+            return result.all()
+
+    async def get_summary_active_by_id(
+        self, ad_id: int, *, session: AsyncSession | None = None
+    ) -> Row | None:
+        """
+        Активное объявление по ID строкой SUMMARY_COLUMNS (карточка в каталоге).
+        :param ad_id: ID объявления
+        :return: Row или None, если объявление не найдено или неактивно
+        """
+        async with self._scope(session) as session:
+            result = await session.execute(self._SUMMARY_ACTIVE_BY_ID, {"ad_id": ad_id})
+            return result.one_or_none()
+
+    async def list_summary_search(
+        self, query: str, limit: int = 5, *, session: AsyncSession | None = None
+    ) -> list[Row]:
+        """
+        Поиск активных объявлений по словам названия/описания или подстроке названия
+        (строки SUMMARY_COLUMNS).
+        :param query: Поисковый запрос
+        :param limit: Сколько записей возвращать
+        :return: Список Row с полями карточки и ``main_image_url``
+        """
+        async with self._scope(session) as session:
+            result = await session.execute(
+                self._SUMMARY_SEARCH, {"query": query, "pattern": f"%{query}%", "limit": limit}
+            )
+            return result.all()
+
+    async def list_summary_filter(
+        self, *, with_total: bool = False, session: AsyncSession | None = None, **filters
+    ) -> list[Row]:
+        """
+        То же, что filter_ads, но строками SUMMARY_COLUMNS.
+        :param with_total: Добавить в каждую строку ``total_rows`` — COUNT(*) OVER() по фильтру
+            (с курсором ``after`` — только строки после курсора)
+        :param filters: Аргументы filter_ads
+        :return: Список Row с полями карточки и ``main_image_url``
+        """
+        query, params = _catalog_query("summary_total" if with_total else "summary", **filters)
+        async with self._scope(session) as session:
+            result = await session.execute(query, params)
+            return result.all()
+
     async def count_filtered_ads(
         self,
         car_brand_id: int | None = None,
@@ -345,88 +717,93 @@ class CrudeAdd:
         condition: str | None = None,
         *,
         is_active: bool = True,
+        session: AsyncSession | None = None,
     ) -> int:
         """Подсчитать количество объявлений по фильтрам."""
-        async with self.session() as session:
-            query = select(func.count())
-            if is_active:
-                query = query.where(Ad.is_active.is_(True))
-            if car_brand_id is not None:
-                query = query.where(Ad.car_brand_id == car_brand_id)
-            if min_price is not None:
-                query = query.where(Ad.price >= min_price)
-            if max_price is not None:
-                query = query.where(Ad.price <= max_price)
-            if year_car is not None:
-                query = query.where(Ad.year_car == year_car)
-            if min_year_car is not None:
-                query = query.where(Ad.year_car >= min_year_car)
-            if max_year_car is not None:
-                query = query.where(Ad.year_car <= max_year_car)
-            if min_mileage is not None:
-                query = query.where(Ad.mileage_km_car >= min_mileage)
-            if max_mileage is not None:
-                query = query.where(Ad.mileage_km_car <= max_mileage)
-            if region:
-                query = query.where(func.lower(Ad.region) == func.lower(region))
-            if condition:
-                query = query.where(func.lower(Ad.condition) == func.lower(condition))
-            result = await session.execute(query)
-            return result.scalar_one() or 0
-
-    async def get_by_ids(self, ids: list[int], *, is_active: bool | None = None) -> list[Ad]:
-        """Получить объявления по списку ID (с опцией фильтра по активности)."""
+        query, params = _catalog_query(
+            "count",
+            car_brand_id=car_brand_id,
+            min_price=min_price,
+            max_price=max_price,
+            year_car=year_car,
+            min_year_car=min_year_car,
+            max_year_car=max_year_car,
+            min_mileage=min_mileage,
+            max_mileage=max_mileage,
+            region=region,
+            condition=condition,
+            is_active=is_active,
+        )
+        async with self._scope(session) as session:
+            return await session.scalar(query, params)
+
+    async def get_by_ids(
+        self, ids: list[int], *, is_active: bool | None = None, session: AsyncSession | None = None
+    ) -> list[Ad]:
+        """
+        Получить объявления по списку ID.
+
+        :param ids: ID объявлений
+        :param is_active: если задан — фильтр по активности выполняется в SQL
+        :return: Список объявлений (порядок не гарантируется)
+        """
         if not ids:
             return []
-        async with self.session() as session:
-            query = select(Ad).where(Ad.id.in_(ids))
-            if is_active is True:
-                query = query.where(Ad.is_active.is_(True))
-            result = await session.execute(query)
+        async with self._scope(session) as session:
+            # = ANY(:ids) вместо IN (...): один текст запроса для любого размера списка
+            query = self._BY_IDS
+            if is_active is not None:
+                query = query.where(Ad.is_active.is_(is_active))
+            result = await session.execute(query, {"ids": list(ids)})
             return result.scalars().all()
 
     # Получение объявления в модерации
-    async def get_moderation(self, ad_id: int) -> Moderation | None:
+    async def get_moderation(
+        self, ad_id: int, *, session: AsyncSession | None = None
+    ) -> Moderation | None:
         """
         Получить информацию о модерации объявления по ID.
         :param ad_id: ID объявления
         :return: Объект Moderation или None, если не найдено
         """
-        async with self.session() as session:
-            result = await session.execute(select(Moderation).where(Moderation.ad_id == ad_id))
+        async with self._scope(session) as session:
+            result = await session.execute(self._MODERATION_BY_AD, {"ad_id": ad_id})
             return result.scalar_one_or_none()
 
     # Поиск по VIN номеру
-    async def get_by_vin(self, vin_number: str) -> Ad | None:
+    async def get_by_vin(
+        self, vin_number: str, *, session: AsyncSession | None = None
+    ) -> Ad | None:
         """
         Получить объявление по VIN номеру.
         :param vin_number: Уникальный VIN-номер
         :return: Объект Ad или None, если не найдено
         """
-        async with self.session() as session:
-            result = await session.execute(select(Ad).where(Ad.vin_number == vin_number))
+        async with self._scope(session) as session:
+            result = await session.execute(self._BY_VIN, {"vin": vin_number})
             return result.scalar_one_or_none()
 
     # Изменение статуса объявления
-    async def change_status(self, ad_id: int, is_active: bool) -> Ad:
+    async def change_status(
+        self, ad_id: int, is_active: bool, *, session: AsyncSession | None = None
+    ) -> Ad:
         """
         Изменить статус объявления (активно/неактивно).
         :param ad_id: ID объявления
         :param is_active: Новый статус объявления
         :return: Обновленный объект Ad
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли объявление с таким ID
-                stmt = await session.execute(select(Ad).where(Ad.id == ad_id))
-                existing_ad = stmt.scalar_one_or_none()
-                if not existing_ad:
+                # Обновляем статус объявления (UPDATE ... RETURNING вместо SELECT + UPDATE)
+                res = await session.execute(
+                    update(Ad).where(Ad.id == ad_id).values(is_active=is_active).returning(Ad)
+                )
+                updated_ad = res.scalar_one_or_none()
+                if not updated_ad:
                     raise ValueError("Объявление не найдено.")
-
-                # Обновляем статус объявления
-                await session.execute(update(Ad).where(Ad.id == ad_id).values(is_active=is_active))
                 await session.commit()
-                return existing_ad
+                return updated_ad
 
             except ValueError as ve:
                 await session.rollback()
@@ -437,26 +814,30 @@ class CrudeAdd:
                 raise e
 
     # Продление времени публикации объявления
-    async def extend_ad(self, ad_id: int, additional_days: int) -> Ad:
+    async def extend_ad(
+        self, ad_id: int, additional_days: int, *, session: AsyncSession | None = None
+    ) -> Ad:
         """
         Продлить время публикации объявления.
         :param ad_id: ID объявления
         :param additional_days: Количество дополнительных дней для продления
         :return: Обновленный объект Ad
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли объявление с таким ID
-                stmt = await session.execute(select(Ad).where(Ad.id == ad_id))
-                existing_ad = stmt.scalar_one_or_none()
-                if not existing_ad:
+                # Продлеваем время публикации: арифметика на стороне БД, без read-modify-write.
+                # day_count допускает NULL, а NULL + n остаётся NULL — считаем его нулём
+                res = await session.execute(
+                    update(Ad)
+                    .where(Ad.id == ad_id)
+                    .values(day_count=func.coalesce(Ad.day_count, 0) + additional_days)
+                    .returning(Ad)
+                )
+                updated_ad = res.scalar_one_or_none()
+                if not updated_ad:
                     raise ValueError("Объявление не найдено.")
-
-                # Продлеваем время публикации
-                new_day_count = existing_ad.day_count + additional_days
-                await session.execute(update(Ad).where(Ad.id == ad_id).values(day_count=new_day_count))
                 await session.commit()
-                return existing_ad
+                return updated_ad
 
             except ValueError as ve:
                 await session.rollback()
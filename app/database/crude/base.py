@@ -0,0 +1,94 @@
+import asyncio
+import functools
+import inspect
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Размер пачки при потоковом чтении (stream_scalars + yield_per)
+STREAM_CHUNK = 200
+
+
+class _BorrowedSession:
+    """Внешняя сессия, переданная в CRUD-метод через ``session=``.
+
+    Транзакцией владеет вызывающий код: ``commit`` внутри метода превращается
+    во ``flush`` (RETURNING/ID уже доступны), ``rollback`` — в no-op, исключение
+    просто пробрасывается наружу.
+    """
+
+    __slots__ = ("_session",)
+
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    def __getattr__(self, name: str):
+        return getattr(self._session, name)
+
+    async def commit(self) -> None:
+        await self._session.flush()
+
+    async def rollback(self) -> None:
+        return None
+
+
+# Запущенные агрегаты: одинаковые запросы ждут уже идущий скан, а не запускают свой
+_inflight: dict[Hashable, asyncio.Task] = {}
+
+
+def coalesced(method):
+    """Схлопывать одновременные вызовы тяжёлого read-only метода с одинаковыми аргументами.
+
+    Пока запрос выполняется, повторные вызовы ждут его результат; после завершения
+    ключ удаляется, так что устаревших данных не бывает. С внешней ``session=``
+    метод выполняется как обычно — чужую транзакцию не разделяем.
+    Ключ строится по связанным аргументам с подставленными умолчаниями:
+    ``top(5)``, ``top(limit=5)`` и ``top()`` при ``limit=5`` — один и тот же запрос.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, session: AsyncSession | None = None, **kwargs):
+        if session is not None:
+            return await method(self, *args, session=session, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        # [1:] — без self: экземпляры одного CRUD-класса делят ключ
+        key = (type(self).__name__, method.__name__, tuple(bound.arguments.items())[1:])
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(method(self, *args, **kwargs))
+            _inflight[key] = task
+            task.add_done_callback(
+                lambda done: _inflight.pop(key) if _inflight.get(key) is done else None
+            )
+        # shield: отмена одного ожидающего не должна отменять скан для остальных
+        return list(await asyncio.shield(task))
+
+    return wrapper
+
+
+# Общая база CRUD-классов
+class CrudeBase:
+
+    @asynccontextmanager
+    async def _scope(self, session: AsyncSession | None = None) -> AsyncIterator[AsyncSession]:
+        """
+        Сессия для одного CRUD-метода.
+        :param session: Внешняя AsyncSession; если не передана —
+            открывается своя через self.session()
+        :return: Своя сессия (коммитит метод) или обёртка над внешней (коммитит вызывающий)
+        """
+        if session is not None:
+            yield _BorrowedSession(session)
+            return
+        async with self.session() as own:
+            yield own
+
+    async def _stream(self, stmt, *, session: AsyncSession | None = None) -> AsyncIterator:
+        """Отдавать ORM-объекты по мере чтения серверного курсора пачками по STREAM_CHUNK."""
+        async with self._scope(session) as session:
+            result = await session.stream_scalars(stmt.execution_options(yield_per=STREAM_CHUNK))
+            async for obj in result:
+                yield obj
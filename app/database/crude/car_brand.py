@@ -1,51 +1,54 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import update, delete, func
+from sqlalchemy import bindparam, text, update, delete, func
+from sqlalchemy.exc import IntegrityError
 
 from ..models import CarBrand
 from ..db import AsyncSessionLocal
+from .base import CrudeBase
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 
 # CRUD Операции Таблицы Объявлений
-class CrudeCarBrand:
+class CrudeCarBrand(CrudeBase):
+
+    # Статические запросы собираются один раз при импорте
+    _ALL = select(CarBrand)
+    _BY_NAME = select(CarBrand).where(func.lower(CarBrand.name) == func.lower(bindparam("name")))
 
     # Инициализация класса сессии для работы с БД
     def __init__(self):
         self.session: async_sessionmaker = AsyncSessionLocal
 
     # Получение всех марок автомобилей
-    async def get_all(self) -> list[CarBrand]:
+    async def get_all(self, *, session: AsyncSession | None = None) -> list[CarBrand]:
         """
         Получить все марки автомобилей.
         :return: Список объектов CarBrand
         """
-        async with self.session() as session:
-            result = await session.execute(select(CarBrand))
+        async with self._scope(session) as session:
+            result = await session.execute(self._ALL)
             return result.scalars().all()
 
     # Создание новой марки автомобиля (через админку)
-    async def add(self, name: str) -> CarBrand:
+    async def add(self, name: str, *, session: AsyncSession | None = None) -> CarBrand:
         """
         Добавить новую марку автомобиля.
         :param name: Название марки
         :return: Объект CarBrand
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                stmt = pg_insert(CarBrand).values(name=name).on_conflict_do_nothing(index_elements=[CarBrand.name]).returning(CarBrand)
+                stmt = pg_insert(CarBrand).values(name=name).on_conflict_do_nothing(
+                    index_elements=[func.lower(CarBrand.name)]
+                ).returning(CarBrand)
                 res = await session.execute(stmt)
                 await session.commit()
                 brand = res.scalar_one_or_none()
-                if brand:
-                    return brand
-
-                # Если уже существует — выбрасываем ошибку (поведение прежнее)
-                existing = await session.execute(select(CarBrand).where(CarBrand.name == name))
-                if existing.scalar_one_or_none():
+                if not brand:
+                    # RETURNING пуст только при конфликте — марка уже существует
                     raise ValueError("Марка с таким названием уже существует.")
-                # На всякий случай: если нет — выберем и вернём
-                return existing.scalar_one_or_none()
+                return brand
 
             except ValueError as ve:
                 await session.rollback()
@@ -55,23 +58,90 @@ class CrudeCarBrand:
                 await session.rollback()
                 raise
 
+    # Массовый импорт марок (справочник из CSV и т.п.)
+    async def bulk_add(self, names: list[str], *, session: AsyncSession | None = None) -> int:
+        """
+        Добавить много марок за один проход: COPY во временную таблицу,
+        затем INSERT ... SELECT ... ON CONFLICT (lower(name)) DO NOTHING.
+        Дубликаты без учёта регистра пропускаются — и в самом списке, и среди уже сохранённых.
+        :param names: Названия марок
+        :return: Сколько марок действительно добавлено
+        """
+        # Первое написание марки выигрывает: "Toyota", "toyota" -> "Toyota"
+        by_key: dict[str, str] = {}
+        for name in names:
+            if name and name.strip():
+                by_key.setdefault(name.strip().lower(), name.strip())
+        unique_names = list(by_key.values())
+        if not unique_names:
+            return 0
+        async with self._scope(session) as session:
+            try:
+                # Первый execute открывает транзакцию — COPY ниже идёт уже внутри неё
+                await session.execute(text(
+                    "CREATE TEMP TABLE IF NOT EXISTS car_brands_import (name varchar(100)) "
+                    "ON COMMIT DROP"
+                ))
+                connection = await session.connection()
+                raw = await connection.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    "car_brands_import",
+                    records=[(name,) for name in unique_names],
+                    columns=["name"],
+                )
+                res = await session.execute(text(
+                    "INSERT INTO car_brands (name) "
+                    "SELECT DISTINCT ON (lower(name)) name FROM car_brands_import "
+                    "ORDER BY lower(name) "
+                    "ON CONFLICT (lower(name)) DO NOTHING RETURNING id"
+                ))
+                inserted = len(res.all())
+                # Во внешней транзакции таблица живёт до коммита — чистим сразу
+                await session.execute(text("DELETE FROM car_brands_import"))
+                await session.commit()
+                return inserted
+
+            except Exception:
+                await session.rollback()
+                raise
+
+    # Получить марку или создать её (для формы продажи)
+    async def upsert(self, name: str, *, session: AsyncSession | None = None) -> CarBrand:
+        """
+        Вернуть марку по названию без учёта регистра, создав её при отсутствии.
+        Один запрос: INSERT ... ON CONFLICT (lower(name)) DO UPDATE с no-op SET name = name,
+        чтобы RETURNING вернул уже существующую марку с её исходным написанием.
+        :param name: Название марки
+        :return: Объект CarBrand
+        """
+        async with self._scope(session) as session:
+            try:
+                stmt = pg_insert(CarBrand).values(name=name).on_conflict_do_update(
+                    index_elements=[func.lower(CarBrand.name)], set_={"name": CarBrand.name}
+                ).returning(CarBrand)
+                res = await session.execute(stmt)
+                await session.commit()
+                return res.scalar_one()
+
+            except Exception:
+                await session.rollback()
+                raise
+
     # Удаление марки автомобиля
-    async def delete(self, brand_id: int) -> bool | None:
+    async def delete(self, brand_id: int, *, session: AsyncSession | None = None) -> bool | None:
         """
         Удалить марку автомобиля по ID.
         :param brand_id: ID марки
         :return: True Если удаление успешно, иначе False, None если марка не найдена
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли марка с таким ID
-                stmt = await session.execute(select(CarBrand).where(CarBrand.id == brand_id))
-                existing_brand = stmt.scalar_one_or_none()
-                if not existing_brand:
+                # DELETE ... RETURNING: проверка существования и удаление за один запрос
+                res = await session.execute(
+                    delete(CarBrand).where(CarBrand.id == brand_id).returning(CarBrand.id)
+                )
+                if res.scalar_one_or_none() is None:
                     return None  # Марка не найдена
-
-                # Удаляем марку
-                await session.execute(delete(CarBrand).where(CarBrand.id == brand_id))
                 await session.commit()
                 return True  # Успешное удаление
 
@@ -80,22 +150,23 @@ class CrudeCarBrand:
                 raise e
 
     # Редактирование марки автомобиля
-    async def update(self, brand_id: int, name: str) -> CarBrand:
+    async def update(
+        self, brand_id: int, name: str, *, session: AsyncSession | None = None
+    ) -> CarBrand:
         """
         Обновить марку автомобиля по ID.
         :param brand_id: ID марки
         :param name: Новое название марки
         :return: Обновленный объект CarBrand
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем уникальность нового названия — если совпадает с другим id, ошибаемся
-                check_name = await session.execute(select(CarBrand).where(CarBrand.name == name, CarBrand.id != brand_id))
-                if check_name.scalar_one_or_none():
-                    raise ValueError("Марка с таким названием уже существует.")
-
+                # Дубликат без учёта регистра ловит уникальный индекс car_brands_name_lower_idx
                 stmt = update(CarBrand).where(CarBrand.id == brand_id).values(name=name).returning(CarBrand)
-                res = await session.execute(stmt)
+                try:
+                    res = await session.execute(stmt)
+                except IntegrityError as exc:
+                    raise ValueError("Марка с таким названием уже существует.") from exc
                 await session.commit()
                 updated = res.scalar_one_or_none()
                 if not updated:
@@ -110,9 +181,14 @@ class CrudeCarBrand:
                 await session.rollback()
                 raise
 
-    async def get_by_name(self, name: str) -> CarBrand | None:
-        async with self.session() as session:
-            result = await session.execute(
-                select(CarBrand).where(func.lower(CarBrand.name) == func.lower(name))
-            )
+    async def get_by_name(
+        self, name: str, *, session: AsyncSession | None = None
+    ) -> CarBrand | None:
+        """
+        Найти марку по названию без учёта регистра (индекс car_brands_name_lower_idx).
+        :param name: Название марки
+        :return: Объект CarBrand или None
+        """
+        async with self._scope(session) as session:
+            result = await session.execute(self._BY_NAME, {"name": name})
             return result.scalar_one_or_none()
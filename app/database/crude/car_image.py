@@ -1,91 +1,191 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from itertools import groupby
+from operator import attrgetter
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import delete
+from sqlalchemy import Integer, Row, any_, bindparam, delete
+from sqlalchemy.exc import IntegrityError
 
-from ..models import Ad, AdImage
+from ..models import AdImage
 
 from ..db import AsyncSessionLocal
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from .base import CrudeBase
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 
 
 # CRUD Операции Таблицы Изображений Объявлений
-class CrudeAdImage:
+class CrudeAdImage(CrudeBase):
+
+    # Статические запросы собираются один раз при импорте
+    # Только то, что нужно для галереи: покрывается индексом ad_images_ad_id_id_cover
+    _BY_AD_ID = (
+        select(AdImage.id, AdImage.image_url)
+        .where(AdImage.ad_id == bindparam("ad_id"))
+        .order_by(AdImage.id)
+    )
+    # Список ID одним массивом: текст SQL не зависит от длины списка,
+    # поэтому план и prepared statement asyncpg переиспользуются
+    _BY_AD_IDS = (
+        select(AdImage.ad_id, AdImage.id, AdImage.image_url)
+        .where(AdImage.ad_id == any_(bindparam("ad_ids", type_=ARRAY(Integer))))
+        .order_by(AdImage.ad_id, AdImage.id)
+    )
 
     # Инициализация класса сессии для работы с БД
     def __init__(self):
         self.session: async_sessionmaker = AsyncSessionLocal
 
     # Добавление изображения к объявлению
-    async def add(self, ad_id: int, image_url: str) -> AdImage:
+    async def add(
+        self, ad_id: int, image_url: str, *, session: AsyncSession | None = None
+    ) -> AdImage:
         """
         Добавить изображение к объявлению.
         :param ad_id: ID объявления
         :param image_url: URL изображения
         :return: Объект AdImage
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли объявление с таким ID
-                stmt = await session.execute(select(Ad).where(Ad.id == ad_id))
-                existing_ad = stmt.scalar_one_or_none()
-                if not existing_ad:
-                    raise ValueError("Объявление не найдено.")
-
-                # Вставка через INSERT ... RETURNING чтобы избежать refresh()
+                # Вставка через INSERT ... RETURNING чтобы избежать refresh();
+                # существование объявления проверяет внешний ключ ad_images.ad_id
                 stmt = pg_insert(AdImage).values(ad_id=ad_id, image_url=image_url).returning(AdImage)
                 res = await session.execute(stmt)
                 await session.commit()
                 ad_image = res.scalar_one()
                 return ad_image
 
-            except ValueError as ve:
+            except IntegrityError as exc:
                 await session.rollback()
-                raise ve
+                raise ValueError("Объявление не найдено.") from exc
 
             except Exception:
                 await session.rollback()
                 raise
 
-    # Получение всех изображений объявления
-    async def get_all_by_ad_id(self, ad_id: int) -> list[AdImage]:
+    # Пакетное добавление изображений к объявлению
+    async def add_many(
+        self, ad_id: int, image_urls: list[str], *, session: AsyncSession | None = None
+    ) -> list[AdImage]:
         """
-        Получить все изображения объявления по ID.
+        Добавить несколько изображений одним INSERT ... RETURNING и одним коммитом.
+        Существование объявления гарантирует внешний ключ ad_images.ad_id.
         :param ad_id: ID объявления
+        :param image_urls: Список URL/путей изображений (порядок сохраняется)
         :return: Список объектов AdImage
         """
-        async with self.session() as session:
-            result = await session.execute(select(AdImage).where(AdImage.ad_id == ad_id))
-            return result.scalars().all()
+        if not image_urls:
+            return []
+        async with self._scope(session) as session:
+            try:
+                stmt = (
+                    pg_insert(AdImage)
+                    .values([{"ad_id": ad_id, "image_url": url} for url in image_urls])
+                    .returning(AdImage)
+                )
+                res = await session.execute(stmt)
+                await session.commit()
+                return res.scalars().all()
 
-    async def get_map_by_ad_ids(self, ad_ids: list[int]) -> dict[int, list[AdImage]]:
-        """Вернуть словарь {ad_id: [AdImage,...]} для указанного списка."""
+            except IntegrityError as exc:
+                await session.rollback()
+                raise ValueError("Объявление не найдено.") from exc
+
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def add_many_no_return(
+        self, ad_id: int, image_urls: list[str], *, session: AsyncSession | None = None
+    ) -> int:
+        """
+        Добавить изображения одним многострочным INSERT без RETURNING — для создания
+        объявления, где строки AdImage обратно не нужны.
+        Один оператор — один срабатывающий триггер ads_image_stats на всю пачку.
+        :param ad_id: ID объявления
+        :param image_urls: Список URL/путей изображений (порядок сохраняется)
+        :return: Сколько изображений добавлено
+        """
+        if not image_urls:
+            return 0
+        async with self._scope(session) as session:
+            try:
+                stmt = pg_insert(AdImage).values(
+                    [{"ad_id": ad_id, "image_url": url} for url in image_urls]
+                )
+                res = await session.execute(stmt)
+                await session.commit()
+                return res.rowcount
+
+            except IntegrityError as exc:
+                await session.rollback()
+                raise ValueError("Объявление не найдено.") from exc
+
+            except Exception:
+                await session.rollback()
+                raise
+
+    # Получение всех изображений объявления
+    async def get_all_by_ad_id(
+        self, ad_id: int, *, session: AsyncSession | None = None
+    ) -> list[Row]:
+        """
+        Получить все изображения объявления по ID в порядке загрузки (первое — обложка).
+        :param ad_id: ID объявления
+        :return: Список строк Row(id, image_url)
+        """
+        async with self._scope(session) as session:
+            result = await session.execute(self._BY_AD_ID, {"ad_id": ad_id})
+            return result.all()
+
+    async def get_map_by_ad_ids(
+        self, ad_ids: list[int], *, session: AsyncSession | None = None
+    ) -> dict[int, list[Row]]:
+        """
+        Вернуть словарь {ad_id: [Row(ad_id, id, image_url), ...]} для указанного списка
+        одним запросом.
+        Выбираются только нужные колонки, без ORM-объектов; у строк те же
+        атрибуты ``ad_id`` / ``id`` / ``image_url``, что и у AdImage.
+        Изображения каждого объявления идут в порядке загрузки (первое — обложка).
+        """
         if not ad_ids:
             return {}
-        async with self.session() as session:
-            result = await session.execute(select(AdImage).where(AdImage.ad_id.in_(ad_ids)))
-            images = result.scalars().all()
-        mapping: dict[int, list[AdImage]] = {}
-        for img in images:
-            mapping.setdefault(img.ad_id, []).append(img)
-        return mapping
+        async with self._scope(session) as session:
+            result = await session.execute(self._BY_AD_IDS, {"ad_ids": list(set(ad_ids))})
+            rows = result.all()
+        return {ad_id: list(group) for ad_id, group in groupby(rows, key=attrgetter("ad_id"))}
+
+    async def get_existing_urls(
+        self, image_urls: list[str], *, session: AsyncSession | None = None
+    ) -> set[str]:
+        """
+        Вернуть те из переданных путей/URL, на которые ещё ссылаются объявления.
+        :param image_urls: Список путей/URL изображений
+        :return: Множество используемых image_url
+        """
+        if not image_urls:
+            return set()
+        async with self._scope(session) as session:
+            result = await session.execute(
+                select(AdImage.image_url).where(AdImage.image_url.in_(image_urls))
+            )
+            return set(result.scalars().all())
 
     # Удаление изображения объявления
-    async def delete(self, image_id: int) -> bool | None:
+    async def delete(self, image_id: int, *, session: AsyncSession | None = None) -> bool | None:
         """
         Удалить изображение объявления по ID.
         :param image_id: ID изображения
         :return: True Если удаление успешно, иначе False, None если изображение не найдено
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли изображение с таким ID
-                stmt = await session.execute(select(AdImage).where(AdImage.id == image_id))
-                existing_image = stmt.scalar_one_or_none()
-                if not existing_image:
+                # DELETE ... RETURNING: проверка существования и удаление за один запрос
+                res = await session.execute(
+                    delete(AdImage).where(AdImage.id == image_id).returning(AdImage.id)
+                )
+                if res.scalar_one_or_none() is None:
                     return None  # Изображение не найдено
-
-                # Удаляем изображение
-                await session.execute(delete(AdImage).where(AdImage.id == image_id))
                 await session.commit()
                 return True  # Успешное удаление
 
@@ -1,50 +1,68 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import delete
+from sqlalchemy import Row, bindparam, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
-from ..models import User, Ad, Favorite
+from ..models import Ad, Favorite
 from ..db import AsyncSessionLocal
+from .add import SUMMARY_COLUMNS
+from .base import CrudeBase
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 
 # CRUD Операции Таблицы Избранных Объявлений
-class CrudeFavorite:
+class CrudeFavorite(CrudeBase):
+
+    # Статические запросы собираются один раз при импорте
+    # Объявление подтягивается тем же запросом: Favorite без Ad бесполезен
+    _BY_SENDER = (
+        select(Favorite)
+        .where(Favorite.sender == bindparam("sender"))
+        .options(joinedload(Favorite.ad))
+    )
+    _EXISTS = select(Favorite.id).where(
+        Favorite.sender == bindparam("sender"), Favorite.ad_id == bindparam("ad_id")
+    )
+    _ACTIVE_SUMMARIES = (
+        select(*SUMMARY_COLUMNS)
+        .join(Favorite, Favorite.ad_id == Ad.id)
+        .where(Favorite.sender == bindparam("sender"), Ad.is_active.is_(True))
+        .order_by(Favorite.added_at.desc(), Favorite.id.desc())
+    )
 
     # Инициализация класса сессии для работы с БД
     def __init__(self):
         self.session: async_sessionmaker = AsyncSessionLocal
 
     # Добавление объявления в избранное
-    async def add(self, sender: str, ad_id: int) -> Favorite:
+    async def add(
+        self, sender: str, ad_id: int, *, session: AsyncSession | None = None
+    ) -> Favorite:
         """
         Добавить объявление в избранное.
         :param sender: Whatsapp sender ID пользователя
         :param ad_id: ID объявления
         :return: Объект Favorite
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверка существования пользователя и объявления
-                user_stmt = await session.execute(select(User).where(User.sender == sender))
-                if not user_stmt.scalar_one_or_none():
-                    raise ValueError("Пользователь не найден.")
-
-                ad_stmt = await session.execute(select(Ad).where(Ad.id == ad_id))
-                if not ad_stmt.scalar_one_or_none():
-                    raise ValueError("Объявление не найдено.")
-
-                # Попытка вставки: если уже есть — ничего не делаем
+                # Вставка; если запись уже есть — no-op UPDATE,
+                # чтобы RETURNING вернул её без второго SELECT.
+                # Существование пользователя и объявления проверяют внешние ключи.
                 stmt = pg_insert(Favorite).values(sender=sender, ad_id=ad_id)
-                stmt = stmt.on_conflict_do_nothing(index_elements=[Favorite.sender, Favorite.ad_id]).returning(Favorite)
-                res = await session.execute(stmt)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Favorite.sender, Favorite.ad_id],
+                    set_={"sender": stmt.excluded.sender},
+                ).returning(Favorite)
+                try:
+                    res = await session.execute(stmt)
+                except IntegrityError as exc:
+                    if "ad_id" in str(exc.orig):
+                        raise ValueError("Объявление не найдено.") from exc
+                    raise ValueError("Пользователь не найден.") from exc
                 await session.commit()
-                fav = res.scalar_one_or_none()
-                if fav:
-                    return fav
-
-                # Если вставка не вернула — значит уже есть запись
-                existing = await session.execute(select(Favorite).where(Favorite.sender == sender, Favorite.ad_id == ad_id))
-                return existing.scalar_one_or_none()
+                return res.scalar_one()
 
             except ValueError as ve:
                 await session.rollback()
@@ -55,14 +73,16 @@ class CrudeFavorite:
                 raise
 
     # Удаление объявления из избранного
-    async def delete(self, sender: str, ad_id: int) -> bool | None:
+    async def delete(
+        self, sender: str, ad_id: int, *, session: AsyncSession | None = None
+    ) -> bool | None:
         """
         Удалить объявление из избранного.
         :param sender: Whatsapp sender ID пользователя
         :param ad_id: ID объявления
         :return: True Если удаление успешно, иначе False, None если избранное не найдено
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
                 # Проверяем, существует ли избранное с таким sender и ad_id
                 stmt = await session.execute(
@@ -82,12 +102,40 @@ class CrudeFavorite:
                 raise e
 
     # Получение избранных объявлений пользователя
-    async def get_by_sender(self, sender: str) -> list[Favorite]:
+    async def get_by_sender(
+        self, sender: str, *, session: AsyncSession | None = None
+    ) -> list[Favorite]:
         """
         Получить избранные объявления пользователя по sender.
         :param sender: Whatsapp sender ID
         :return: Список объектов Favorite
         """
-        async with self.session() as session:
-            result = await session.execute(select(Favorite).where(Favorite.sender == sender))
+        async with self._scope(session) as session:
+            result = await session.execute(self._BY_SENDER, {"sender": sender})
             return result.scalars().all()
+
+    # Проверка «в избранном ли» без загрузки объектов
+    async def exists(self, sender: str, ad_id: int, *, session: AsyncSession | None = None) -> bool:
+        """
+        Проверить, добавлено ли объявление в избранное пользователя.
+        :param sender: Whatsapp sender ID
+        :param ad_id: ID объявления
+        :return: True, если запись есть
+        """
+        async with self._scope(session) as session:
+            found = await session.scalar(self._EXISTS, {"sender": sender, "ad_id": ad_id})
+            return found is not None
+
+    # Активные объявления из избранного пользователя (один JOIN-запрос)
+    async def get_active_summaries(
+        self, sender: str, *, session: AsyncSession | None = None
+    ) -> list[Row]:
+        """
+        Получить активные избранные объявления пользователя одним JOIN-запросом
+        сразу с обложкой (строки SUMMARY_COLUMNS, как в каталоге).
+        :param sender: Whatsapp sender ID
+        :return: Список Row (сначала недавно добавленные)
+        """
+        async with self._scope(session) as session:
+            result = await session.execute(self._ACTIVE_SUMMARIES, {"sender": sender})
+            return result.all()
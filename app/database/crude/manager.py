@@ -1,5 +1,7 @@
 from __future__ import annotations
+import inspect
 from contextlib import asynccontextmanager
+from functools import partial
 from types import SimpleNamespace
 from typing import AsyncIterator
 
@@ -16,21 +18,24 @@ from .moder import CrudeModeration, CrudeModerator
 from .payment import CrudePayment
 
 
-def _bind_session_to_crud(crud_instance, bound_session):
-    """Возвращает тот же объект crud_instance, но с session, привязанной к конкретной AsyncSession.
+class _BoundCrud:
+    """Представление CRUD-инстанса, у которого каждый метод получает ``session=`` заранее.
 
-    Мы не создаём новую длительную сессию — просто заменяем атрибут `session` на asynccontextmanager,
-    который при `async with crud.session()` вернёт уже существующую сессию (не закроет её).
-    Это позволяет выполнять методы CRUD в рамках внешней сессии без изменения их реализации.
+    Общий синглтон при этом не меняется, поэтому параллельные запросы
+    с разными сессиями не мешают друг другу.
     """
 
-    @asynccontextmanager
-    async def _cm():
-        yield bound_session
+    __slots__ = ("_crud", "_session")
+
+    def __init__(self, crud_instance, bound_session) -> None:
+        self._crud = crud_instance
+        self._session = bound_session
 
-    # Патчим атрибут .session экземпляра (обычно это sessionmaker)
-    setattr(crud_instance, "session", _cm)
-    return crud_instance
+    def __getattr__(self, name: str):
+        attr = getattr(self._crud, name)
+        if inspect.ismethod(attr) and not name.startswith("_"):
+            return partial(attr, session=self._session)
+        return attr
 
 
 class CrudManager:
@@ -42,14 +47,25 @@ class CrudManager:
     mgr = CrudManager()
     await mgr.user.add(...)
 
-    # объединённая транзакция с одной сессией
+    # объединённая транзакция с одной сессией: методы получают её через session=
+    # и не коммитят сами — коммит делает владелец сессии
+    async with mgr.session() as session:
+        await mgr.user.update_balance(sender, 100, True, session=session)
+        await mgr.favorite.add(sender, ad_id, session=session)
+        await session.commit()
+
+    # то же через bind_all: общий набор CRUD-ов остаётся нетронутым
     async with mgr.session() as session:
-        bound_user = mgr.bind(mgr.user, session)
-        bound_fav = mgr.bind(mgr.favorite, session)
-        await bound_user.update_balance(sender, 100)
-        await bound_fav.add(sender, ad_id)
+        crud = mgr.bind_all(session)
+        await crud.user.update_balance(sender, 100, True)
+        await crud.favorite.add(sender, ad_id)
         await session.commit()
 
+    # то же одной строкой: transaction() коммитит сам (или откатывает при ошибке)
+    async with mgr.transaction() as crud:
+        await crud.user.update_balance(sender, 100, True)
+        await crud.favorite.add(sender, ad_id)
+
     """
 
     def __init__(self, session_factory: object | None = None):
@@ -73,14 +89,23 @@ class CrudManager:
         async with self.session_factory() as session:
             yield session
 
-    def bind(self, crud_instance, bound_session):
-        """Привязать конкретный объект CRUD к существующей session и вернуть его.
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[SimpleNamespace]:
+        """Одна транзакция на несколько CRUD-вызовов.
+
+        Возвращает набор CRUD-ов, привязанных к сессии из ``session_factory.begin()``:
+        методы внутри блока только делают flush, коммит выполняется один раз на выходе,
+        при исключении — откат.
+        """
+        async with self.session_factory.begin() as session:
+            yield self.bind_all(session)
+
+    def bind(self, crud_instance, bound_session) -> _BoundCrud:
+        """Вернуть обёртку над CRUD, методы которой выполняются в переданной session.
 
-        Небольшой хак: мы заменяем атрибут `session` на asynccontextmanager, который будет yield-ить
-        переданную сессию. CRUD-методы, которые делают `async with self.session() as session` будут
-        использовать эту сессию.
+        Сам crud_instance не изменяется — обёртка подставляет ``session=`` в каждый вызов.
         """
-        return _bind_session_to_crud(crud_instance, bound_session)
+        return _BoundCrud(crud_instance, bound_session)
 
     def bind_all(self, bound_session) -> SimpleNamespace:
         """Вернуть набор всех CRUD-ов, привязанных к одной сессии."""
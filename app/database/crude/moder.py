@@ -1,31 +1,60 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import update, func
+from sqlalchemy import literal, true, update, func
+from sqlalchemy.orm import aliased, contains_eager, joinedload, undefer_group
 
-from ..models import Ad, Moderation, Moderator
+from ..models import DETAIL, Ad, Moderation, Moderator
 from ..db import AsyncSessionLocal
+from .base import CrudeBase
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 
+# Список активных модераторов меняется редко: держим его в памяти процесса,
+# сбрасываем по TTL и при add/deactivate
+MODERATORS_TTL = 60
+_mods_cache: dict = {"expires": 0.0, "data": None}
+
+
+def _invalidate_moderators() -> None:
+    _mods_cache["expires"] = 0.0
+    _mods_cache["data"] = None
+
+
 # CRUD Операции Таблицы Модерации
-class CrudeModeration:
+class CrudeModeration(CrudeBase):
 
     # Инициализация класса сессии для работы с БД
     def __init__(self):
         self.session: async_sessionmaker = AsyncSessionLocal
 
     # Получение всех объявлений со статусом `pending`
-    async def get_pending_ads(self) -> list[Ad]:
+    async def get_pending_ads(self, *, session: AsyncSession | None = None) -> list[Ad]:
         """
         Получить все объявления со статусом `pending`.
         :return: Список объектов Ad
         """
-        async with self.session() as session:
-            result = await session.execute(select(Ad).where(Ad.moderation.has(status="pending")))
+        async with self._scope(session) as session:
+            # JOIN вместо EXISTS: модерация приходит той же строкой и сразу
+            # заполняет Ad.moderation, без отдельного запроса на каждое объявление
+            result = await session.execute(
+                select(Ad)
+                .join(Ad.moderation)
+                .where(Moderation.status == "pending")
+                .options(contains_eager(Ad.moderation))
+            )
             return result.scalars().all()
 
     # Обновление статуса (`approved` / `rejected`)
-    async def update_status(self, ad_id: int, status: str, comment: str | None = None) -> Moderation:
+    async def update_status(
+        self,
+        ad_id: int,
+        status: str,
+        comment: str | None = None,
+        *,
+        session: AsyncSession | None = None,
+    ) -> Moderation:
         """
         Обновить статус модерации объявления.
         :param ad_id: ID объявления
@@ -33,9 +62,15 @@ class CrudeModeration:
         :param comment: Комментарий к статусу (необязательно)
         :return: Объект Moderation
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                stmt = update(Moderation).where(Moderation.ad_id == ad_id).values(status=status, comment=comment).returning(Moderation)
+                stmt = (
+                    update(Moderation)
+                    .where(Moderation.ad_id == ad_id)
+                    .values(status=status, comment=comment)
+                    .returning(Moderation)
+                    .options(undefer_group(DETAIL))
+                )
                 res = await session.execute(stmt)
                 await session.commit()
                 moderation = res.scalar_one_or_none()
@@ -52,26 +87,39 @@ class CrudeModeration:
                 raise
 
     # Привязка модератора к объявлению
-    async def assign_moderator(self, ad_id: int, moderator_id: int) -> Moderation:
+    async def assign_moderator(
+        self, ad_id: int, moderator_id: int, *, session: AsyncSession | None = None
+    ) -> Moderation:
         """
         Привязать модератора к объявлению.
         :param ad_id: ID объявления
         :param moderator_id: ID модератора
         :return: Объект Moderation
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Убедимся, что модератор существует
-                mod_stmt = await session.execute(select(Moderator).where(Moderator.id == moderator_id))
-                if not mod_stmt.scalar_one_or_none():
+                # Один запрос: CTE проверяет модератора, UPDATE выполняется только если он есть.
+                # В отличие от ловли FK-ошибки, не обрывает внешнюю транзакцию (session=)
+                chk = select(Moderator.id).where(Moderator.id == moderator_id).cte("chk")
+                upd = (
+                    update(Moderation)
+                    .where(Moderation.ad_id == ad_id, select(chk.c.id).exists())
+                    .values(moderator_id=moderator_id)
+                    .returning(*Moderation.__table__.c)
+                    .cte("upd")
+                )
+                one = select(literal(1).label("one")).subquery("one")
+                stmt = (
+                    select(select(chk.c.id).exists().label("mod_found"), aliased(Moderation, upd))
+                    .select_from(one)
+                    .outerjoin(upd, true())
+                )
+                mod_found, moderation = (await session.execute(stmt)).one()
+                if not mod_found:
                     raise ValueError("Модератор не найден.")
-
-                stmt = update(Moderation).where(Moderation.ad_id == ad_id).values(moderator_id=moderator_id).returning(Moderation)
-                res = await session.execute(stmt)
-                await session.commit()
-                moderation = res.scalar_one_or_none()
                 if not moderation:
                     raise ValueError("Модерация не найдена.")
+                await session.commit()
                 return moderation
 
             except ValueError as ve:
@@ -83,61 +131,69 @@ class CrudeModeration:
                 raise
 
     # Получение истории модерации по модератору
-    async def get_moderation_history(self, moderator_id: int) -> list[Moderation]:
+    async def get_moderation_history(
+        self, moderator_id: int, *, session: AsyncSession | None = None
+    ) -> list[Moderation]:
         """
         Получить историю модерации по ID модератора.
         :param moderator_id: ID модератора
         :return: Список объектов Moderation
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
+            # Объявление подгружается тем же запросом (many-to-one, JOIN)
             result = await session.execute(
-                select(Moderation).where(Moderation.moderator_id == moderator_id)
+                select(Moderation)
+                .where(Moderation.moderator_id == moderator_id)
+                .options(joinedload(Moderation.ad), undefer_group(DETAIL))
             )
             return result.scalars().all()
 
     # Комментарии к отклонённым объявлениям
-    async def get_rejected_comments(self, ad_id: int) -> str | None:
+    async def get_rejected_comments(
+        self, ad_id: int, *, session: AsyncSession | None = None
+    ) -> str | None:
         """
         Получить комментарий к отклонённому объявлению.
         :param ad_id: ID объявления
         :return: Комментарий к отклонению или None, если объявление не отклонено
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             result = await session.execute(
-                select(Moderation.comment).where(Moderation.ad_id == ad_id, Moderation.status == "rejected")
+                select(Moderation.comment).where(
+                    Moderation.ad_id == ad_id, Moderation.status == "rejected"
+                )
             )
             return result.scalar_one_or_none()
 
 
 # CRUD Операции Таблицы Модераторов
-class CrudeModerator:
+class CrudeModerator(CrudeBase):
 
     # Инициализация класса сессии для работы с БД
     def __init__(self):
         self.session: async_sessionmaker = AsyncSessionLocal
 
     # Создание модератора
-    async def add(self, telegram_id: int, username: str | None = None) -> Moderator:
+    async def add(
+        self, telegram_id: int, username: str | None = None, *, session: AsyncSession | None = None
+    ) -> Moderator:
         """
         Добавить нового модератора.
         :param telegram_id: ID модератора в Telegram
         :param username: Имя пользователя (необязательно)
         :return: Объект Moderator
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
                 stmt = pg_insert(Moderator).values(telegram_id=telegram_id, username=username).on_conflict_do_nothing(index_elements=[Moderator.telegram_id]).returning(Moderator)
                 res = await session.execute(stmt)
                 await session.commit()
                 moderator = res.scalar_one_or_none()
-                if moderator:
-                    return moderator
-
-                # Если уже был — выберем существующего и кинем ошибку
-                existing = await session.execute(select(Moderator).where(Moderator.telegram_id == telegram_id))
-                if existing.scalar_one_or_none():
+                if not moderator:
+                    # RETURNING пуст только при конфликте — модератор уже существует
                     raise ValueError("Модератор с таким Telegram ID уже существует.")
-                return existing.scalar_one_or_none()
+                _invalidate_moderators()
+                return moderator
 
             except ValueError as ve:
                 await session.rollback()
@@ -148,34 +204,49 @@ class CrudeModerator:
                 raise
 
     # Получение всех активных модераторов
-    async def get_all_active(self) -> list[Moderator]:
+    async def get_all_active(self, *, session: AsyncSession | None = None) -> list[Moderator]:
         """
-        Получить всех активных модераторов.
+        Получить всех активных модераторов (кешируется на MODERATORS_TTL секунд).
+        С внешней ``session=`` кеш не читается и не пополняется: вызывающий должен
+        видеть свою транзакцию, включая ещё не закоммиченные add/deactivate.
         :return: Список объектов Moderator
         """
-        async with self.session() as session:
+        shared = session is None
+        if shared and _mods_cache["data"] is not None and time.monotonic() < _mods_cache["expires"]:
+            return list(_mods_cache["data"])
+        async with self._scope(session) as session:
             result = await session.execute(select(Moderator).where(Moderator.is_active.is_(True)))
-            return result.scalars().all()
+            moderators = result.scalars().all()
+        if not shared:
+            return list(moderators)
+        _mods_cache["data"] = moderators
+        _mods_cache["expires"] = time.monotonic() + MODERATORS_TTL
+        return list(moderators)
 
     # Деактивация модератора
-    async def deactivate(self, moderator_id: int) -> Moderator:
+    async def deactivate(
+        self, moderator_id: int, *, session: AsyncSession | None = None
+    ) -> Moderator:
         """
         Деактивировать модератора по ID.
         :param moderator_id: ID модератора
         :return: Объект Moderator
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли модератор с таким ID
-                stmt = await session.execute(select(Moderator).where(Moderator.id == moderator_id))
-                existing_moderator = stmt.scalar_one_or_none()
-                if not existing_moderator:
+                # Деактивируем модератора (UPDATE ... RETURNING — заодно проверка существования)
+                res = await session.execute(
+                    update(Moderator)
+                    .where(Moderator.id == moderator_id)
+                    .values(is_active=False)
+                    .returning(Moderator)
+                )
+                moderator = res.scalar_one_or_none()
+                if not moderator:
                     raise ValueError("Модератор не найден.")
-
-                # Деактивируем модератора
-                await session.execute(update(Moderator).where(Moderator.id == moderator_id).values(is_active=False))
                 await session.commit()
-                return existing_moderator
+                _invalidate_moderators()
+                return moderator
 
             except ValueError as ve:
                 await session.rollback()
@@ -186,14 +257,17 @@ class CrudeModerator:
                 raise e
 
     # Получение количества проверок
-    async def get_moderation_count(self, moderator_id: int) -> int:
+    async def get_moderation_count(
+        self, moderator_id: int, *, session: AsyncSession | None = None
+    ) -> int:
         """
         Получить количество проверок модератора по ID.
         :param moderator_id: ID модератора
         :return: Количество проверок
         """
-        async with self.session() as session:
-            result = await session.execute(
-                select(func.count(Moderation.id)).where(Moderation.moderator_id == moderator_id)
+        async with self._scope(session) as session:
+            return await session.scalar(
+                select(func.count())
+                .select_from(Moderation)
+                .where(Moderation.moderator_id == moderator_id)
             )
-            return result.scalar_one_or_none() or 0
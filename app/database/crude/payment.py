@@ -1,20 +1,30 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 
-from ..models import User, Payment
+from ..models import Payment
 from ..db import AsyncSessionLocal
+from .base import CrudeBase, coalesced
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 
 # CRUD Операции Таблицы Платежей
-class CrudePayment:
+class CrudePayment(CrudeBase):
 
     # Инициализация класса сессии для работы с БД
     def __init__(self):
         self.session: async_sessionmaker = AsyncSessionLocal
 
     # Создание платежа
-    async def add(self, sender: str, amount: int, description: str | None = None) -> Payment:
+    async def add(
+        self,
+        sender: str,
+        amount: int,
+        description: str | None = None,
+        *,
+        session: AsyncSession | None = None,
+    ) -> Payment:
         """
         Добавить новый платеж.
         :param sender: Whatsapp sender ID пользователя
@@ -22,14 +32,14 @@ class CrudePayment:
         :param description: Описание платежа (необязательно)
         :return: Объект Payment
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                user_stmt = await session.execute(select(User).where(User.sender == sender))
-                if not user_stmt.scalar_one_or_none():
-                    raise ValueError("Пользователь не найден.")
-
+                # Существование пользователя проверяет внешний ключ payments.sender
                 stmt = pg_insert(Payment).values(sender=sender, amount=amount, description=description).returning(Payment)
-                res = await session.execute(stmt)
+                try:
+                    res = await session.execute(stmt)
+                except IntegrityError as exc:
+                    raise ValueError("Пользователь не найден.") from exc
                 await session.commit()
                 return res.scalar_one()
 
@@ -42,40 +52,50 @@ class CrudePayment:
                 raise
 
     # Получение всех платежей пользователя
-    async def get_by_sender(self, sender: str) -> list[Payment]:
+    async def get_by_sender(
+        self, sender: str, *, session: AsyncSession | None = None
+    ) -> list[Payment]:
         """
         Получить все платежи пользователя по sender.
         :param sender: Whatsapp sender ID
         :return: Список объектов Payment
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             result = await session.execute(select(Payment).where(Payment.sender == sender))
             return result.scalars().all()
 
     # Аналитика платежей кто сколько потратил
-    async def get_spending_summary(self) -> list[tuple[str, int]]:
+    @coalesced
+    async def get_spending_summary(
+        self, *, session: AsyncSession | None = None
+    ) -> list[tuple[str, int]]:
         """
         Получить сводку по платежам: кто сколько потратил.
         :return: Список кортежей (sender, total_spent)
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             result = await session.execute(
-                select(Payment.sender, Payment.amount).group_by(Payment.sender)
+                select(Payment.sender, func.sum(Payment.amount).label("total"))
+                .group_by(Payment.sender)
             )
-            return [(row.sender, row.amount) for row in result.fetchall()]
+            return [(row.sender, int(row.total)) for row in result.fetchall()]
 
     # Аналитика Топ клиентов
-    async def get_top_clients(self, limit: int = 10) -> list[tuple[str, int]]:
+    @coalesced
+    async def get_top_clients(
+        self, limit: int = 10, *, session: AsyncSession | None = None
+    ) -> list[tuple[str, int]]:
         """
         Получить топ клиентов по сумме платежей.
         :param limit: Количество топ клиентов (по умолчанию 10)
         :return: Список кортежей (sender, total_spent)
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
+            total = func.sum(Payment.amount).label("total")
             result = await session.execute(
-                select(Payment.sender, Payment.amount)  # Выбираем отправителя и сумму
+                select(Payment.sender, total)  # Выбираем отправителя и сумму его платежей
                 .group_by(Payment.sender)  # Группировка по отправителю
-                .order_by(Payment.amount.desc())  # Сортировка по убыванию суммы
+                .order_by(total.desc())  # Сортировка по убыванию суммы
                 .limit(limit)  # Ограничение по количеству клиентов
             )
-            return [(row.sender, row.amount) for row in result.fetchall()]
+            return [(row.sender, int(row.total)) for row in result.fetchall()]
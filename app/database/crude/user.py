@@ -1,20 +1,40 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import update, delete
+from sqlalchemy import Integer, bindparam, update, delete
+from sqlalchemy.orm import joinedload, selectinload
 
 from ..models import User, Ad, Favorite
 from ..db import AsyncSessionLocal
+from .base import CrudeBase
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 # CRUD Операции Таблицы Пользователей
-class CrudeUser:
+class CrudeUser(CrudeBase):
+
+    # Статические запросы собираются один раз при импорте, значения идут bind-параметрами
+    _BY_SENDER = select(User).where(User.sender == bindparam("sender"))
+    _BALANCE_BY_SENDER = select(User.balance).where(User.sender == bindparam("sender"))
+    _DELTA = bindparam("delta", type_=Integer)
+    _UPDATE_BALANCE = (
+        update(User)
+        .where(User.sender == bindparam("sender"), User.balance + _DELTA >= 0)
+        .values(balance=User.balance + _DELTA)
+        .returning(User.balance)
+    )
 
     # Инициализация класса сессии для работы с БД
     def __init__(self):
         self.session: async_sessionmaker = AsyncSessionLocal
 
     # Создание пользователя
-    async def add(self, sender: str, username: str | None = None, balance: int = 0) -> User:
+    async def add(
+        self,
+        sender: str,
+        username: str | None = None,
+        balance: int = 0,
+        *,
+        session: AsyncSession | None = None,
+    ) -> User:
         """
         Добавить нового пользователя в базу данных.
         :param sender: Whatsapp sender ID
@@ -22,100 +42,116 @@ class CrudeUser:
         :param balance: Баланс пользователя (по умолчанию 0)
         :return: Объект User
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Попытка вставки с ON CONFLICT DO NOTHING и RETURNING
+                # Вставка; если пользователь уже есть — no-op UPDATE, чтобы RETURNING
+                # вернул существующую строку без второго SELECT (username/balance не трогаем)
                 stmt = pg_insert(User).values(sender=sender, username=username, balance=balance)
-                stmt = stmt.on_conflict_do_nothing(index_elements=[User.sender]).returning(User)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[User.sender], set_={"sender": stmt.excluded.sender}
+                ).returning(User)
                 res = await session.execute(stmt)
                 await session.commit()
-                user = res.scalar_one_or_none()
-                if user:
-                    return user
-
-                # Если запись уже существовала, выбираем её
-                existing = await session.execute(select(User).where(User.sender == sender))
-                return existing.scalar_one_or_none()
+                return res.scalar_one()
 
             except Exception:
                 await session.rollback()
                 raise
 
     # Поиск пользователя по sender
-    async def get_by_sender(self, sender: str) -> User | None:
+    async def get_by_sender(
+        self, sender: str, *, session: AsyncSession | None = None
+    ) -> User | None:
         """
         Получить пользователя по sender.
         :param sender: Whatsapp sender ID
         :return: Объект User или None, если пользователь не найден
         """
-        async with self.session() as session:
-            result = await session.execute(select(User).where(User.sender == sender))
+        async with self._scope(session) as session:
+            result = await session.execute(self._BY_SENDER, {"sender": sender})
             return result.scalar_one_or_none()
 
+    # Только баланс пользователя, без загрузки ORM-объекта
+    async def get_balance_scalar(
+        self, sender: str, *, session: AsyncSession | None = None
+    ) -> int | None:
+        """
+        Получить баланс пользователя по sender.
+        :param sender: Whatsapp sender ID
+        :return: Баланс или None, если пользователь не найден
+        """
+        async with self._scope(session) as session:
+            return await session.scalar(self._BALANCE_BY_SENDER, {"sender": sender})
+
     # Обновление баланса + | -
-    async def update_balance(self, sender: str, amount: int, operation: bool) -> None:
+    async def update_balance(
+        self, sender: str, amount: int, operation: bool, *, session: AsyncSession | None = None
+    ) -> int | None:
         """
-        Обновить баланс пользователя.
+        Обновить баланс пользователя одним UPDATE ... RETURNING.
+        Списание проходит только при достаточном балансе — условие проверяется в том же запросе.
         :param sender: Whatsapp sender ID
         :param amount: Сумма для добавления или вычитания из баланса
         :param operation: True для увеличения баланса, False для уменьшения
-        :return: None
+        :return: Новый баланс или None, если пользователь не найден или средств недостаточно
         """
-        async with self.session() as session:
+        delta = amount if operation else -amount
+        async with self._scope(session) as session:
             try:
-                stmt = None
-                # Если Увелечения баланса
-                if operation:
-                    stmt = update(User).where(User.sender == sender).values(balance=User.balance + amount)
-                # Иначе Уменьшение баланса
-                else:
-                    stmt = update(User).where(User.sender == sender).values(balance=User.balance - amount)
-
-                await session.execute(stmt)
+                res = await session.execute(
+                    self._UPDATE_BALANCE, {"sender": sender, "delta": delta}
+                )
+                balance = res.scalar_one_or_none()
                 await session.commit()
+                return balance
             except Exception as e:
                 await session.rollback()
                 raise e
 
     # Получение всех объявлений пользователя
-    async def get_all_ads(self, sender: str) -> list[Ad]:
+    async def get_all_ads(self, sender: str, *, session: AsyncSession | None = None) -> list[Ad]:
         """
         Получить все объявления пользователя.
         :param sender: Whatsapp sender ID
         :return: Список объектов Ad
         """
-        async with self.session() as session:
-            result = await session.execute(select(Ad).where(Ad.sender == sender))
+        async with self._scope(session) as session:
+            # Статус модерации нужен в кабинете продавца — грузим вторым запросом на всю пачку
+            result = await session.execute(
+                select(Ad).where(Ad.sender == sender).options(selectinload(Ad.moderation))
+            )
             return result.scalars().all()
 
     # Получение избранного пользователя
-    async def get_favorites(self, sender: str) -> list[Favorite]:
+    async def get_favorites(
+        self, sender: str, *, session: AsyncSession | None = None
+    ) -> list[Favorite]:
         """
         Получить избранные объявления пользователя.
         :param sender: Whatsapp sender ID
         :return: Список объектов Favorite
         """
-        async with self.session() as session:
-            result = await session.execute(select(Favorite).where(Favorite.sender == sender))
+        async with self._scope(session) as session:
+            result = await session.execute(
+                select(Favorite).where(Favorite.sender == sender).options(joinedload(Favorite.ad))
+            )
             return result.scalars().all()
 
     # Удаление пользователя (редко используется)
-    async def delete(self, sender: str) -> bool | None:
+    async def delete(self, sender: str, *, session: AsyncSession | None = None) -> bool | None:
         """
         Удалить пользователя по sender.
         :param sender: Whatsapp sender ID
         :return: True Если удаление иначе False, None если пользователь не найден
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли пользователь с таким sender
-                stmt = await session.execute(select(User).where(User.sender == sender))
-                result = stmt.scalar_one_or_none()
-                if not result:
+                # DELETE ... RETURNING: проверка существования и удаление за один запрос
+                res = await session.execute(
+                    delete(User).where(User.sender == sender).returning(User.sender)
+                )
+                if res.scalar_one_or_none() is None:
                     return None  # Пользователь не найден
-
-                # Удаляем пользователя
-                await session.execute(delete(User).where(User.sender == sender))
                 await session.commit()
                 return True  # Успешное удаление
 
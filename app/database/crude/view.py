@@ -1,38 +1,58 @@
 from datetime import datetime
+from typing import AsyncIterator
 
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import func
+from sqlalchemy import bindparam, func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
-from ..models import Ad, ViewLog
+from ..models import ViewLog
 from ..db import AsyncSessionLocal
+from .base import STREAM_CHUNK, CrudeBase, coalesced
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 
 # CRUD Операции Таблицы Просмотров Объявлений
-class CrudeViewLog:
+class CrudeViewLog(CrudeBase):
+
+    # Статические запросы собираются один раз при импорте
+    _COUNT_BY_AD = (
+        select(func.count()).select_from(ViewLog).where(ViewLog.ad_id == bindparam("ad_id"))
+    )
+    _LOCK_STAGE = text("LOCK TABLE view_logs_stage IN ACCESS EXCLUSIVE MODE")
+    _INSERT_FROM_STAGE = text(
+        "INSERT INTO view_logs (ad_id, sender, viewed_at) "
+        "SELECT s.ad_id, s.sender, s.viewed_at FROM view_logs_stage s "
+        "JOIN ads ON ads.id = s.ad_id JOIN users ON users.sender = s.sender"
+    )
+    _TRUNCATE_STAGE = text("TRUNCATE view_logs_stage")
+    _CREATE_NEXT_PARTITION = text(
+        "SELECT view_logs_create_partition((now() + interval '1 month')::date)"
+    )
 
     # Инициализация класса сессии для работы с БД
     def __init__(self):
         self.session: async_sessionmaker = AsyncSessionLocal
 
     # Добавление записи о просмотре
-    async def add(self, ad_id: int, sender: str) -> ViewLog:
+    async def add(self, ad_id: int, sender: str, *, session: AsyncSession | None = None) -> ViewLog:
         """
         Добавить запись о просмотре объявления.
         :param ad_id: ID объявления
         :param sender: Whatsapp sender ID пользователя
         :return: Объект ViewLog
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
             try:
-                # Проверяем, существует ли объявление с таким ID
-                stmt = await session.execute(select(Ad).where(Ad.id == ad_id))
-                if not stmt.scalar_one_or_none():
-                    raise ValueError("Объявление не найдено.")
-
+                # Существование объявления и пользователя проверяют внешние ключи
                 ins = pg_insert(ViewLog).values(ad_id=ad_id, sender=sender).returning(ViewLog)
-                res = await session.execute(ins)
+                try:
+                    res = await session.execute(ins)
+                except IntegrityError as exc:
+                    if "ad_id" in str(exc.orig):
+                        raise ValueError("Объявление не найдено.") from exc
+                    raise ValueError("Пользователь не найден.") from exc
                 await session.commit()
                 return res.scalar_one()
 
@@ -44,69 +64,147 @@ class CrudeViewLog:
                 await session.rollback()
                 raise
 
+    # Пакетная запись просмотров (буфер просмотров в боте)
+    async def add_many(
+        self, views: list[tuple[int, str, datetime]], *, session: AsyncSession | None = None
+    ) -> int:
+        """
+        Записать пачку просмотров: COPY в UNLOGGED-таблицу view_logs_stage,
+        затем INSERT ... SELECT в view_logs и TRUNCATE буфера — одной транзакцией.
+        Просмотры несуществующих объявлений или пользователей отбрасываются JOIN-ом,
+        чтобы одна битая строка не роняла всю пачку на внешнем ключе.
+        :param views: Кортежи (ad_id, sender, viewed_at)
+        :return: Сколько просмотров записано
+        """
+        if not views:
+            return 0
+        async with self._scope(session) as session:
+            try:
+                # Первый execute открывает транзакцию — COPY ниже идёт уже внутри неё.
+                # Буфер общий для всех процессов: блокируем его сразу, иначе два сброса
+                # с ROW EXCLUSIVE от COPY взаимно заблокируются на TRUNCATE
+                await session.execute(self._LOCK_STAGE)
+                connection = await session.connection()
+                raw = await connection.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    "view_logs_stage", records=views, columns=["ad_id", "sender", "viewed_at"]
+                )
+                res = await session.execute(self._INSERT_FROM_STAGE)
+                inserted = res.rowcount
+                await session.execute(self._TRUNCATE_STAGE)
+                await session.commit()
+                return inserted
+
+            except Exception:
+                await session.rollback()
+                raise
+
+    # Партиция на следующий месяц (вызывается janitor-ом раз в час)
+    async def create_next_partition(self, *, session: AsyncSession | None = None) -> None:
+        """
+        Создать партицию view_logs на следующий месяц, если её ещё нет.
+        Делать это нужно заранее: пока месяц не наступил, в DEFAULT-партиции нет его строк,
+        иначе Postgres откажется создать партицию поверх них.
+        """
+        async with self._scope(session) as session:
+            try:
+                await session.execute(self._CREATE_NEXT_PARTITION)
+                await session.commit()
+
+            except Exception:
+                await session.rollback()
+                raise
+
     # Получение количества просмотров объявления
-    async def get_view_count(self, ad_id: int) -> int:
+    async def get_view_count(self, ad_id: int, *, session: AsyncSession | None = None) -> int:
         """
         Получить количество просмотров объявления по ID.
         :param ad_id: ID объявления
         :return: Количество просмотров
         """
-        async with self.session() as session:
-            result = await session.execute(
-                select(func.count(ViewLog.id)).where(ViewLog.ad_id == ad_id)
-            )
-            return result.scalar_one_or_none() or 0
+        async with self._scope(session) as session:
+            # COUNT(*) — без проверки id на NULL, планировщику проще
+            return await session.scalar(self._COUNT_BY_AD, {"ad_id": ad_id})
 
     # Получение всех просмотров пользователя
-    async def get_by_sender(self, sender: str) -> list[ViewLog]:
+    async def get_by_sender(
+        self, sender: str, *, session: AsyncSession | None = None
+    ) -> list[ViewLog]:
         """
         Получить все просмотры пользователя по sender.
         :param sender: Whatsapp sender ID
         :return: Список объектов ViewLog
         """
-        async with self.session() as session:
-            result = await session.execute(select(ViewLog).where(ViewLog.sender == sender))
+        async with self._scope(session) as session:
+            result = await session.execute(
+                select(ViewLog).where(ViewLog.sender == sender).options(joinedload(ViewLog.ad))
+            )
             return result.scalars().all()
 
     # Аналитика: кто что смотрит
-    async def get_view_analytics(self) -> list[tuple[str, int]]:
+    @coalesced
+    async def get_view_analytics(
+        self, *, session: AsyncSession | None = None
+    ) -> list[tuple[str, int]]:
         """
         Получить аналитику просмотров: кто что смотрит.
         :return: Список кортежей (sender, ad_id, view_count)
         """
-        async with self.session() as session:
-            result = await session.execute(
-                select(ViewLog.sender, ViewLog.ad_id, func.count(ViewLog.id).label("view_count"))
+        async with self._scope(session) as session:
+            # Строк может быть много — читаем потоком пачками, без ORM-объектов
+            result = await session.stream(
+                select(ViewLog.sender, ViewLog.ad_id, func.count().label("view_count"))
                 .group_by(ViewLog.sender, ViewLog.ad_id)
+                .execution_options(yield_per=STREAM_CHUNK)
             )
-            return [(row.sender, int(row.ad_id), int(row.view_count)) for row in result.fetchall()]
+            return [(row.sender, int(row.ad_id), int(row.view_count)) async for row in result]
 
     # Аналитика: что самое популярное
-    async def get_popular_ads(self, limit: int = 10) -> list[tuple[int, int]]:
+    @coalesced
+    async def get_popular_ads(
+        self, limit: int = 10, *, session: AsyncSession | None = None
+    ) -> list[tuple[int, int]]:
         """
         Получить топ популярных объявлений по количеству просмотров.
         :param limit: Количество топ объявлений (по умолчанию 10)
         :return: Список кортежей (ad_id, view_count)
         """
-        async with self.session() as session:
+        async with self._scope(session) as session:
+            view_count = func.count().label("view_count")
             result = await session.execute(
-                select(ViewLog.ad_id, func.count(ViewLog.id).label("view_count"))
+                select(ViewLog.ad_id, view_count)
                 .group_by(ViewLog.ad_id)
-                .order_by(func.count(ViewLog.id).desc())
+                .order_by(view_count.desc())
                 .limit(limit)
             )
             return [(int(row.ad_id), int(row.view_count)) for row in result.fetchall()]
 
     # Фильтрация по дате
-    async def filter_by_date(self, start_date: datetime, end_date: datetime) -> list[ViewLog]:
+    async def filter_by_date(
+        self, start_date: datetime, end_date: datetime, *, session: AsyncSession | None = None
+    ) -> list[ViewLog]:
         """
-        Получить просмотры в заданном диапазоне дат.
+        Получить просмотры в заданном диапазоне дат
+        (списком; для больших диапазонов — iter_by_date).
         :param start_date: Начальная дата
         :param end_date: Конечная дата
         :return: Список объектов ViewLog
         """
-        async with self.session() as session:
-            result = await session.execute(
-                select(ViewLog).where(ViewLog.viewed_at.between(start_date, end_date))
-            )
-            return result.scalars().all()
+        return [view async for view in self.iter_by_date(start_date, end_date, session=session)]
+
+    # Потоковый обход просмотров за период
+    def iter_by_date(
+        self, start_date: datetime, end_date: datetime, *, session: AsyncSession | None = None
+    ) -> AsyncIterator[ViewLog]:
+        """
+        Итерировать просмотры за период пачками, не материализуя весь результат.
+        :param start_date: Начальная дата
+        :param end_date: Конечная дата
+        :return: Асинхронный итератор объектов ViewLog
+        """
+        return self._stream(
+            select(ViewLog)
+            .where(ViewLog.viewed_at.between(start_date, end_date))
+            .order_by(ViewLog.viewed_at),
+            session=session,
+        )
@@ -1,6 +1,8 @@
+import asyncio
 import os
 
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import declarative_base
 import dotenv
 from urllib.parse import quote_plus
@@ -12,6 +14,18 @@ _DATABASE_URL: str | None = None
 _engine = None
 _session_factory: async_sessionmaker | None = None
 
+# Один пул на весь процесс: все запросы идут через loop DBRunner,
+# всплески вебхуков не должны упираться в ожидание свободного соединения.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Сколько соединений открыть заранее в init_db (у async-пула нет min_size)
+POOL_WARM = int(os.getenv("DB_POOL_WARM", str(POOL_SIZE)))
+# Кеш подготовленных выражений asyncpg на соединение и кеш компиляции SQLAlchemy
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "512"))
+QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
+
 
 def _build_database_url() -> str:
     """Получить (и при необходимости сформировать) строку подключения."""
@@ -39,12 +53,29 @@ def get_engine():
     """Лениво создать async engine в текущем event loop."""
     global _engine
     if _engine is None:
+        url = _build_database_url()
+        connect_args = {}
+        if "+asyncpg" in url:
+            # Повторяющийся SQL идёт как Bind+Execute по уже подготовленному выражению
+            connect_args = {
+                "prepared_statement_cache_size": STATEMENT_CACHE_SIZE,
+                "statement_cache_size": STATEMENT_CACHE_SIZE,
+            }
         _engine = create_async_engine(
-            _build_database_url(),
+            url,
             echo=False,
-            pool_pre_ping=True,
-            pool_size=5,
-            max_overflow=10
+            connect_args=connect_args,
+            query_cache_size=QUERY_CACHE_SIZE,
+            poolclass=AsyncAdaptedQueuePool,
+            # Вместо ping на каждый checkout — переоткрываем соединения раз в POOL_RECYCLE секунд
+            pool_pre_ping=False,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_recycle=POOL_RECYCLE,
+            pool_timeout=POOL_TIMEOUT,
+            # LIFO: первым отдаём последнее вернувшееся (тёплое) соединение,
+            # лишние простаивают и закрываются по pool_recycle
+            pool_use_lifo=True,
         )
     return _engine
 
@@ -55,14 +86,35 @@ def get_session_factory():
     if _session_factory is None:
         _session_factory = async_sessionmaker(
             bind=get_engine(),
+            # CRUD возвращает объекты после commit — без перечитывания атрибутов
             expire_on_commit=False,
+            # Все записи идут Core-запросами (INSERT/UPDATE ... RETURNING), unit of work
+            # пуст — autoflush перед каждым SELECT только зря проверяет сессию
+            autoflush=False,
         )
     return _session_factory
 
 
 class LazyAsyncSessionmaker:
+    # CRUD-классы держат ссылку на этот объект с момента импорта, поэтому
+    # вместо подмены модульного имени запоминаем фабрику у себя после первого вызова
+    __slots__ = ("_factory",)
+
+    def __init__(self) -> None:
+        self._factory: async_sessionmaker | None = None
+
+    def _resolve(self) -> async_sessionmaker:
+        factory = self._factory
+        if factory is None:
+            factory = self._factory = get_session_factory()
+        return factory
+
     def __call__(self, *args, **kwargs):
-        return get_session_factory()(*args, **kwargs)
+        return (self._factory or self._resolve())(*args, **kwargs)
+
+    def begin(self):
+        """Сессия с уже открытой транзакцией: коммит на выходе, откат при исключении."""
+        return (self._factory or self._resolve()).begin()
 
 
 Base = declarative_base()
@@ -95,6 +147,21 @@ async def init_db():
     engine = get_engine()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await warm_pool(engine, POOL_WARM)
+
+
+async def warm_pool(engine, size: int) -> None:
+    """Открыть ``size`` соединений и вернуть их в пул.
+
+    Пул SQLAlchemy создаёт соединения лениво, и первые запросы после старта
+    платили бы за TCP/auth. Одновременно открытые соединения остаются в пуле
+    (не больше pool_size), дальше они переоткрываются по pool_recycle.
+    """
+    size = min(size, POOL_SIZE)
+    if size <= 0:
+        return
+    connections = await asyncio.gather(*(engine.connect() for _ in range(size)))
+    await asyncio.gather(*(conn.close() for conn in connections))
 
 
 # Явно экспортируем строку подключения для alembic и других скриптов.
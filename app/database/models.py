@@ -1,10 +1,40 @@
-from datetime import datetime, timezone
-
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean
-from sqlalchemy.orm import relationship
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    CheckConstraint,
+    Column,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
 from .db import Base
 
+# Связи не подгружаются неявно: в AsyncSession ленивая загрузка всё равно падает
+# (MissingGreenlet), а так N+1 сразу видно по понятной ошибке в месте обращения.
+# Нужные связи грузятся явно: selectinload / joinedload / contains_eager в CRUD.
+LAZY = "raise_on_sql"
+# Крупные текстовые поля нужны только в карточке/истории, а не в списках:
+# отложены в группу DETAIL и грузятся через undefer_group(DETAIL)
+DETAIL = "detail"
+# Whatsapp ID (sender) — ASCII-ключ: побайтовое сравнение "C" вместо локали
+# ускоряет btree по users.sender и всем внешним ключам на него
+SENDER = String(50, collation="C")
+
 
 # 🧑‍💼 User - таблица пользователей
 class User(Base):
@@ -13,14 +43,14 @@ class User(Base):
     """
     __tablename__ = "users"
 
-    sender = Column(String(50), primary_key=True, unique=True, nullable=False, index=True)  # Whatsapp ID
+    sender = Column(SENDER, primary_key=True, unique=True, nullable=False, index=True)  # Whatsapp ID
     username = Column(String(100), nullable=True)  # Имя пользователя (необязательно)
-    registered_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))  # Дата регистрации
+    registered_at = Column(DateTime(timezone=True), server_default=func.now())  # Дата регистрации
     balance = Column(Integer, default=0)  # Баланс пользователя
 
-    ads = relationship("Ad", back_populates="owner")  # Объявления пользователя
-    views = relationship("ViewLog", back_populates="viewer")  # Просмотры объявлений пользователем
-    favorites = relationship("Favorite", back_populates="user")  # Избранные объявления
+    ads = relationship("Ad", back_populates="owner", lazy=LAZY)  # Объявления пользователя
+    views = relationship("ViewLog", back_populates="viewer", lazy=LAZY)  # Просмотры объявлений пользователем
+    favorites = relationship("Favorite", back_populates="user", lazy=LAZY)  # Избранные объявления
 
 
 # 🚗 Ad — Объявления о продаже автомобилей
@@ -29,11 +59,23 @@ class Ad(Base):
     Объявления о продаже автомобилей.
     """
     __tablename__ = 'ads'
+    # Витрина: только активные объявления, сортировка по цене или дате с добивкой по id
+    __table_args__ = (
+        Index("ads_active_price_id", "price", "id", postgresql_where=text("is_active")),
+        Index("ads_active_created_id", "created_at", "id", postgresql_where=text("is_active")),
+        # Полнотекстовый поиск по названию и описанию
+        Index("ads_search_tsv", "search_tsv", postgresql_using="gin"),
+        # Инварианты данных — последний рубеж; понятные сообщения даёт мастер продажи
+        CheckConstraint("price >= 0", name="ads_price_nonneg"),
+        CheckConstraint("year_car BETWEEN 1900 AND 2100", name="ads_year_car_range"),
+        CheckConstraint("mileage_km_car >= 0", name="ads_mileage_nonneg"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)  # Автоинкрементный ID объявления
-    sender = Column(String(50), ForeignKey('users.sender'))  # Whatsapp ID владельца
+    sender = Column(SENDER, ForeignKey('users.sender'))  # Whatsapp ID владельца
     title = Column(String(100), nullable=False)  # Название объявления
-    description = Column(Text, nullable=False)  # Подробности объявления
+    # Подробности объявления
+    description = deferred(Column(Text, nullable=False), group=DETAIL, raiseload=True)
     price = Column(Integer, nullable=False)  # Цена автомобиля
     year_car = Column(Integer, nullable=False)  # Год выпуска автомобиля
     car_brand_id = Column(Integer, ForeignKey('car_brands.id'), index=True)  # Марка авто
@@ -44,16 +86,24 @@ class Ad(Base):
     condition = Column(String(50), nullable=True)  # Состояние (целый / после ДТП)
     day_count = Column(Integer, default=0)  # Количество дней публикации
     is_active = Column(Boolean, default=False)  # Активно ли объявление
-    created_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))  # Время публикации объявления
+    created_at = Column(DateTime(timezone=True), server_default=func.now())  # Время публикации объявления
+    # Денормализация для карточек каталога: ведутся триггером на ad_images (миграция d7a3f5b1e942)
+    main_image_url = Column(String, nullable=True)  # Обложка — первое загруженное фото
+    image_count = Column(Integer, default=0, server_default="0", nullable=False)  # Количество фото
+    # Поисковый вектор считает сама БД (генерируемая колонка); в выборки Ad не попадает
+    search_tsv = deferred(Column(
+        TSVECTOR,
+        Computed("to_tsvector('russian', coalesce(title, '') || ' ' || coalesce(description, ''))", persisted=True),
+    ), raiseload=True)
 
     # Отношения
-    owner = relationship("User", back_populates="ads")  # Владелец объявления
-    brand = relationship("CarBrand", back_populates="ads")  # Марка автомобиля
-    images = relationship("AdImage", back_populates="ad", cascade="all, delete-orphan")  # Изображения объявления
+    owner = relationship("User", back_populates="ads", lazy=LAZY)  # Владелец объявления
+    brand = relationship("CarBrand", back_populates="ads", lazy=LAZY)  # Марка автомобиля
+    images = relationship("AdImage", back_populates="ad", cascade="all, delete-orphan", lazy=LAZY)  # Изображения объявления
     moderation = relationship("Moderation", back_populates="ad", uselist=False,
-                              cascade="all, delete-orphan")  # Модерация объявления
-    views = relationship("ViewLog", back_populates="ad", cascade="all, delete-orphan")  # Просмотры объявления
-    favorites = relationship("Favorite", back_populates="ad", cascade="all, delete-orphan")  # Избранные объявления
+                              cascade="all, delete-orphan", lazy=LAZY)  # Модерация объявления
+    views = relationship("ViewLog", back_populates="ad", cascade="all, delete-orphan", lazy=LAZY)  # Просмотры объявления
+    favorites = relationship("Favorite", back_populates="ad", cascade="all, delete-orphan", lazy=LAZY)  # Избранные объявления
 
 
 # 🚘 CarBrand — Марка автомобиля
@@ -63,74 +113,144 @@ class CarBrand(Base):
     id = Column(Integer, primary_key=True)  # Автоинкрементный ID марки
     name = Column(String(100), unique=True, nullable=False)  # Название марки
 
-    ads = relationship("Ad", back_populates="brand")  # Объявления с этой маркой
+    ads = relationship("Ad", back_populates="brand", lazy=LAZY)  # Объявления с этой маркой
+
+
+# get_by_name сравнивает lower(name) = lower(:name), upsert/bulk_add разрешают по нему
+# конфликт: "toyota" и "Toyota" — одна марка. Выражение ссылается на колонку,
+# поэтому индекс объявлен после класса (миграции 5c2e7b9d41a3, c7d2e9a5f318)
+Index("car_brands_name_lower_idx", func.lower(CarBrand.name), unique=True)
 
 
 # 📁 AdImage
 class AdImage(Base):
     __tablename__ = "ad_images"
+    # Галерея и обложка: WHERE ad_id = ... ORDER BY id, читается только image_url
+    # (миграция 8d4f1a6c2e90)
+    __table_args__ = (
+        Index("ad_images_ad_id_id_cover", "ad_id", "id", postgresql_include=["image_url"]),
+    )
 
     id = Column(Integer, primary_key=True)  # Автоинкрементный ID изображения
     ad_id = Column(Integer, ForeignKey("ads.id"))  # ID объявления
     image_url = Column(String, nullable=False)  # URL изображения
-    uploaded_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))  # Дата загрузки изображения
+    uploaded_at = Column(DateTime(timezone=True), server_default=func.now())  # Дата загрузки изображения
+
+    ad = relationship("Ad", back_populates="images", lazy=LAZY)  # Объявление, к которому относится изображение
 
-    ad = relationship("Ad", back_populates="images")  # Объявление, к которому относится изображение
+
+# Ads.image_count / main_image_url ведёт БД: триггеры уровня оператора на ad_images.
+# Для Alembic то же самое создаёт миграция d7a3f5b1e942, здесь — для create_all.
+_AD_IMAGE_STATS_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION ads_image_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE ads a
+            SET image_count = a.image_count + n.cnt,
+                main_image_url = COALESCE(a.main_image_url, n.first_url)
+            FROM (
+                SELECT ad_id, count(*) AS cnt, (array_agg(image_url ORDER BY id))[1] AS first_url
+                FROM new_images
+                GROUP BY ad_id
+            ) n
+            WHERE a.id = n.ad_id;
+        ELSE
+            UPDATE ads a
+            SET image_count = GREATEST(a.image_count - d.cnt, 0),
+                main_image_url = (
+                    SELECT i.image_url FROM ad_images i WHERE i.ad_id = a.id ORDER BY i.id LIMIT 1
+                )
+            FROM (SELECT ad_id, count(*) AS cnt FROM old_images GROUP BY ad_id) d
+            WHERE a.id = d.ad_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    "CREATE TRIGGER ad_images_stats_insert AFTER INSERT ON ad_images "
+    "REFERENCING NEW TABLE AS new_images FOR EACH STATEMENT EXECUTE FUNCTION ads_image_stats()",
+    "CREATE TRIGGER ad_images_stats_delete AFTER DELETE ON ad_images "
+    "REFERENCING OLD TABLE AS old_images FOR EACH STATEMENT EXECUTE FUNCTION ads_image_stats()",
+)
+for _ddl in _AD_IMAGE_STATS_DDL:
+    event.listen(AdImage.__table__, "after_create", DDL(_ddl).execute_if(dialect="postgresql"))
 
 
 # 📌 Favorite — Избранные объявления
 class Favorite(Base):
     __tablename__ = "favorites"
+    # Цель ON CONFLICT в CrudeFavorite.add и ключ проверки «в избранном ли»
+    __table_args__ = (UniqueConstraint("sender", "ad_id", name="favorites_sender_ad_id_key"),)
 
     id = Column(Integer, primary_key=True)  # Автоинкрементный ID избранного
-    sender = Column(String(50), ForeignKey("users.sender"))  # ID пользователя, добавившего в избранное
+    sender = Column(SENDER, ForeignKey("users.sender"))  # ID пользователя, добавившего в избранное
     ad_id = Column(Integer, ForeignKey("ads.id"))  # ID объявления, добавленного в избранное
-    added_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))  # Дата добавления в избранное
+    added_at = Column(DateTime(timezone=True), server_default=func.now())  # Дата добавления в избранное
 
-    user = relationship("User", back_populates="favorites")  # Пользователь, добавивший в избранное
-    ad = relationship("Ad", back_populates="favorites")  # Объявление, добавленное в избранное
+    user = relationship("User", back_populates="favorites", lazy=LAZY)  # Пользователь, добавивший в избранное
+    ad = relationship("Ad", back_populates="favorites", lazy=LAZY)  # Объявление, добавленное в избранное
 
 
 # 🧾 Payment — Платежи
 class Payment(Base):
     __tablename__ = "payments"
+    # SUM(amount) GROUP BY sender и платежи пользователя — index-only scan (миграция 3b7e2d5f8a14)
+    __table_args__ = (Index("payments_sender_amount", "sender", postgresql_include=["amount"]),)
 
     id = Column(Integer, primary_key=True)  # Автоинкрементный ID платежа
-    sender = Column(String(50), ForeignKey("users.sender"))  # ID пользователя, совершившего платеж
+    sender = Column(SENDER, ForeignKey("users.sender"))  # ID пользователя, совершившего платеж
     amount = Column(Integer, nullable=False)  # Сумма платежа
-    payment_date = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))  # Дата платежа
+    payment_date = Column(DateTime(timezone=True), server_default=func.now())  # Дата платежа
     description = Column(Text, nullable=True)  # Описание платежа (необязательно)
 
-    user = relationship("User")  # Пользователь, совершивший платеж
+    user = relationship("User", lazy=LAZY)  # Пользователь, совершивший платеж
 
 
 # Отдельная таблица Модераторов в ТГ
 class Moderator(Base):
     __tablename__ = "moderators"
+    # Список активных модераторов (миграция 6a1c9e3f7b52)
+    __table_args__ = (Index("moderators_active", "id", postgresql_where=text("is_active")),)
 
     id = Column(Integer, primary_key=True)  # Автоинкрементный ID модератора
     telegram_id = Column(Integer, unique=True, nullable=False)  # Whatsapp ID модератора
     username = Column(String(100), nullable=True)  # Имя пользователя (необязательно)
-    registered_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))  # Дата регистрации
+    registered_at = Column(DateTime(timezone=True), server_default=func.now())  # Дата регистрации
     is_active = Column(Boolean, default=True)  # Активен ли модератор
 
-    moderations = relationship("Moderation", back_populates="moderator")  # Модерации, выполненные этим модератором
+    moderations = relationship("Moderation", back_populates="moderator", lazy=LAZY)  # Модерации, выполненные этим модератором
+
+
+# Заголовок и описание статусов модерации: собираются один раз при импорте
+_STATUS_INFO: Mapping[str, tuple[str, str]] = MappingProxyType({
+    "pending": ("Ожидает проверки", "Модератор еще не проверил это объявление."),
+    "approved": ("Одобрено", "Объявление прошло модерацию и опубликовано."),
+    "rejected": ("Отклонено", "Объявление не прошло модерацию. Проверьте комментарий."),
+})
+_UNKNOWN_STATUS = ("Неизвестный статус", "Статус не найден.")
 
 
 # 🔎 Moderation — модерация объявлений
 class Moderation(Base):
     __tablename__ = "moderations"
+    # Очередь модерации и история проверок модератора (миграция 6a1c9e3f7b52)
+    __table_args__ = (
+        Index("moderations_pending_ad_id", "ad_id", postgresql_where=text("status = 'pending'")),
+        Index("moderations_moderator_id", "moderator_id"),
+    )
 
     id = Column(Integer, primary_key=True)  # Автоинкрементный ID модерации
     ad_id = Column(Integer, ForeignKey("ads.id"), unique=True)  # ID объявления, которое проверяется
     moderator_id = Column(Integer, ForeignKey("moderators.id"),
                           nullable=True)  # ID модератора, который проверяет (может быть None, если еще не проверено)
     status = Column(String(20), default="pending")  # pending / approved / rejected
-    comment = Column(Text, nullable=True)  # Почему отклонили (если отклонено)
+    # Почему отклонили (если отклонено)
+    comment = deferred(Column(Text, nullable=True), group=DETAIL, raiseload=True)
     checked_at = Column(DateTime(timezone=True), nullable=True, default=None)  # Дата проверки (если проверено)
 
-    ad = relationship("Ad", back_populates="moderation")
-    moderator = relationship("Moderator", back_populates="moderations")
+    ad = relationship("Ad", back_populates="moderation", lazy=LAZY)
+    moderator = relationship("Moderator", back_populates="moderations", lazy=LAZY)
 
     # Статический метод информация по статусам
     @staticmethod
@@ -140,24 +260,71 @@ class Moderation(Base):
         :param status: Статус модерации (pending, approved, rejected)
         :return: Кортеж с заголовком и описанием статуса
         """
-        status_info = {
-            "pending": ("Ожидает проверки", "Модератор еще не проверил это объявление."),
-            "approved": ("Одобрено", "Объявление прошло модерацию и опубликовано."),
-            "rejected": ("Отклонено", "Объявление не прошло модерацию. Проверьте комментарий.")
-        }
-        return status_info.get(status, ("Неизвестный статус", "Статус не найден."))
+        return _STATUS_INFO.get(status, _UNKNOWN_STATUS)
 
 
 # 👁️ ViewLog — просмотры объявлений
 class ViewLog(Base):
     __tablename__ = "view_logs"
-
-    id = Column(Integer, primary_key=True)  # Автоинкрементный ID просмотра
+    # Счётчики и топ просмотров по объявлению, просмотры пользователя (миграция 6a1c9e3f7b52)
+    __table_args__ = (
+        Index("view_logs_ad_id", "ad_id"),
+        Index("view_logs_sender", "sender"),
+        # filter_by_date / iter_by_date: просмотры пишутся по времени (миграция 9e5b3c7d1f26)
+        Index("view_logs_viewed_at_brin", "viewed_at", postgresql_using="brin"),
+        # Помесячные партиции по viewed_at (миграция b2d8f4a6c913)
+        {"postgresql_partition_by": "RANGE (viewed_at)"},
+    )
+
+    # Ключ партиционирования обязан входить в первичный ключ: PK = (id, viewed_at)
+    id = Column(Integer, primary_key=True, autoincrement=True)  # Автоинкрементный ID просмотра
     ad_id = Column(Integer, ForeignKey("ads.id"))  # ID объявления, которое просмотрели
-    sender = Column(String(50), ForeignKey("users.sender"),
+    sender = Column(SENDER, ForeignKey("users.sender"),
                     nullable=False)  # Whatsapp ID пользователя, который просмотрел (может быть None, если анонимный просмотр)
-    viewed_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))  # Дата просмотра
+    viewed_at = Column(  # Дата просмотра
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
+    )
 
-    ad = relationship("Ad", back_populates="views")  # Объявление, которое просмотрели
+    ad = relationship("Ad", back_populates="views", lazy=LAZY)  # Объявление, которое просмотрели
     viewer = relationship("User",
-                          back_populates="views")  # Пользователь, который просмотрел (может быть None, если анонимный просмотр)
+                          back_populates="views", lazy=LAZY)  # Пользователь, который просмотрел (может быть None, если анонимный просмотр)
+
+
+# Буфер пакетной записи просмотров (CrudeViewLog.add_many): COPY сюда, затем
+# INSERT ... SELECT в view_logs и TRUNCATE. UNLOGGED — без WAL, содержимое живёт
+# одну транзакцию; постоянная таблица не плодит каталожные строки, как TEMP на каждый сброс
+view_logs_stage = Table(
+    "view_logs_stage",
+    Base.metadata,
+    Column("ad_id", Integer, nullable=False),
+    Column("sender", SENDER, nullable=False),
+    Column("viewed_at", DateTime(timezone=True), nullable=False),
+    prefixes=["UNLOGGED"],
+)
+
+
+# Партиции view_logs: DEFAULT-партиция для строк без месячной и функция создания
+# партиции на месяц (её раз в час зовёт janitor). Для Alembic то же создаёт
+# миграция b2d8f4a6c913, здесь — для create_all.
+_VIEW_LOG_PARTITION_DDL = (
+    "CREATE TABLE IF NOT EXISTS view_logs_default PARTITION OF view_logs DEFAULT",
+    """
+    CREATE OR REPLACE FUNCTION view_logs_create_partition(month date) RETURNS void AS $$
+    DECLARE
+        start_at date := date_trunc('month', month)::date;
+    BEGIN
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %%I PARTITION OF view_logs FOR VALUES FROM (%%L) TO (%%L)',
+            'view_logs_' || to_char(start_at, 'YYYY_MM'),
+            start_at,
+            (start_at + interval '1 month')::date
+        );
+    END;
+    $$ LANGUAGE plpgsql
+    """,  # %% — экранирование: DDL подставляет в строку %(table)s
+    # Текущий и следующий месяц — сразу, пока DEFAULT-партиция пуста
+    "SELECT view_logs_create_partition(now()::date)",
+    "SELECT view_logs_create_partition((now() + interval '1 month')::date)",
+)
+for _ddl in _VIEW_LOG_PARTITION_DDL:
+    event.listen(ViewLog.__table__, "after_create", DDL(_ddl).execute_if(dialect="postgresql"))
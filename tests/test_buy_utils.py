@@ -1,8 +1,32 @@
 import json
+import threading
+from contextlib import closing
 
 import pytest
 
 from app.bot.handlers import buy
+from app.bot.services.filter_store import FilterStore
+
+
+def _stored(path, sender):
+    """Прочитать фильтры с диска отдельным соединением и закрыть его."""
+    with closing(FilterStore(path)) as store:
+        return store.get(sender)
+
+
+def _fake_ads(state, page=0, page_size=5, after=None):
+    return [
+        {"id": 1, "title": "Test", "price": 100, "year": 2020, "mileage": 1000},
+    ], 1
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _fake_catalog():
+    """Подменить запросы каталога один раз на весь модуль."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(buy, "filter_public_ads", _fake_ads)
+        mp.setattr(buy, "count_filtered_public_ads", lambda state: 1)
+        yield
 
 
 @pytest.fixture(autouse=True)
@@ -12,18 +36,14 @@ def _clean_state(monkeypatch, tmp_path):
     buy._LAST_CATALOG.clear()
     buy._LAST_DETAILS.clear()
     buy._LAST_VIEWED.clear()
-    state_file = tmp_path / "state.json"
-    monkeypatch.setattr(buy, "_STATE_FILE", state_file, raising=False)
-
-    def _fake_ads(state, page=0, page_size=5):
-        return [
-            {"id": 1, "title": "Test", "price": 100, "year": 2020, "mileage": 1000},
-        ]
-
-    monkeypatch.setattr(buy, "filter_public_ads", _fake_ads, raising=False)
-    monkeypatch.setattr(buy, "count_filtered_public_ads", lambda state: 1, raising=False)
+    state_file = tmp_path / "state.sqlite3"
+    monkeypatch.setattr(buy, "_STATE_FILE", state_file)
+    monkeypatch.setattr(buy, "_LEGACY_STATE_FILE", tmp_path / "state.json")
     yield
     buy._FILTER_STATE.clear()
+    store = buy._STORES.pop(state_file, None)
+    if store is not None:
+        store.close()
 
 
 def test_parse_range_variants():
@@ -39,19 +59,73 @@ def test_shift_page_and_persist(tmp_path):
     assert buy._FILTER_STATE[user]["page"] == 2
 
 
-def test_persist_filter_state(monkeypatch, tmp_path):
-    state_file = tmp_path / "state.json"
-    monkeypatch.setattr(buy, "_STATE_FILE", state_file, raising=False)
+def test_render_uses_cursor_of_previous_page(monkeypatch):
+    calls = []
+
+    def _fake_ads(state, page=0, page_size=5, after=None):
+        calls.append((page, after))
+        return [{"id": 10 + page, "title": "T", "price": 1, "year": 2020, "mileage": 1, "cursor": [1, 10 + page]}], 6
+
+    monkeypatch.setattr(buy, "filter_public_ads", _fake_ads)
+    user = "tester"
+    buy._reset_filters(user)
+    buy._render_filtered(user)
+    buy._shift_page(user, 1)
+    buy._render_filtered(user)
+    buy._shift_page(user, -1)
+    buy._render_filtered(user)
+    assert calls == [(0, None), (1, [1, 10]), (0, None)]
+    assert buy._FILTER_STATE[user]["cursors"] == [[1, 10]]
+
+
+def test_persist_filter_state(tmp_path):
     user = "tester"
     buy._reset_filters(user)
     buy._update_price_filter(user, "цена 100000-200000")
-    assert state_file.exists()
-    data = json.loads(state_file.read_text())
-    assert data[user]["min_price"] == 100000
-    # эмулируем рестарт
+    buy._flush_now()
+    assert _stored(buy._STATE_FILE, user)["min_price"] == 100000
+    # эмулируем рестарт: стейт подтягивается из базы при первом обращении
     buy._FILTER_STATE.clear()
+    assert buy._ensure_state(user)["min_price"] == 100000
+    assert buy._ensure_state("other")["min_price"] is None
+
+
+def test_filter_store_is_opened_once_across_threads():
+    barrier = threading.Barrier(8)
+    stores = []
+
+    def worker():
+        barrier.wait()
+        stores.append(buy._filter_store())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(store) for store in stores}) == 1
+
+
+def test_filter_store_coalesces_scheduled_writes(tmp_path):
+    with closing(FilterStore(tmp_path / "filters.sqlite3", delay=60)) as store:
+        store.schedule("u", {"page": 1})
+        store.schedule("u", {"page": 2})
+        # до записи читается последний снимок, на диске ещё ничего нет
+        assert store.get("u") == {"page": 2}
+        assert _stored(store.path, "u") is None
+        store.flush()
+        assert _stored(store.path, "u") == {"page": 2}
+
+
+def test_load_legacy_filter_state(tmp_path):
+    legacy = buy._LEGACY_STATE_FILE
+    legacy.write_text(json.dumps({"tester": {"min_price": 5}}), encoding="utf-8")
     buy._load_filter_state()
-    assert buy._FILTER_STATE[user]["min_price"] == 100000
+    assert not legacy.exists()
+    buy._FILTER_STATE.clear()
+    state = buy._ensure_state("tester")
+    assert state["min_price"] == 5
+    assert state["sort_by"] == "created"
 
 
 def test_region_filter_updates_state():
@@ -0,0 +1,51 @@
+from sqlalchemy.exc import IntegrityError
+
+from app.database.crude.add import AD_BY_ID, _catalog_query, _check_violation
+
+
+def test_same_filter_shape_reuses_statement():
+    first, first_params = _catalog_query("summary", car_brand_id=1, region="Москва", limit=5, offset=0)
+    second, second_params = _catalog_query("summary", car_brand_id=7, region="Грозный", limit=5, offset=10)
+    assert first is second
+    assert first_params == {"car_brand_id": 1, "region": "Москва", "limit": 5, "offset": 0}
+    assert second_params == {"car_brand_id": 7, "region": "Грозный", "limit": 5, "offset": 10}
+
+
+def test_unset_and_empty_filters_are_skipped():
+    stmt, params = _catalog_query("count", min_price=None, region="", condition=None, max_price=0)
+    assert params == {"max_price": 0}
+    sql = str(stmt)
+    assert "max_price" in sql
+    assert "region" not in sql
+
+
+def test_catalog_query_seek_replaces_offset():
+    stmt, params = _catalog_query("summary", sort_by="price", sort_order="asc", limit=5, after=(100, 7))
+    sql = str(stmt)
+    assert "OFFSET" not in sql
+    assert "(ads.price, ads.id) > (:after_value, :after_id)" in sql
+    assert params == {"after_value": 100, "after_id": 7, "limit": 5}
+
+
+def test_catalog_cards_do_not_touch_images_table():
+    stmt, _params = _catalog_query("summary", limit=5)
+    sql = str(stmt)
+    assert "ad_images" not in sql
+    assert "ads.main_image_url" in sql
+
+
+def test_description_is_loaded_only_for_single_ad():
+    listing, _params = _catalog_query("ad", limit=5)
+    assert "ads.description" not in str(listing)
+    assert "ads.description" in str(AD_BY_ID)
+
+
+def test_summary_total_adds_window_count():
+    stmt, _params = _catalog_query("summary_total", limit=5, offset=0)
+    assert "count(*) OVER () AS total_rows" in str(stmt)
+
+
+def test_check_violation_maps_constraint_name_to_message():
+    exc = IntegrityError("INSERT", {}, Exception('violates check constraint "ads_mileage_nonneg"'))
+    assert _check_violation(exc) == "Пробег не может быть отрицательным."
+    assert _check_violation(IntegrityError("INSERT", {}, Exception("duplicate key"))) is None
@@ -0,0 +1,175 @@
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+
+from app.database.crude.base import CrudeBase
+from app.database.crude.car_brand import CrudeCarBrand
+
+
+class _FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    async def flush(self):
+        self.calls.append("flush")
+
+    async def commit(self):
+        self.calls.append("commit")
+
+    async def rollback(self):
+        self.calls.append("rollback")
+
+
+class _Crud(CrudeBase):
+    async def touch(self, *, session=None):
+        async with self._scope(session) as session:
+            await session.commit()
+            await session.rollback()
+
+
+def test_external_session_is_not_committed_or_rolled_back():
+    external = _FakeSession()
+    asyncio.run(_Crud().touch(session=external))
+    assert external.calls == ["flush"]
+
+
+def test_bind_does_not_mutate_shared_crud():
+    from app.database.crude import crud_manager
+
+    original = crud_manager.user.session
+    first = crud_manager.bind(crud_manager.user, _FakeSession())
+    second = crud_manager.bind(crud_manager.user, _FakeSession())
+    assert crud_manager.user.session is original
+    assert first.get_by_sender.keywords["session"] is not second.get_by_sender.keywords["session"]
+
+
+def test_transaction_binds_cruds_to_one_session():
+    from contextlib import asynccontextmanager
+
+    from app.database.crude.manager import CrudManager
+
+    session = _FakeSession()
+
+    class _Factory:
+        @asynccontextmanager
+        async def begin(self):
+            yield session
+            await session.commit()
+
+    async def scenario():
+        async with CrudManager(_Factory()).transaction() as crud:
+            assert crud.user.get_by_sender.keywords["session"] is session
+            assert crud.ad.add.keywords["session"] is session
+
+    asyncio.run(scenario())
+    assert session.calls == ["commit"]
+
+
+def test_default_session_factory_supports_begin():
+    from app.database.db import AsyncSessionLocal
+
+    # CrudManager.transaction() опирается на session_factory.begin()
+    assert hasattr(AsyncSessionLocal.begin(), "__aenter__")
+
+
+def test_active_moderators_are_cached_until_invalidated():
+    from contextlib import asynccontextmanager
+
+    from app.database.crude import moder
+
+    queries = []
+
+    class _Result:
+        def scalars(self):
+            return self
+
+        def all(self):
+            return ["mod"]
+
+    class _Session(_FakeSession):
+        async def execute(self, stmt):
+            queries.append(stmt)
+            return _Result()
+
+    class _Crud(moder.CrudeModerator):
+        @asynccontextmanager
+        async def _scope(self, session=None):
+            yield _Session()
+
+    crud = _Crud()
+    moder._invalidate_moderators()
+    assert asyncio.run(crud.get_all_active()) == ["mod"]
+    assert asyncio.run(crud.get_all_active()) == ["mod"]
+    assert len(queries) == 1
+    moder._invalidate_moderators()
+    asyncio.run(crud.get_all_active())
+    assert len(queries) == 2
+    # Внешняя сессия всегда идёт в БД и кеш не трогает
+    asyncio.run(crud.get_all_active(session=_FakeSession()))
+    asyncio.run(crud.get_all_active(session=_FakeSession()))
+    assert len(queries) == 4
+    asyncio.run(crud.get_all_active())
+    assert len(queries) == 4
+
+
+def test_brand_upsert_resolves_case_variants_to_one_brand():
+    from contextlib import asynccontextmanager
+    from types import SimpleNamespace
+
+    brands = {}
+    queries = []
+
+    class _Result:
+        def __init__(self, brand):
+            self._brand = brand
+
+        def scalar_one(self):
+            return self._brand
+
+    class _Session(_FakeSession):
+        async def execute(self, stmt):
+            sql = str(stmt.compile(dialect=postgresql.dialect()))
+            queries.append(sql)
+            # Эмуляция уникального индекса по lower(name): конфликт вернёт существующую строку
+            name = stmt.compile().params["name"]
+            brand = brands.setdefault(name.lower(), SimpleNamespace(id=len(brands) + 1, name=name))
+            return _Result(brand)
+
+    class _Crud(CrudeCarBrand):
+        @asynccontextmanager
+        async def _scope(self, session=None):
+            yield _Session()
+
+    crud = _Crud()
+    first = asyncio.run(crud.upsert("Toyota"))
+    second = asyncio.run(crud.upsert("toyota"))
+    assert second is first and first.name == "Toyota"
+    for sql in queries:
+        assert "ON CONFLICT (lower(name)) DO UPDATE SET name = car_brands.name" in sql
+
+
+def test_coalesced_runs_one_query_for_concurrent_callers():
+    from app.database.crude.base import coalesced
+
+    calls = []
+
+    class _Analytics(CrudeBase):
+        @coalesced
+        async def top(self, limit=10, *, session=None):
+            calls.append((limit, session))
+            await asyncio.sleep(0.01)
+            return [("a", limit)]
+
+    async def scenario():
+        crud = _Analytics()
+        same = await asyncio.gather(crud.top(10), crud.top(limit=10), crud.top())
+        other = await crud.top(7)
+        external = await crud.top(10, session="external")
+        return same, other, external
+
+    same, other, external = asyncio.run(scenario())
+    assert same[0] == same[1] == same[2] == [("a", 10)]
+    assert other == [("a", 7)]
+    assert external == [("a", 10)]
+    # позиционный, именованный и умолчательный limit — один ключ, внешняя сессия не схлопывается
+    assert calls == [(10, None), (7, None), (10, "external")]
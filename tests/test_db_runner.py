@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+from app.bot.services.state import _ViewBuffer, db_runner
+
+
+def test_run_collapses_concurrent_calls_with_same_key():
+    calls = 0
+    started = threading.Event()
+
+    async def slow_lookup():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await asyncio.sleep(0.1)
+        return "user"
+
+    results = []
+
+    def worker():
+        results.append(db_runner.run(slow_lookup(), key=("user", "79990000000@c.us")))
+
+    first = threading.Thread(target=worker)
+    first.start()
+    started.wait(1)
+    second = threading.Thread(target=worker)
+    second.start()
+    first.join()
+    second.join()
+
+    assert results == ["user", "user"]
+    assert calls == 1
+
+
+def test_run_reexecutes_after_previous_call_finished():
+    calls = 0
+
+    async def lookup():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert db_runner.run(lookup(), key="k") == 1
+    assert db_runner.run(lookup(), key="k") == 2
+
+
+def test_view_buffer_flushes_by_size_and_by_interval():
+    batches = []
+    flushed = threading.Event()
+
+    class _Collecting(_ViewBuffer):
+        async def _flush(self, batch):
+            batches.append([(ad_id, sender) for ad_id, sender, _ts in batch])
+            flushed.set()
+
+    buffer = _Collecting(db_runner, max_batch=2, interval=0.05)
+    buffer.record(1, "a")
+    buffer.record(2, "b")
+    assert flushed.wait(1)
+    flushed.clear()
+    buffer.record(3, "c")
+    assert flushed.wait(1)
+    assert batches == [[(1, "a"), (2, "b")], [(3, "c")]]
+
+
+def test_view_buffer_flush_drains_pending():
+    batches = []
+
+    class _Collecting(_ViewBuffer):
+        async def _flush(self, batch):
+            await asyncio.sleep(0.01)
+            batches.append([ad_id for ad_id, _sender, _ts in batch])
+
+    buffer = _Collecting(db_runner, max_batch=100, interval=60)
+    buffer.record(1, "a")
+    buffer.record(2, "b")
+    buffer.flush()
+    assert batches == [[1, 2]]
@@ -0,0 +1,16 @@
+from app.bot.services.guard import Allowlist, is_sender_allowed
+
+
+def test_allowlist_empty_means_no_restriction():
+    assert Allowlist.from_senders(None) is None
+    assert Allowlist.from_senders(set()) is None
+    assert is_sender_allowed("79990000000@c.us", None)
+
+
+def test_allowlist_matches_full_and_local_part():
+    allowed = Allowlist.from_senders({"79990000000", "78880000000@c.us"})
+    assert is_sender_allowed("79990000000@c.us", allowed)
+    assert is_sender_allowed("79990000000", allowed)
+    assert is_sender_allowed("78880000000@c.us", allowed)
+    assert not is_sender_allowed("78880000000@g.us", allowed)
+    assert not is_sender_allowed("70000000000@c.us", allowed)
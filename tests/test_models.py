@@ -0,0 +1,21 @@
+from sqlalchemy import DDL
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.schema import CreateTable
+
+from app.database.models import _VIEW_LOG_PARTITION_DDL, ViewLog, view_logs_stage
+
+
+def test_view_logs_create_all_matches_partitioned_migration():
+    sql = str(CreateTable(ViewLog.__table__).compile(dialect=postgresql.dialect()))
+    assert "PRIMARY KEY (id, viewed_at)" in sql
+    assert "PARTITION BY RANGE (viewed_at)" in sql
+    # Так DDL уходит в asyncpg: %% из-за подстановки %(table)s раскрыт в одиночный %
+    ddl = [str(DDL(stmt).compile(dialect=asyncpg.dialect())) for stmt in _VIEW_LOG_PARTITION_DDL]
+    assert "PARTITION OF view_logs DEFAULT" in ddl[0]
+    assert "'CREATE TABLE IF NOT EXISTS %I PARTITION OF view_logs" in ddl[1]
+
+
+def test_view_logs_stage_is_unlogged():
+    sql = str(CreateTable(view_logs_stage).compile(dialect=postgresql.dialect()))
+    assert sql.strip().startswith("CREATE UNLOGGED TABLE view_logs_stage")
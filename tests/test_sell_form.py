@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from app.bot.services import forms
+
+
+def test_sell_form_survives_restart(tmp_path):
+    state_file = tmp_path / "sell.json"
+    manager = forms.SellFormManager(state_file)
+    manager.start("tester")
+    manager.handle("tester", "Camry 2016")
+    assert state_file.exists()
+
+    restarted = forms.SellFormManager(state_file)
+    assert restarted.has_state("tester")
+    assert restarted._states["tester"].data["title"] == "Camry 2016"
+    assert restarted._states["tester"].step_index == 1
+
+
+def test_sell_form_expires_after_ttl(tmp_path):
+    manager = forms.SellFormManager(tmp_path / "sell.json")
+    manager.start("tester")
+    manager._states["tester"].updated_at -= forms.SELL_FORM_TTL + 1
+    assert not manager.has_state("tester")
+    assert forms.SellFormManager(tmp_path / "sell.json")._states == {}
+
+
+def test_concurrent_start_and_cancel_keep_state_file_valid(tmp_path, caplog):
+    state_file = tmp_path / "sell.json"
+    manager = forms.SellFormManager(state_file)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(20):
+                manager.start(f"u{n}-{i}")
+                if i % 2:
+                    manager.cancel(f"u{n}-{i}")
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # _persist глушит ошибки записи в лог — гонка проявилась бы предупреждением
+    assert not [r for r in caplog.records if r.name == "app.bot.forms"]
+    expected = {f"u{n}-{i}" for n in range(8) for i in range(0, 20, 2)}
+    assert set(forms.SellFormManager(state_file)._states) == expected
+
+
+def test_cancelled_state_is_reused_clean(tmp_path):
+    manager = forms.SellFormManager(tmp_path / "sell.json")
+    manager.start("first")
+    manager.handle("first", "Camry 2016")
+    used = manager._states["first"]
+    manager.cancel("first")
+
+    manager.start("second")
+    assert manager._states["second"] is used
+    assert used.step_index == 0 and used.data == {} and used.photos == []
+
+
+def test_validate_year_bounds():
+    assert forms._validate_year("2018") == 2018
+    assert forms._validate_year(str(forms._max_year())) == forms._max_year()
+    with pytest.raises(ValueError):
+        forms._validate_year("1949")
+    with pytest.raises(ValueError):
+        forms._validate_year(str(forms._max_year() + 1))
+
+
+def test_price_and_mileage_accept_thousand_separators():
+    assert forms._validate_price("850 000") == 850000
+    assert forms._validate_price("1 200 000") == 1200000
+    assert forms._validate_mileage("125 000") == 125000
+    with pytest.raises(ValueError):
+        forms._validate_price("   ")
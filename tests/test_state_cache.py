@@ -0,0 +1,17 @@
+from types import SimpleNamespace
+
+from app.bot.services import state
+from app.bot.services.state import db_runner
+
+
+def test_brand_cache_is_warmed_from_all_brands(monkeypatch):
+    brands = [SimpleNamespace(id=1, name="Toyota"), SimpleNamespace(id=2, name="BMW")]
+
+    async def _get_all():
+        return brands
+
+    monkeypatch.setattr(state.crud_manager.car_brand, "get_all", _get_all)
+    monkeypatch.setattr(state, "_brand_cache", state._TTLCache(ttl=None))
+    db_runner.run(state._warm_brand_cache())
+    assert db_runner.run(state._get_brand_by_name("toyota")) is brands[0]
+    assert db_runner.run(state._ensure_brand("BMW")) is brands[1]